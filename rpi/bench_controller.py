@@ -0,0 +1,227 @@
+"""
+Benchmark for the LED controller on any Linux box, using simulated strips.
+
+Plays a set of lights through the controller's Player in real time and
+reports per light: show() calls, frames per second, CPU time per frame and
+the error of every ring transition against the compiled seamark timeline.
+--legacy also runs the previous 10 ms polling loop on the same lights as a
+baseline. --realtime/--cpu apply the controller's scheduling options, so
+their effect on the timing shows up next to a normal run.
+
+    python rpi/bench_controller.py --seconds 10 --legacy
+    python rpi/bench_controller.py --dataset server/site/data.rich.json --keys n123 w456 --png /tmp/ring.png
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from bisect import bisect_left
+from pathlib import Path
+
+RPI_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(RPI_DIR))
+
+import led_controller as lc  # noqa: E402
+from frame_stats import set_realtime  # noqa: E402
+from led_backends import SimulatedStrip, write_png  # noqa: E402
+from playlist import load_rows  # noqa: E402
+
+# Representative lights when no dataset keys are given
+SAMPLE_COMMANDS = {
+    "Fl 5s": {"period_s": 5.0, "main_colour": "white", "main_character": "Fl", "main_sequence": "0.5+(4.5)"},
+    "Q": {"period_s": 1.0, "main_colour": "white", "main_character": "Q"},
+    "Fl(2) 20s": {"period_s": 20.0, "main_colour": "red", "main_character": "Fl(2)", "main_sequence": "1.5+(4),1.5+(13)"},
+    "Mo(A) 8s": {"period_s": 8.0, "main_colour": "yellow", "main_character": "Mo(A)"},
+    "3 sectors": {
+        "period_s": 4.0,
+        "main_colour": "white",
+        "main_character": "Oc",
+        "sectors": [
+            {"sector_start": "300", "sector_end": "20", "colour": "red", "character": "Oc", "period": "4", "sequence": "3+(1)"},
+            {"sector_start": "20", "sector_end": "120", "colour": "white", "character": "Iso", "period": "6", "sequence": ""},
+            {"sector_start": "120", "sector_end": "200", "colour": "green", "character": "Q", "period": "", "sequence": ""},
+        ],
+    },
+}
+
+
+def make_strips(configs=lc.DEFAULT_RINGS) -> list:
+    return [(SimulatedStrip(c.count, c.name), c) for c in configs]
+
+
+def expected_transitions(program, seconds: float) -> list[float]:
+    """Elapsed times at which the lit layers change, per the compiled timelines."""
+    out = []
+    e = 0.0
+    while True:
+        _, nxt = program.state(e)
+        if nxt > seconds:
+            return out
+        out.append(nxt)
+        e = nxt
+
+
+def transition_errors(frames, t0: float, expected: list[float]) -> list[float]:
+    """Signed error (s) of every shown frame after the first against the nearest expected transition."""
+    errors = []
+    if not expected:
+        return errors
+    for t, _ in list(frames)[1:]:
+        e = t - t0
+        i = bisect_left(expected, e)
+        nearest = min(expected[max(i - 1, 0) : i + 1], key=lambda x: abs(x - e))
+        errors.append(e - nearest)
+    return errors
+
+
+def run_player(cmd: dict, seconds: float, configs=lc.DEFAULT_RINGS, concurrent: bool = True) -> tuple[dict, list]:
+    strips = make_strips(configs)
+    player = lc.Player(strips, concurrent)
+
+    cpu0 = time.process_time()
+    program = player.play(cmd)
+    end = player.t0 + seconds
+    while True:
+        delay = player.update()
+        remaining = end - time.monotonic()
+        if remaining <= 0:
+            break
+        time.sleep(min(delay, remaining))
+    cpu = time.process_time() - cpu0
+    player.output.close()
+
+    strip = strips[0][0]
+    errors = transition_errors(strip.frames, player.t0, expected_transitions(program, seconds))
+    result = summarize(strips, seconds, cpu, errors)
+    result["frame_stats"] = player.stats.snapshot()
+    return result, strips
+
+
+def legacy_loop(cmd: dict, seconds: float, configs=lc.DEFAULT_RINGS) -> dict:
+    """The controller loop before the scheduler: re-render and show() every ring every 10 ms."""
+    strips = make_strips(configs)
+    period = float(cmd.get("period_s", 3.0) or 3.0)
+    on_fraction = float(cmd.get("on_fraction", 0.18) or 0.18)
+    sectors = cmd.get("sectors", []) or []
+
+    cpu0 = time.process_time()
+    t0 = time.monotonic()
+    while time.monotonic() - t0 < seconds:
+        rings = []
+        for _, c in strips:
+            n = c.count
+            pixels = [lc.OFF] * n
+            if not sectors:
+                pixels = [lc.parse_colour(cmd.get("main_colour", ""))] * n
+            for sec in sectors:
+                lc.fill_sector(pixels, n, sec.get("sector_start", ""), sec.get("sector_end", ""), lc.parse_colour(sec.get("colour", "")))
+            rings.append(pixels)
+        gate = lc.blink_gate((time.monotonic() - t0) % period, period * on_fraction)
+        for (strip, c), pixels in zip(strips, rings):
+            for i in range(c.count):
+                strip.setPixelColor(i, pixels[i] if gate >= 0.5 else lc.OFF)
+            strip.show()
+        time.sleep(0.01)
+    cpu = time.process_time() - cpu0
+    return summarize(strips, seconds, cpu, [])
+
+
+def summarize(strips, seconds: float, cpu: float, errors: list[float]) -> dict:
+    shows = sum(s.show_calls for s, _ in strips)
+    frames = strips[0][0].show_calls
+    out = {
+        "show_calls": shows,
+        "fps": round(frames / seconds, 2),
+        "cpu_s": round(cpu, 4),
+        "cpu_pct": round(100 * cpu / seconds, 2),
+        "cpu_per_frame_us": round(1e6 * cpu / frames, 1) if frames else None,
+        "transitions": len(errors),
+    }
+    if errors:
+        abs_ms = sorted(abs(e) * 1000 for e in errors)
+        out["error_ms"] = {
+            "mean": round(statistics.fmean(e * 1000 for e in errors), 3),
+            "p50": round(abs_ms[len(abs_ms) // 2], 3),
+            "p95": round(abs_ms[min(len(abs_ms) - 1, int(0.95 * len(abs_ms)))], 3),
+            "max": round(abs_ms[-1], 3),
+        }
+    return out
+
+
+def load_commands(dataset: Path, keys: list[str]) -> dict:
+    rows = load_rows(dataset)
+    by_key = {r.get("key"): r for r in rows}
+    missing = [k for k in keys if k not in by_key]
+    if missing:
+        raise SystemExit(f"Not in {dataset}: {', '.join(missing)}")
+    return {k: lc.command_from_row(by_key[k]) for k in keys}
+
+
+def print_result(name: str, mode: str, r: dict):
+    line = f"{name:<12} {mode:<9} {r['show_calls']:6d} show() {r['fps']:7.2f} fps {r['cpu_pct']:6.2f}% cpu"
+    if r["cpu_per_frame_us"] is not None:
+        line += f" {r['cpu_per_frame_us']:8.1f} us/frame"
+    if "error_ms" in r:
+        e = r["error_ms"]
+        line += f"   transition error p50 {e['p50']:.2f} ms, p95 {e['p95']:.2f} ms, max {e['max']:.2f} ms"
+    print(line)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--seconds", type=float, default=5.0, help="Playback time per light")
+    ap.add_argument("--dataset", type=Path, help="data.rich.json to take --keys from")
+    ap.add_argument("--keys", nargs="+", default=[], help="Dataset keys to play instead of the built-in samples")
+    ap.add_argument("--config", type=Path, help="Ring configuration to simulate (default: the two built-in rings)")
+    ap.add_argument("--serial-show", action="store_true", help="show() the strips one after another")
+    ap.add_argument("--legacy", action="store_true", help="Also run the old 10 ms loop as a baseline")
+    ap.add_argument("--png", type=Path, help="Write the ring 1 timeline of the first light here")
+    ap.add_argument("--report", type=Path, help="Write the results as JSON")
+    ap.add_argument(
+        "--realtime", type=int, nargs="?", const=lc.REALTIME_PRIORITY, metavar="PRIORITY", help="Run under SCHED_FIFO"
+    )
+    ap.add_argument("--cpu", type=int, nargs="+", metavar="N", help="Pin the benchmark to these CPUs")
+    args = ap.parse_args(argv)
+
+    sched = set_realtime(args.realtime, args.cpu)
+    print(f"Scheduling: {sched}")
+
+    commands = load_commands(args.dataset, args.keys) if args.keys else SAMPLE_COMMANDS
+    configs = lc.load_ring_config(args.config)[0] if args.config else lc.DEFAULT_RINGS
+
+    results = []
+    for name, cmd in commands.items():
+        r, strips = run_player(cmd, args.seconds, configs, not args.serial_show)
+        print_result(name, "scheduler", r)
+        results.append({"name": name, "mode": "scheduler", **r})
+
+        if args.png and len(results) == 1:
+            write_png(args.png, strips[0][0], duration_s=args.seconds)
+            print(f"Timeline written: {args.png}")
+
+        if args.legacy:
+            r = legacy_loop(cmd, args.seconds, configs)
+            print_result(name, "legacy", r)
+            results.append({"name": name, "mode": "legacy", **r})
+
+    if args.report:
+        report = {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "sched": sched,
+            "rings": len(configs),
+            "seconds": args.seconds,
+            "results": results,
+        }
+        args.report.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Report written: {args.report}")
+
+
+if __name__ == "__main__":
+    main()
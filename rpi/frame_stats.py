@@ -0,0 +1,145 @@
+"""
+Frame timing metrics for the LED controller.
+
+The Player records three things per shown frame:
+
+  render_us      composing the frame (zero once the program cached it)
+  show_us        strip writes and show() for all rings
+  transition_us  when the frame was on the rings minus when the timeline
+                 scheduled the transition (positive = late)
+
+and, on a phase_sync follower, phase_us: its phase origin minus the
+leader's at every sync datagram, before correction.
+
+Each is a rolling window of the last STATS_WINDOW samples; snapshot() gives
+percentiles and a histogram over fixed microsecond buckets. The controller
+serves the snapshot on the command socket ({"op": "stats"}) and can write it
+to a file every few seconds (--stats-file).
+"""
+
+import json
+import os
+import tempfile
+import time
+from bisect import bisect_left
+from collections import deque
+from pathlib import Path
+
+# Samples per metric; a few hours of a busy light, seconds of the old 10 ms loop
+STATS_WINDOW = 4096
+
+# Histogram bucket upper bounds in microseconds; the last bucket is open
+BUCKETS_US = (50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000, 50000, 100000)
+
+
+class RollingHistogram:
+    """Last `window` samples of one metric, in microseconds."""
+
+    def __init__(self, window: int = STATS_WINDOW):
+        self.samples: deque[float] = deque(maxlen=window)
+        self.total = 0  # samples since start, including the ones rolled out
+
+    def add(self, us: float):
+        self.samples.append(us)
+        self.total += 1
+
+    def snapshot(self) -> dict:
+        values = sorted(self.samples)
+        out = {"count": len(values), "total": self.total}
+        if not values:
+            return out
+
+        def pct(p: float) -> float:
+            return round(values[min(len(values) - 1, int(p * len(values)))], 1)
+
+        counts = [0] * (len(BUCKETS_US) + 1)
+        for v in values:
+            counts[bisect_left(BUCKETS_US, abs(v))] += 1
+        labels = [f"<={b}" for b in BUCKETS_US] + [f">{BUCKETS_US[-1]}"]
+
+        out.update(
+            mean=round(sum(values) / len(values), 1),
+            min=round(values[0], 1),
+            p50=pct(0.50),
+            p95=pct(0.95),
+            p99=pct(0.99),
+            max=round(values[-1], 1),
+            histogram=dict(zip(labels, counts)),
+        )
+        return out
+
+
+class FrameStats:
+    """Per-frame render, show and transition timing of one controller."""
+
+    def __init__(self, window: int = STATS_WINDOW):
+        self.started = time.time()
+        self.render = RollingHistogram(window)
+        self.show = RollingHistogram(window)
+        self.transition = RollingHistogram(window)
+        self.phase = RollingHistogram(window)
+        self.frames = 0
+        self.programs = 0
+        self.sched: dict = {}
+        self.sync: dict = {}
+
+    def record(self, render_s: float, show_s: float, late_s: float | None):
+        """One shown frame; late_s is None for frames that were not a scheduled transition."""
+        self.frames += 1
+        self.render.add(render_s * 1e6)
+        self.show.add(show_s * 1e6)
+        if late_s is not None:
+            self.transition.add(late_s * 1e6)
+
+    def snapshot(self) -> dict:
+        return {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "uptime_s": round(time.time() - self.started, 1),
+            "frames": self.frames,
+            "programs": self.programs,
+            "sched": self.sched,
+            "sync": self.sync,
+            "render_us": self.render.snapshot(),
+            "show_us": self.show.snapshot(),
+            "transition_us": self.transition.snapshot(),
+            "phase_us": self.phase.snapshot(),
+        }
+
+    def write(self, path: Path):
+        """Write the snapshot atomically, readers never see half a file."""
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self.snapshot(), f, indent=2)
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
+def set_realtime(priority: int | None, cpus: list[int] | None) -> dict:
+    """
+    Optionally switch this process to SCHED_FIFO at `priority` and pin it to
+    `cpus`. Returns what is in effect, including why a request did not apply.
+    """
+    out: dict = {}
+    if priority is not None:
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+        except (AttributeError, OSError) as e:
+            out["error_realtime"] = str(e)
+    if cpus:
+        try:
+            os.sched_setaffinity(0, set(cpus))
+        except (AttributeError, OSError) as e:
+            out["error_affinity"] = str(e)
+
+    try:
+        policy = os.sched_getscheduler(0)
+        out["policy"] = {os.SCHED_FIFO: "fifo", os.SCHED_RR: "rr"}.get(policy, "other")
+        out["priority"] = os.sched_getparam(0).sched_priority
+        out["cpus"] = sorted(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        out["policy"] = "unknown"
+    return out
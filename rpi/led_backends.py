@@ -0,0 +1,142 @@
+"""
+LED strip backends for led_controller.py.
+
+All backends take the same calls the controller makes on a PixelStrip:
+begin(), numPixels(), slice assignment of packed colours (strip[0:n] = ...)
+and show().
+
+  ws281x    the real rings through rpi_ws281x (Raspberry Pi, root)
+  sim       in-memory strip that records every shown frame with a timestamp
+  terminal  sim plus a live ANSI colour preview of the ring on stdout
+
+Recorded frames can be rendered to a PNG timeline with write_png().
+"""
+
+import struct
+import sys
+import time
+import zlib
+from collections import deque
+
+BACKENDS = ("ws281x", "sim", "terminal")
+
+# Frames kept by a simulated strip; about an hour of a busy light
+MAX_RECORDED_FRAMES = 100_000
+
+
+def Color(red: int, green: int, blue: int, white: int = 0) -> int:
+    """Same packing as rpi_ws281x.Color, without importing the hardware library."""
+    return (white << 24) | (red << 16) | (green << 8) | blue
+
+
+def unpack(col: int) -> tuple[int, int, int]:
+    return (col >> 16) & 0xFF, (col >> 8) & 0xFF, col & 0xFF
+
+
+class SimulatedStrip:
+    """Strip in memory. show() appends (monotonic time, pixels) to `frames`."""
+
+    def __init__(self, count: int, name: str = "", clock=time.monotonic, max_frames: int = MAX_RECORDED_FRAMES):
+        self.count = count
+        self.name = name
+        self.clock = clock
+        self.pixels = [0] * count
+        self.frames: deque[tuple[float, tuple]] = deque(maxlen=max_frames)
+        self.show_calls = 0
+
+    def begin(self):
+        pass
+
+    def numPixels(self) -> int:
+        return self.count
+
+    def setPixelColor(self, i: int, col: int):
+        self.pixels[i] = col
+
+    def __setitem__(self, pos, value):
+        if isinstance(pos, slice):
+            for k, i in enumerate(range(*pos.indices(self.count))):
+                self.pixels[i] = value[k]
+        else:
+            self.pixels[pos] = value
+
+    def __getitem__(self, pos):
+        return self.pixels[pos]
+
+    def show(self):
+        self.show_calls += 1
+        self.frames.append((self.clock(), tuple(self.pixels)))
+
+
+class TerminalStrip(SimulatedStrip):
+    """Simulated strip that also redraws one line of coloured blocks per show()."""
+
+    def __init__(self, count: int, name: str = "", out=sys.stdout, **kw):
+        super().__init__(count, name, **kw)
+        self.out = out
+
+    def show(self):
+        super().show()
+        cells = "".join("\x1b[38;2;{};{};{}m●".format(*unpack(c)) for c in self.pixels)
+        self.out.write(f"\r{self.name:>6} {cells}\x1b[0m ")
+        self.out.flush()
+
+
+def open_strip(
+    backend: str,
+    count: int,
+    pin: int,
+    dma: int,
+    channel: int,
+    brightness: int = 255,
+    freq_hz: int = 800000,
+    invert: bool = False,
+    name: str = "",
+):
+    """Create and begin() a strip on the given backend."""
+    if backend == "ws281x":
+        from rpi_ws281x import PixelStrip
+
+        strip = PixelStrip(count, pin, freq_hz, dma, invert, brightness, channel)
+    elif backend == "sim":
+        strip = SimulatedStrip(count, name)
+    elif backend == "terminal":
+        strip = TerminalStrip(count, name)
+    else:
+        raise ValueError(f"Unknown LED backend: {backend!r}")
+    strip.begin()
+    return strip
+
+
+def write_png(path, strip: SimulatedStrip, step_s: float = 0.02, duration_s: float | None = None, scale: int = 8):
+    """
+    Timeline of a simulated strip as a PNG: one column per LED, one row per
+    `step_s` of playback, each row showing the frame on the strip at that time.
+    """
+    frames = list(strip.frames)
+    if not frames:
+        raise ValueError("No frames recorded")
+    t0 = frames[0][0]
+    end = t0 + duration_s if duration_s is not None else frames[-1][0] + step_s
+    rows_n = max(1, int((end - t0) / step_s))
+
+    raw = bytearray()
+    k = 0
+    for row in range(rows_n):
+        t = t0 + row * step_s
+        while k + 1 < len(frames) and frames[k + 1][0] <= t:
+            k += 1
+        line = b"".join(bytes(unpack(c)) * scale for c in frames[k][1])
+        raw += b"\0" + line
+
+    width = strip.count * scale
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+    png = b"\x89PNG\r\n\x1a\n"
+    png += chunk(b"IHDR", struct.pack(">IIBBBBB", width, rows_n, 8, 2, 0, 0, 0))
+    png += chunk(b"IDAT", zlib.compress(bytes(raw), 9))
+    png += chunk(b"IEND", b"")
+    with open(path, "wb") as f:
+        f.write(png)
@@ -0,0 +1,152 @@
+"""
+Command channel between the Streamlit UI and led_controller.py.
+
+The controller listens on a Unix domain socket. A client connects, sends one
+JSON request line and reads one JSON reply line:
+
+    {"op": "play", "cmd": {...}}   ->  {"ok": true, "program": "<hash>", "error": null}
+    {"op": "stop"}                 ->  {"ok": true, "program": null, "error": null}
+    {"op": "stats"}                ->  {"ok": true, ..., "stats": {...}}  (see frame_stats.py)
+
+The last command is also kept in CMD_PATH (written atomically), so a
+restarted controller resumes it and a controller started with
+--channel file can still poll the file.
+
+The socket is only open to the controller's user and SOCKET_GROUP; the
+user running the UI must be in that group.
+"""
+
+import json
+import os
+import shutil
+import socket
+import tempfile
+from pathlib import Path
+
+SOCKET_PATH = Path("/tmp/lighthouse_cmd.sock")
+CMD_PATH = Path("/tmp/lighthouse_cmd.json")
+SOCKET_GROUP = "lighthouse"
+
+# Requests are a single command, a few KB at most
+MAX_REQUEST_BYTES = 1 << 20
+CLIENT_TIMEOUT_S = 2.0
+# Clients send their request right after connecting. The controller reads it
+# between frames, so a client that stalls may hold up the LEDs only this long
+SERVER_READ_TIMEOUT_S = 0.05
+# Connections served per handle() call; the rest wait for the next one
+MAX_PENDING = 8
+
+
+def write_command_file(cmd: dict | None, path: Path = CMD_PATH):
+    """Replace the command file atomically, so the controller never reads half a command."""
+    if cmd is None:
+        path.unlink(missing_ok=True)
+        return
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(cmd, f)
+        # The controller runs as root, the UI as a normal user
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def request(req: dict, path: Path = SOCKET_PATH, timeout: float = CLIENT_TIMEOUT_S) -> dict:
+    """Send one request to the controller and return its reply. Raises OSError if it is not reachable."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(str(path))
+        sock.sendall(json.dumps(req).encode("utf-8") + b"\n")
+        reply = _read_line(sock)
+    if reply is None:
+        raise ConnectionError("Controller closed the connection without a reply")
+    return json.loads(reply)
+
+
+def send_command(cmd: dict | None, socket_path: Path = SOCKET_PATH, cmd_path: Path = CMD_PATH) -> dict:
+    """
+    Play `cmd` (None = stop). The reply is the controller's acknowledgement,
+    or {"ok": False, "fallback": "file"} if it is not reachable. The command
+    file is still written then, but nothing plays it until the controller
+    starts (or if it runs with --channel file). Commands the controller
+    rejects are not kept.
+    """
+    req = {"op": "play", "cmd": cmd} if cmd is not None else {"op": "stop"}
+    try:
+        ack = request(req, socket_path)
+    except (OSError, ValueError) as e:
+        write_command_file(cmd, cmd_path)
+        return {"ok": False, "program": None, "error": f"Controller not reachable ({e})", "fallback": "file"}
+    if ack.get("ok"):
+        write_command_file(cmd, cmd_path)
+    return ack
+
+
+def _read_line(sock: socket.socket) -> bytes | None:
+    buf = bytearray()
+    while b"\n" not in buf:
+        chunk = sock.recv(65536)
+        if not chunk:
+            break
+        buf += chunk
+        if len(buf) > MAX_REQUEST_BYTES:
+            raise ValueError("Request too large")
+    line = bytes(buf).split(b"\n", 1)[0]
+    return line or None
+
+
+class CommandServer:
+    """
+    Listening side of the channel. The controller puts it in its select()
+    set (it has a fileno()) and calls handle() when it is readable.
+
+    The socket is created with mode 0660 and given to `group` if that group
+    exists; `group_error` says why it was not.
+    """
+
+    def __init__(self, path: Path = SOCKET_PATH, group: str | None = SOCKET_GROUP):
+        self.path = path
+        self.group_error = None
+        path.unlink(missing_ok=True)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.bind(str(path))
+        os.chmod(path, 0o660)
+        if group:
+            try:
+                shutil.chown(path, group=group)
+            except (LookupError, OSError) as e:
+                self.group_error = f"{path} not given to group {group!r} ({e})"
+        self.sock.listen(MAX_PENDING)
+        self.sock.setblocking(False)
+
+    def fileno(self) -> int:
+        return self.sock.fileno()
+
+    def handle(self, handler):
+        """Serve up to MAX_PENDING pending connections: reply = handler(request dict)."""
+        for _ in range(MAX_PENDING):
+            try:
+                conn, _ = self.sock.accept()
+            except BlockingIOError:
+                return
+            with conn:
+                conn.settimeout(SERVER_READ_TIMEOUT_S)
+                try:
+                    line = _read_line(conn)
+                    if line is None:
+                        continue
+                    try:
+                        reply = handler(json.loads(line))
+                    except Exception as e:
+                        reply = {"ok": False, "program": None, "error": f"{type(e).__name__}: {e}"}
+                    conn.sendall(json.dumps(reply).encode("utf-8") + b"\n")
+                except (OSError, ValueError):
+                    # client went away or sent garbage; nothing to reply to
+                    continue
+
+    def close(self):
+        self.sock.close()
+        self.path.unlink(missing_ok=True)
@@ -1,14 +1,38 @@
+import argparse
+import hashlib
 import json
+import math
 import os
+import select
+import signal
+import sys
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import NamedTuple
 
-from rpi_ws281x import PixelStrip, Color
+import numpy as np
+
+import led_channel
+import phase_sync
+from frame_stats import FrameStats, set_realtime
+from led_backends import BACKENDS, Color, open_strip, write_png
+from light_sequence import Timeline, compile_timeline
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+# Light tag helpers are shared with the dataset builder
+sys.path.insert(0, str(REPO_ROOT / "server" / "scripts"))
+from seamark import parse_float  # noqa: E402
 
 # ======================
 # HARDWARE CONFIG
 # ======================
-# Two rings, both 22 LEDs
+# Rings are read from RING_CONFIG_PATH (see load_ring_config and
+# rings.example.json); without it, these two 22 LED rings are used
+RING_CONFIG_PATH = Path(__file__).resolve().parent / "rings.json"
+
 LED1_COUNT = 22
 LED1_PIN = 18
 LED1_DMA = 10
@@ -22,42 +46,151 @@ LED2_CHANNEL = 1
 LED_FREQ_HZ = 800000
 LED_INVERT = False
 
-# Default brightness (can be overridden by command)
+# One ring of the installation. offset is the LED index at the ring's 0°,
+# heading the compass bearing that 0° points to, sectors the indices of the
+# command's sectors the ring shows (None = all of them).
+class RingConfig(NamedTuple):
+    name: str
+    count: int
+    pin: int
+    dma: int
+    channel: int
+    offset: int = 0
+    heading: float = 0.0
+    sectors: tuple | None = None
+
+    @property
+    def geometry(self) -> "Geometry":
+        return Geometry(self.count, self.offset, self.heading, self.sectors)
+
+# What a frame depends on; rings with the same geometry share rendered frames
+class Geometry(NamedTuple):
+    count: int
+    offset: int
+    heading: float
+    sectors: tuple | None
+
+DEFAULT_RINGS = (
+    RingConfig("ring1", LED1_COUNT, LED1_PIN, LED1_DMA, LED1_CHANNEL),
+    RingConfig("ring2", LED2_COUNT, LED2_PIN, LED2_DMA, LED2_CHANNEL),
+)
+
+def load_ring_config(path: Path) -> tuple[list[RingConfig], bool]:
+    """
+    (rings, concurrent show) from a JSON file like
+
+        {"concurrent_show": true,
+         "rings": [{"name": "north", "count": 22, "pin": 18, "dma": 10, "channel": 0,
+                    "offset": 5, "heading": 0, "sectors": [0, 1]}, ...]}
+
+    A missing file gives DEFAULT_RINGS. Raises ValueError on a bad config.
+    """
+    if not path.exists():
+        return list(DEFAULT_RINGS), True
+    data = json.loads(path.read_text(encoding="utf-8"))
+    rings = []
+    for i, r in enumerate(data.get("rings") or []):
+        try:
+            sectors = r.get("sectors")
+            ring = RingConfig(
+                name=str(r.get("name") or f"ring{i + 1}"),
+                count=int(r["count"]),
+                pin=int(r["pin"]),
+                dma=int(r["dma"]),
+                channel=int(r["channel"]),
+                offset=int(r.get("offset", 0)),
+                heading=float(r.get("heading", 0.0)),
+                sectors=None if sectors is None else tuple(int(x) for x in sectors),
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"{path}: ring {i + 1}: {e!r}") from None
+        if ring.count <= 0:
+            raise ValueError(f"{path}: ring {i + 1}: count must be positive")
+        rings.append(ring)
+    if not rings:
+        raise ValueError(f"{path}: no rings")
+    return rings, bool(data.get("concurrent_show", True))
+
+# Default brightness (can be overridden by command). Brightness and gamma
+# are applied through a lookup table, the strips themselves run at full scale.
 DEFAULT_BRIGHTNESS = 160
+STRIP_BRIGHTNESS = 255
+# 1.0 keeps the colours as tuned on the hardware; ~2.2 gives perceptually even steps
+GAMMA = 1.0
 
-# Where Streamlit writes the command
-CMD_PATH = Path("/tmp/lighthouse_cmd.json")
+# Where Streamlit sends the command (see led_channel.py); the file keeps the
+# last command and is polled only when the socket cannot be used
+SOCKET_PATH = led_channel.SOCKET_PATH
+CMD_PATH = led_channel.CMD_PATH
+
+# Longest sleep between two looks at the command file in file mode. The
+# rings themselves are only touched at on/off transitions.
+CMD_POLL_S = 0.1
+
+# Compiled programs kept for recently played commands
+PROGRAM_CACHE_SIZE = 8
+
+# Frame rate while crossfading between two programs
+FADE_FPS = 50
+
+# How often --stats-file is rewritten, and the SCHED_FIFO priority --realtime uses
+STATS_INTERVAL_S = 5.0
+REALTIME_PRIORITY = 50
 
 OFF = Color(0, 0, 0)
 
 # ======================
 # COLOR HELPERS
 # ======================
-def parse_colour(c: str) -> Color:
+# common OSM/Seamark values: white, red, green, yellow
+COLOUR_RGB = {
+    "white": (255, 255, 255),
+    "w": (255, 255, 255),
+    "red": (255, 0, 0),
+    "r": (255, 0, 0),
+    "green": (0, 255, 0),
+    "g": (0, 255, 0),
+    # yellow looks strong; slightly warmer amber
+    "yellow": (255, 180, 0),
+    "y": (255, 180, 0),
+}
+
+# fallback: orange (your chosen look)
+FALLBACK_RGB = (255, 45, 0)
+
+def parse_rgb(c: str, fallback=FALLBACK_RGB) -> tuple[int, int, int]:
     v = (c or "").strip().lower()
-    # common OSM/Seamark values: white, red, green, yellow
-    if v in ("white", "w"):
-        return Color(255, 255, 255)
-    if v in ("red", "r"):
-        return Color(255, 0, 0)
-    if v in ("green", "g"):
-        return Color(0, 255, 0)
-    if v in ("yellow", "y"):
-        # yellow looks strong; slightly warmer amber
-        return Color(255, 180, 0)
-    # fallback: orange (your chosen look)
-    return Color(255, 45, 0)
+    return COLOUR_RGB.get(v, tuple(fallback))
+
+def parse_colour(c: str) -> Color:
+    return Color(*parse_rgb(c))
 
 def clamp01(x: float) -> float:
     return 0.0 if x < 0 else (1.0 if x > 1.0 else x)
 
-def scale_color(col: Color, scale: float) -> Color:
-    # rpi_ws281x Color packs GRB internally, but we cannot unpack safely here.
-    # Instead we scale by selecting typical channels via construction.
-    # We only use a few fixed colors, so approximate scaling:
-    # Use per-color presets by mapping based on identity is hard.
-    # Practical approach: rebuild from intended RGB values in command (see below).
-    return col
+def brightness_lut(brightness_0_255: int, gamma: float = GAMMA) -> np.ndarray:
+    """Channel value -> output value with gamma and brightness applied."""
+    b = clamp01(brightness_0_255 / 255.0)
+    x = np.arange(256) / 255.0
+    return np.round(255.0 * x**gamma * b).astype(np.uint8)
+
+def pack_rgb(rgb: np.ndarray) -> np.ndarray:
+    """(n, 3) uint8 RGB -> n packed values, same layout as Color()."""
+    rgb = rgb.astype(np.uint32)
+    return (rgb[:, 0] << 16) | (rgb[:, 1] << 8) | rgb[:, 2]
+
+def blend_frames(a: tuple | None, b: tuple | None, k: float, sizes: tuple) -> tuple:
+    """Packed frame k of the way from a to b (either None = dark), per ring geometry."""
+    out = []
+    for g, n in enumerate(sizes):
+        rgb = np.zeros((2, n, 3))
+        for j, frame in enumerate((a, b)):
+            if frame:
+                packed = np.array(frame[g], dtype=np.uint32)
+                rgb[j] = np.stack([(packed >> 16) & 0xFF, (packed >> 8) & 0xFF, packed & 0xFF], axis=1)
+        mixed = np.round(rgb[0] * (1.0 - k) + rgb[1] * k).astype(np.uint8)
+        out.append(tuple(pack_rgb(mixed).tolist()))
+    return tuple(out)
 
 # ======================
 # RING / SECTOR MAPPING
@@ -67,51 +200,51 @@ def deg_to_idx(deg: float, n: int) -> int:
     d = deg % 360.0
     return int((d / 360.0) * n) % n
 
-def fill_sector(pixels, n, start_deg, end_deg, col):
+def sector_indices(n, start_deg, end_deg) -> list[int]:
     """
-    Fill inclusive sector on a ring.
+    Pixels of an inclusive sector on a ring.
     Handles wrap-around (e.g. 300..40).
     """
     try:
         s = float(start_deg)
         e = float(end_deg)
     except Exception:
-        return
+        return []
 
     s_idx = deg_to_idx(s, n)
     e_idx = deg_to_idx(e, n)
 
     if s_idx == e_idx:
         # could mean very small or full ring; assume small and set one
-        pixels[s_idx] = col
-        return
-
+        return [s_idx]
     if s_idx < e_idx:
-        for i in range(s_idx, e_idx + 1):
-            pixels[i] = col
-    else:
-        # wrap
-        for i in range(s_idx, n):
-            pixels[i] = col
-        for i in range(0, e_idx + 1):
-            pixels[i] = col
-
-def render_sectors(n, sectors, default_col):
-    # base ring is dark/off unless sectors specify
-    pixels = [OFF for _ in range(n)]
-    if not sectors:
-        # no sector data, fill whole ring with default color
-        for i in range(n):
-            pixels[i] = default_col
-        return pixels
-
-    # If sectors exist, paint them
-    for s in sectors:
-        col = parse_colour(s.get("colour", "")) or default_col
-        start_deg = s.get("sector_start", "")
-        end_deg = s.get("sector_end", "")
-        fill_sector(pixels, n, start_deg, end_deg, col)
-    return pixels
+        return list(range(s_idx, e_idx + 1))
+    # wrap
+    return list(range(s_idx, n)) + list(range(0, e_idx + 1))
+
+def fill_sector(pixels, n, start_deg, end_deg, col):
+    for i in sector_indices(n, start_deg, end_deg):
+        pixels[i] = col
+
+def render_layer(geom: Geometry, sector, rgb, shown: bool = True) -> tuple[np.ndarray, np.ndarray]:
+    """
+    One sector (or, with sector None, the whole ring) in unscaled RGB, turned
+    by the ring's heading and LED offset; nothing lit if the ring does not
+    show it. Returns (lit mask, (n, 3) uint8 colours).
+    """
+    n = geom.count
+    lit = np.zeros(n, dtype=bool)
+    if shown and sector is None:
+        lit[:] = True
+    elif shown:
+        start = parse_float(sector.get("sector_start")) - geom.heading
+        end = parse_float(sector.get("sector_end")) - geom.heading
+        lit[sector_indices(n, start, end)] = True
+    if geom.offset:
+        lit = np.roll(lit, geom.offset)
+    colours = np.zeros((n, 3), dtype=np.uint8)
+    colours[lit] = rgb
+    return lit, colours
 
 # ======================
 # BLINK ENGINE
@@ -124,100 +257,516 @@ def blink_gate(t_in_period: float, on_fraction: float) -> float:
     on_time = max(0.05, on_fraction)  # ensure some visible on time
     return 1.0 if t_in_period < on_time else 0.0
 
-def apply_brightness_rgb(rgb, brightness_0_255: int) -> Color:
-    b = clamp01(brightness_0_255 / 255.0)
-    r = int(rgb[0] * b)
-    g = int(rgb[1] * b)
-    bl = int(rgb[2] * b)
-    return Color(r, g, bl)
+def gate_timeline(period: float, on_time: float) -> Timeline:
+    """Timeline of blink_gate: on for on_time (at least 50 ms) at the start of each period."""
+    on_time = max(0.05, on_time)
+    if on_time >= period:
+        return Timeline(period, (0.0,))
+    return Timeline(period, (0.0, on_time))
 
-def color_to_rgb_like(col: Color):
-    # We do not unpack Color safely; instead we keep RGB in command for scaling.
-    return (255, 45, 0)
+# ======================
+# COMPILED PROGRAMS
+# ======================
+class Program(NamedTuple):
+    """
+    Everything playback needs for one command, computed once. Each layer (a
+    sector, or the whole ring for a light without sectors) blinks on its own
+    timeline; the frame for a set of lit layers is composed on first use.
+    """
+    hash: str
+    timelines: tuple  # Timeline per layer
+    layers: tuple  # per layer, (lit mask, unscaled RGB) of each ring geometry
+    lut: np.ndarray  # gamma + brightness
+    frames: dict  # lit layer bitmask -> packed pixels per ring geometry
+
+    def state(self, elapsed: float) -> tuple[int, float]:
+        """(bitmask of lit layers, elapsed time of the next transition)."""
+        mask = 0
+        nxt = math.inf
+        for i, tl in enumerate(self.timelines):
+            on, change = tl.state(elapsed)
+            if on:
+                mask |= 1 << i
+            if change < nxt:
+                nxt = change
+        return mask, nxt
+
+    def frame(self, mask: int) -> tuple | None:
+        """Packed pixels per ring geometry for the lit layers in `mask`, None if all are dark."""
+        if not mask:
+            return None
+        frame = self.frames.get(mask)
+        if frame is None:
+            rings = []
+            for r, (_, base) in enumerate(self.layers[0]):
+                rgb = np.zeros_like(base)
+                # Later sectors paint over earlier ones
+                for i, layer in enumerate(self.layers):
+                    if mask >> i & 1:
+                        lit, colours = layer[r]
+                        rgb[lit] = colours[lit]
+                # Brightness for every sector in one table lookup, then pack
+                rings.append(tuple(pack_rgb(self.lut[rgb]).tolist()))
+            frame = self.frames[mask] = tuple(rings)
+        return frame
+
+    def warm(self, max_transitions: int = 256):
+        """Render the frames of the first cycle of the longest timeline ahead of playback."""
+        horizon = max(tl.period for tl in self.timelines)
+        e = 0.0
+        for _ in range(max_transitions):
+            mask, nxt = self.state(e)
+            self.frame(mask)
+            if nxt >= horizon:
+                return
+            e = nxt
+
+def command_hash(cmd: dict) -> str:
+    payload = json.dumps(cmd, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+def has_sector_bounds(sector: dict) -> bool:
+    return parse_float(sector.get("sector_start")) is not None and parse_float(sector.get("sector_end")) is not None
+
+def compile_program(cmd: dict, geometries: tuple | None = None, cmd_hash: str | None = None) -> Program:
+    # Read parameters
+    period = float(cmd.get("period_s", 3.0) or 3.0)
+    on_fraction = float(cmd.get("on_fraction", 0.18) or 0.18)  # 18% on-time
+    brightness = int(cmd.get("brightness", DEFAULT_BRIGHTNESS) or DEFAULT_BRIGHTNESS)
+
+    default_rgb = cmd.get("default_rgb", FALLBACK_RGB)
+
+    sectors = cmd.get("sectors", []) or []
+
+    # Main light: its sequence or character, else the plain on_fraction gate
+    main_timeline = compile_timeline(cmd.get("main_character", ""), cmd.get("main_sequence", ""), period)
+    if main_timeline is None:
+        main_timeline = gate_timeline(period, period * on_fraction)
+
+    # Sector base colours in unscaled RGB; unknown colours use default_rgb
+    rings = geometries or tuple(dict.fromkeys(r.geometry for r in DEFAULT_RINGS))
+    if not sectors:
+        timelines = [main_timeline]
+        rgb = parse_rgb(cmd.get("main_colour", ""), default_rgb)
+        layers = [tuple(render_layer(g, None, rgb) for g in rings)]
+    else:
+        timelines = []
+        layers = []
+        for i, sec in enumerate(sectors):
+            # A numbered light without sector bounds lights the whole ring
+            rgb = parse_rgb(sec.get("colour", ""), default_rgb)
+            paint = sec if has_sector_bounds(sec) else None
+            layers.append(tuple(render_layer(g, paint, rgb, g.sectors is None or i in g.sectors) for g in rings))
+
+            sec_period = parse_float(sec.get("period")) or period
+            tl = compile_timeline(sec.get("character", ""), sec.get("sequence", ""), sec_period)
+            timelines.append(tl or main_timeline)
+
+    return Program(cmd_hash or command_hash(cmd), tuple(timelines), tuple(layers), brightness_lut(brightness), {})
+
+def command_from_row(row: dict, brightness: int = DEFAULT_BRIGHTNESS) -> dict:
+    """Command for a data.rich.json row, same fields as the UI sends."""
+    return {
+        "id": row.get("key", ""),
+        "period_s": float(row.get("main_period") or 3.0),
+        "brightness": int(brightness),
+        "main_colour": str(row.get("main_colour") or row.get("color") or "").lower(),
+        "main_character": row.get("main_character") or "",
+        "main_sequence": row.get("main_sequence") or row.get("sequence") or "",
+        "sectors": [
+            {
+                "sector_start": s.get("ss", ""),
+                "sector_end": s.get("se", ""),
+                "colour": s.get("c", ""),
+                "sequence": s.get("q", ""),
+                "period": s.get("p") if s.get("p") is not None else "",
+                "character": s.get("ch", ""),
+            }
+            for s in row.get("sectors") or []
+        ],
+    }
+
+def compile_row(row: dict, geometries: tuple, brightness: int | None = None) -> Program:
+    """Compiled program for a dataset row with its first frames already rendered."""
+    program = compile_program(command_from_row(row, brightness or DEFAULT_BRIGHTNESS), geometries)
+    program.warm()
+    return program
+
+class ProgramCache:
+    """Small LRU of compiled programs for one set of ring geometries, keyed by command hash."""
+
+    def __init__(self, geometries: tuple | None = None, size: int = PROGRAM_CACHE_SIZE):
+        self.geometries = geometries
+        self.size = size
+        self._programs: OrderedDict[str, Program] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, cmd: dict) -> Program:
+        h = command_hash(cmd)
+        program = self._programs.get(h)
+        if program is not None:
+            self._programs.move_to_end(h)
+            self.hits += 1
+            return program
+
+        program = compile_program(cmd, self.geometries, h)
+        self.misses += 1
+        self._programs[h] = program
+        if len(self._programs) > self.size:
+            self._programs.popitem(last=False)
+        return program
+
+# ======================
+# PLAYBACK
+# ======================
+def push(strip, n, pixels):
+    # One slice assignment for the whole ring instead of a call per pixel
+    strip[0:n] = pixels or (OFF,) * n
+    strip.show()
+
+class RingOutput:
+    """
+    Writes frames to the strips. Strips on different DMA channels are
+    independent and show() in parallel; strips sharing one go in order.
+    """
+
+    def __init__(self, rings, geometries: tuple, concurrent: bool = True):
+        groups: dict[int, list] = {}
+        for strip, cfg in rings:
+            groups.setdefault(cfg.dma, []).append((strip, cfg.count, geometries.index(cfg.geometry)))
+        self.groups = list(groups.values())
+        self.pool = ThreadPoolExecutor(len(self.groups)) if concurrent and len(self.groups) > 1 else None
+
+    @staticmethod
+    def _push_group(group, frame):
+        for strip, n, g in group:
+            push(strip, n, frame[g] if frame else None)
+
+    def push(self, frame: tuple | None):
+        """Show `frame` (packed pixels per geometry, None = off) on every strip."""
+        if self.pool is None:
+            for group in self.groups:
+                self._push_group(group, frame)
+            return
+        for f in [self.pool.submit(self._push_group, group, frame) for group in self.groups]:
+            f.result()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+
+class Player:
+    """Current program on the rings; update() pushes a frame only when the lit layers change."""
+
+    def __init__(self, rings, concurrent: bool = True):
+        self.rings = rings  # [(strip, RingConfig)]
+        # Frames are rendered once per distinct geometry, not per ring
+        self.geometries = tuple(dict.fromkeys(cfg.geometry for _, cfg in rings))
+        self.output = RingOutput(rings, self.geometries, concurrent)
+        self.cache = ProgramCache(self.geometries)
+        self.program = None
+        self.cmd = None  # command of the program, if it came from one
+        self.t0 = time.monotonic()
+        self.shown = None  # lit layer bitmask on the rings, None = must redraw
+        self.due = None  # monotonic time of the next scheduled transition
+        self.fade = None  # (previous program, its t0, fade start, fade seconds)
+        self.stats = FrameStats()
+
+    def play(self, cmd: dict | None, fade_s: float = 0.0) -> Program | None:
+        """Switch to `cmd` (None = off). Raises if the command cannot be compiled."""
+        return self.play_program(self.cache.get(cmd) if cmd else None, fade_s, cmd)
+
+    def play_program(self, program: Program | None, fade_s: float = 0.0, cmd: dict | None = None) -> Program | None:
+        """Switch to an already compiled program, crossfading over fade_s seconds if given."""
+        now = time.monotonic()
+        self.fade = (self.program, self.t0, now, fade_s) if fade_s > 0 else None
+        self.program = program
+        self.cmd = cmd if program is not None else None
+        self.shown = None
+        self.due = None
+        if program is not None:
+            self.stats.programs += 1
+        # reset blink phase when new lighthouse selected
+        self.t0 = now
+        return program
+
+    def _frame_at(self, program: Program | None, t0: float, now: float) -> tuple | None:
+        if program is None:
+            return None
+        mask, _ = program.state(now - t0)
+        return program.frame(mask)
+
+    def _update_fade(self) -> float:
+        """One crossfade frame; both programs keep blinking on their own timelines."""
+        old, old_t0, start, duration = self.fade
+        now = time.monotonic()
+        k = (now - start) / duration
+        if k >= 1.0:
+            self.fade = None
+            return 0.0
+        t_render = time.perf_counter()
+        sizes = tuple(g.count for g in self.geometries)
+        frame = blend_frames(self._frame_at(old, old_t0, now), self._frame_at(self.program, self.t0, now), k, sizes)
+        t_show = time.perf_counter()
+        self.output.push(frame)
+        self.stats.record(t_show - t_render, time.perf_counter() - t_show, None)
+        return 1.0 / FADE_FPS
+
+    def update(self) -> float:
+        """Bring the rings up to date. Returns the seconds until the next transition."""
+        if self.fade is not None:
+            delay = self._update_fade()
+            if self.fade is not None:
+                return delay
+
+        if self.program is None:
+            mask, next_change = 0, math.inf
+        else:
+            # Lit layers: one bisect per sector timeline
+            mask, next_change = self.program.state(time.monotonic() - self.t0)
+
+        if mask != self.shown:
+            # A redraw after play() is not a transition of the timeline
+            due = self.due if self.shown is not None else None
+            t_render = time.perf_counter()
+            frame = self.program.frame(mask) if mask else None
+            t_show = time.perf_counter()
+            self.output.push(frame)
+            t_done = time.perf_counter()
+            late = time.monotonic() - due if due is not None else None
+            self.stats.record(t_show - t_render, t_done - t_show, late)
+            self.shown = mask
+
+        self.due = None if math.isinf(next_change) else self.t0 + next_change
+        return max(self.t0 + next_change - time.monotonic(), 0.0)
+
+    def handle_request(self, req: dict) -> dict:
+        """led_channel request -> acknowledgement with the applied program hash."""
+        op = req.get("op")
+        if op == "play":
+            program = self.play(req.get("cmd"))
+            return {"ok": True, "program": program.hash if program else None, "error": None}
+        if op == "stop":
+            self.play(None)
+            return {"ok": True, "program": None, "error": None}
+        if op == "stats":
+            program = self.program.hash if self.program else None
+            return {"ok": True, "program": program, "error": None, "stats": self.stats.snapshot()}
+        return {"ok": False, "program": None, "error": f"Unknown op: {op!r}"}
 
 # ======================
 # MAIN
 # ======================
-def main():
-    # Initialize strips with default brightness
-    strip1 = PixelStrip(LED1_COUNT, LED1_PIN, LED_FREQ_HZ, LED1_DMA, LED_INVERT, DEFAULT_BRIGHTNESS, LED1_CHANNEL)
-    strip2 = PixelStrip(LED2_COUNT, LED2_PIN, LED_FREQ_HZ, LED2_DMA, LED_INVERT, DEFAULT_BRIGHTNESS, LED2_CHANNEL)
-    strip1.begin()
-    strip2.begin()
+def read_command(last_sig):
+    """
+    Returns (changed, cmd, sig); cmd is None if there is no command file.
+    sig is (mtime_ns, inode): every atomic replace gets a new inode, so two
+    writes within the mtime granularity are still seen.
+    """
+    try:
+        st = CMD_PATH.stat()
+    except FileNotFoundError:
+        return last_sig is not None, None, None
+    sig = (st.st_mtime_ns, st.st_ino)
+    if sig == last_sig:
+        return False, None, last_sig
+    try:
+        with CMD_PATH.open("r", encoding="utf-8") as f:
+            return True, json.load(f), sig
+    except ValueError:
+        # malformed command, keep last good
+        return False, None, sig
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Play lighthouse light characters on the LED rings.")
+    ap.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default="ws281x",
+        help="ws281x drives the rings; sim and terminal run anywhere without root (see led_backends.py)",
+    )
+    ap.add_argument("--png", type=Path, help="With --backend sim/terminal: write a timeline of the first ring here on exit")
+    ap.add_argument("--config", type=Path, default=RING_CONFIG_PATH, help="Ring configuration (JSON, see load_ring_config)")
+    ap.add_argument(
+        "--channel",
+        choices=("socket", "file"),
+        default="socket",
+        help=f"Take commands on {SOCKET_PATH} (default) or by polling {CMD_PATH}",
+    )
+    ap.add_argument(
+        "--socket-group",
+        default=led_channel.SOCKET_GROUP,
+        help="Group that may send commands on the socket; the user running the UI must be in it",
+    )
+    ap.add_argument(
+        "--playlist", type=Path, help="Tour the lights of this playlist (JSON, see playlist.py); commands interrupt it"
+    )
+    ap.add_argument(
+        "--sync",
+        choices=("leader", "follower"),
+        help="Keep the phase of several controllers in step over UDP multicast (see phase_sync.py)",
+    )
+    ap.add_argument("--sync-group", default=phase_sync.SYNC_GROUP, help="Multicast group for --sync")
+    ap.add_argument("--sync-port", type=int, default=phase_sync.SYNC_PORT, help="UDP port for --sync")
+    ap.add_argument("--sync-iface", default="0.0.0.0", help="Local address of the interface for --sync (127.0.0.1 for tests)")
+    ap.add_argument("--stats-file", type=Path, help=f"Write frame timing stats here every {STATS_INTERVAL_S:g} s and on exit")
+    ap.add_argument(
+        "--realtime",
+        type=int,
+        nargs="?",
+        const=REALTIME_PRIORITY,
+        metavar="PRIORITY",
+        help=f"Run under SCHED_FIFO (default priority {REALTIME_PRIORITY}); needs root or CAP_SYS_NICE",
+    )
+    ap.add_argument("--cpu", type=int, nargs="+", metavar="N", help="Pin the controller to these CPUs")
+    return ap.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # Must run as root because ws281x uses /dev/mem on many setups
+    if args.backend == "ws281x" and os.geteuid() != 0:
+        print("Run with sudo: sudo env_lighthouse/bin/python led_controller.py (or use --backend sim)")
+        raise SystemExit(1)
+
+    try:
+        configs, concurrent = load_ring_config(args.config)
+    except ValueError as e:
+        print(f"Bad ring configuration: {e}")
+        raise SystemExit(1)
 
-    last_cmd_mtime = 0.0
-    cmd = None
+    # Initialize strips at full scale, brightness comes from the program LUT
+    rings = [
+        (
+            open_strip(args.backend, c.count, c.pin, c.dma, c.channel, STRIP_BRIGHTNESS, LED_FREQ_HZ, LED_INVERT, c.name),
+            c,
+        )
+        for c in configs
+    ]
+    player = Player(rings, concurrent)
 
-    # current animation state
-    t0 = time.monotonic()
+    tour = None
+    if args.playlist:
+        from playlist import PlaylistRunner, load_playlist
 
-    while True:
-        # Reload command if changed
         try:
-            st = CMD_PATH.stat()
-            if st.st_mtime > last_cmd_mtime:
-                last_cmd_mtime = st.st_mtime
-                with CMD_PATH.open("r", encoding="utf-8") as f:
-                    cmd = json.load(f)
-                # reset blink phase when new lighthouse selected
-                t0 = time.monotonic()
-        except FileNotFoundError:
-            cmd = None
-        except Exception:
-            # ignore malformed command, keep last good
-            pass
-
-        # If no command, keep off
-        if not cmd:
-            for i in range(LED1_COUNT):
-                strip1.setPixelColor(i, OFF)
-            for i in range(LED2_COUNT):
-                strip2.setPixelColor(i, OFF)
-            strip1.show()
-            strip2.show()
-            time.sleep(0.2)
-            continue
-
-        # Read parameters
-        period = float(cmd.get("period_s", 3.0) or 3.0)
-        on_fraction = float(cmd.get("on_fraction", 0.18) or 0.18)  # 18% on-time
-        brightness = int(cmd.get("brightness", DEFAULT_BRIGHTNESS) or DEFAULT_BRIGHTNESS)
-
-        default_rgb = cmd.get("default_rgb", [255, 45, 0])
-        default_col = apply_brightness_rgb(default_rgb, brightness)
-
-        sectors = cmd.get("sectors", []) or []
-
-        # Render sector base colors (unscaled RGB provided per sector if possible)
-        # If Streamlit sends only "colour", we map via parse_colour.
-        base1 = render_sectors(LED1_COUNT, sectors, parse_colour(cmd.get("main_colour", "")) or default_col)
-        base2 = render_sectors(LED2_COUNT, sectors, parse_colour(cmd.get("main_colour", "")) or default_col)
-
-        # Blink gate
-        now = time.monotonic()
-        t = (now - t0) % period
-        gate = blink_gate(t, period * on_fraction)
-
-        # Apply gate: when off, set all OFF
-        if gate < 0.5:
-            for i in range(LED1_COUNT):
-                strip1.setPixelColor(i, OFF)
-            for i in range(LED2_COUNT):
-                strip2.setPixelColor(i, OFF)
+            items, crossfade_s, loop = load_playlist(args.playlist, lambda row, b: compile_row(row, player.geometries, b))
+        except (OSError, ValueError) as e:
+            print(f"Bad playlist: {e}")
+            raise SystemExit(1)
+        tour = PlaylistRunner(player, items, crossfade_s, loop)
+
+    leader = follower = None
+    if args.sync == "leader":
+        leader = phase_sync.SyncLeader(player, args.sync_group, args.sync_port, args.sync_iface)
+    elif args.sync == "follower":
+        # A follower plays what the leader plays; its playlist only provides programs by hash
+        known = {item.program.hash: item.program for item in tour.items} if tour is not None else {}
+        tour = None
+        follower = phase_sync.SyncFollower(player, known, args.sync_group, args.sync_port, args.sync_iface)
+
+    def handle_request(req: dict) -> dict:
+        # A command from the UI takes over from the tour
+        if tour is not None and req.get("op") in ("play", "stop"):
+            tour.active = False
+        return player.handle_request(req)
+
+    player.stats.sched = set_realtime(args.realtime, args.cpu)
+    for key in ("error_realtime", "error_affinity"):
+        if key in player.stats.sched:
+            print(f"Scheduling not changed: {player.stats.sched[key]}")
+    next_stats = time.monotonic() + STATS_INTERVAL_S
+
+    server = None
+    if args.channel == "socket":
+        try:
+            server = led_channel.CommandServer(SOCKET_PATH, args.socket_group)
+        except OSError as e:
+            print(f"Cannot listen on {SOCKET_PATH} ({e}), polling {CMD_PATH} instead")
         else:
-            # show sector colors during "on"
-            for i in range(LED1_COUNT):
-                strip1.setPixelColor(i, base1[i])
-            for i in range(LED2_COUNT):
-                strip2.setPixelColor(i, base2[i])
+            if server.group_error:
+                print(f"Only {SOCKET_PATH.owner()} can send commands: {server.group_error}")
+
+    # Resume the last command; in file mode this is also the polling state.
+    # A tour starts from the command file as it is, without playing it.
+    cmd_sig = None
+    try:
+        changed, cmd, cmd_sig = read_command(cmd_sig)
+        if changed and tour is None:
+            player.play(cmd)
+    except Exception:
+        pass
+
+    def on_sigterm(signum, frame):
+        # systemd stops the service with SIGTERM; leave through the same
+        # cleanup as Ctrl+C so the rings are switched off
+        raise KeyboardInterrupt
+
+    try:
+        signal.signal(signal.SIGTERM, on_sigterm)
+    except ValueError:
+        # Not the main thread (main() run from a harness); the caller owns signals
+        pass
 
-        strip1.show()
-        strip2.show()
-        time.sleep(0.01)
+    try:
+        while True:
+            # The tour switches programs first, so the player draws the switch at once
+            switch = tour.update() if tour is not None else math.inf
+            delay = min(player.update(), switch)
+            if leader is not None:
+                delay = min(delay, leader.update())
+
+            if args.stats_file:
+                now = time.monotonic()
+                if now >= next_stats:
+                    player.stats.write(args.stats_file)
+                    next_stats = now + STATS_INTERVAL_S
+                delay = min(delay, next_stats - now)
+
+            if server is None:
+                # File fallback: look at the command file at least every CMD_POLL_S
+                delay = min(delay, CMD_POLL_S)
+
+            # Sleep until the next transition, a command or a sync datagram
+            waiting = [x for x in (server, follower) if x is not None]
+            readable, _, _ = select.select(waiting, [], [], None if math.isinf(delay) else delay)
+            if server in readable:
+                server.handle(handle_request)
+            if follower in readable:
+                follower.handle()
+            if server is not None:
+                continue
+
+            try:
+                changed, cmd, cmd_sig = read_command(cmd_sig)
+                if changed:
+                    if tour is not None:
+                        tour.active = False
+                    player.play(cmd)
+            except Exception:
+                # ignore malformed command, keep last good
+                pass
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if server is not None:
+            server.close()
+        # Leave the rings dark instead of frozen on the last frame
+        try:
+            player.output.push(None)
+        except Exception as e:
+            print(f"Could not switch the rings off: {e}")
+        player.output.close()
+        for sync in (leader, follower):
+            if sync is not None:
+                sync.close()
+        if args.stats_file:
+            player.stats.write(args.stats_file)
+        first = rings[0][0]
+        if args.png and hasattr(first, "frames") and first.frames:
+            write_png(args.png, first)
+            print(f"\nTimeline written: {args.png}")
 
 if __name__ == "__main__":
-    # Must run as root because ws281x uses /dev/mem on many setups
-    if os.geteuid() != 0:
-        print("Run with sudo: sudo env_lighthouse/bin/python led_controller.py")
-        raise SystemExit(1)
     main()
@@ -0,0 +1,203 @@
+"""
+Seamark light character and sequence compiler for the LED controller.
+
+seamark:light:sequence lists the on and off times of one period, eclipses
+in brackets: "1.5+(4),1.5+(13)" is on 1.5 s, off 4 s, on 1.5 s, off 13 s.
+compile_timeline() turns that, or without a sequence the character (Fl(2),
+Oc, Iso, Q, VQ, LFl, Mo(A), ...), into a Timeline of phase bounds, so
+playback needs one bisect per frame instead of any string parsing.
+"""
+
+import math
+import re
+from bisect import bisect_right
+from typing import NamedTuple
+
+# Durations used when a light has a character but no sequence
+FLASH_S = 0.5
+LONG_FLASH_S = 2.0
+FLASH_GAP_S = 1.0  # eclipse between flashes of a group
+GROUP_GAP_S = 3.0  # eclipse between groups of a composite group, Fl(2+1)
+ECLIPSE_S = 1.0  # occulting lights
+MORSE_DOT_S = 0.5
+MORSE_DASH_S = 1.5
+
+# Period when the tags give none
+DEFAULT_PERIODS = {"Fl": 5.0, "LFl": 10.0, "Oc": 5.0, "Iso": 4.0, "Mo": 8.0}
+
+# (flash, flash interval) of the quick classes: 60, 120 and 240 per minute
+QUICK = {"Q": (0.3, 1.0), "VQ": (0.2, 0.5), "UQ": (0.1, 0.25)}
+
+MORSE = {
+    "A": ".-", "B": "-...", "C": "-.-.", "D": "-..", "E": ".", "F": "..-.", "G": "--.",
+    "H": "....", "I": "..", "J": ".---", "K": "-.-", "L": ".-..", "M": "--", "N": "-.",
+    "O": "---", "P": ".--.", "Q": "--.-", "R": ".-.", "S": "...", "T": "-", "U": "..-",
+    "V": "...-", "W": ".--", "X": "-..-", "Y": "-.--", "Z": "--..",
+}
+
+_SEQUENCE_TOKEN = re.compile(r"\(\s*(\d*\.?\d+)\s*s?\s*\)|(\d*\.?\d+)")
+_CHARACTER = re.compile(r"^(?:Al\.)?\s*([A-Za-z]+)\.?\s*(?:\(([^)]*)\))?")
+
+
+class Timeline(NamedTuple):
+    """
+    On/off pattern repeating every `period` seconds. `bounds` are the phase
+    times within the period where the light toggles, starting with the first
+    switch on: on in [b0, b1), [b2, b3), ... One bound means always on, none
+    always off.
+    """
+
+    period: float
+    bounds: tuple
+
+    def state(self, elapsed: float) -> tuple[bool, float]:
+        """(on, elapsed time of the next transition) at `elapsed` seconds into playback."""
+        b = self.bounds
+        if len(b) < 2:
+            return len(b) == 1, math.inf
+        cycle, t = divmod(elapsed, self.period)
+        i = bisect_right(b, t)
+        base = cycle * self.period
+        while True:
+            nxt = base + b[i] if i < len(b) else base + self.period + b[0]
+            if nxt > elapsed:
+                return i % 2 == 1, nxt
+            # divmod can leave t just below a bound that base + bound rounds onto
+            if i < len(b):
+                i += 1
+            else:
+                base += self.period
+                i = 1
+
+
+ALWAYS_ON = Timeline(1.0, (0.0,))
+
+
+def parse_sequence(sequence: str) -> list[tuple[bool, float]] | None:
+    """"1.5+(4),1.5+(13)" -> [(True, 1.5), (False, 4.0), (True, 1.5), (False, 13.0)], None if unusable."""
+    phases = []
+    for m in _SEQUENCE_TOKEN.finditer(str(sequence or "")):
+        eclipse, light = m.groups()
+        phases.append((eclipse is None, float(light if eclipse is None else eclipse)))
+    if not phases or sum(d for _, d in phases) <= 0:
+        return None
+    return phases
+
+
+def timeline_from_phases(phases: list[tuple[bool, float]], period: float | None = None) -> Timeline:
+    """
+    Timeline of consecutive (on, duration) phases. If `period` is longer than
+    the phases, the remainder is dark; a shorter period is ignored.
+    """
+    total = sum(d for _, d in phases)
+    if period and period > total:
+        phases = phases + [(False, period - total)]
+        total = period
+
+    bounds: list[float] = []
+    t = 0.0
+    for on, d in phases:
+        if on and d > 0:
+            if bounds and bounds[-1] == t:
+                bounds[-1] = t + d
+            else:
+                bounds += [t, t + d]
+        t += d
+
+    if not bounds:
+        return Timeline(total, ())
+    if bounds[0] <= 0 and bounds[-1] >= total and len(bounds) == 2:
+        return Timeline(total, (0.0,))
+    return Timeline(total, tuple(bounds))
+
+
+def _fit(phases: list[tuple[bool, float]], period: float) -> list[tuple[bool, float]]:
+    """Scale phases down if they do not fit in 80% of the period."""
+    total = sum(d for _, d in phases)
+    if total <= 0.8 * period:
+        return phases
+    k = 0.8 * period / total
+    return [(on, d * k) for on, d in phases]
+
+
+def _groups(spec: str) -> list[int]:
+    """"2+1" -> [2, 1]; anything else (or nothing) -> [1]."""
+    out = []
+    for part in (spec or "").split("+"):
+        part = part.strip()
+        if part.isdigit() and int(part) > 0:
+            out.append(int(part))
+    return out or [1]
+
+
+def _flash_groups(groups: list[int], flash: float, gap: float) -> list[tuple[bool, float]]:
+    phases = []
+    for gi, n in enumerate(groups):
+        if gi:
+            phases.append((False, GROUP_GAP_S))
+        for i in range(n):
+            if i:
+                phases.append((False, gap))
+            phases.append((True, flash))
+    return phases
+
+
+def character_timeline(character: str, period: float | None = None) -> Timeline | None:
+    """Timeline for a light character without a sequence, None if the character is unknown."""
+    m = _CHARACTER.match(str(character or "").strip())
+    if not m:
+        return None
+    kind, spec = m.group(1), m.group(2) or ""
+
+    if kind in ("F", "Dir"):
+        return ALWAYS_ON
+
+    # Interrupted quick lights are played as their quick class
+    if kind in ("IQ", "IVQ", "IUQ"):
+        kind = kind[1:]
+    if kind in QUICK:
+        flash, interval = QUICK[kind]
+        if not spec:
+            return timeline_from_phases([(True, flash), (False, interval - flash)])
+        n = _groups(spec)[0]
+        phases = _flash_groups([n], flash, interval - flash)
+        return timeline_from_phases(phases, max(period or 0, n * interval + interval))
+
+    if kind in ("Fl", "LFl"):
+        period = period or DEFAULT_PERIODS[kind]
+        flash = LONG_FLASH_S if kind == "LFl" else FLASH_S
+        return timeline_from_phases(_fit(_flash_groups(_groups(spec), flash, FLASH_GAP_S), period), period)
+
+    if kind == "Oc":
+        period = period or DEFAULT_PERIODS["Oc"]
+        eclipses = _flash_groups(_groups(spec), ECLIPSE_S, ECLIPSE_S)
+        # Same pattern with light and dark swapped: short eclipses, long light
+        phases = [(not on, d) for on, d in _fit(eclipses, period)]
+        phases.append((True, period - sum(d for _, d in phases)))
+        return timeline_from_phases(phases)
+
+    if kind == "Iso":
+        period = period or DEFAULT_PERIODS["Iso"]
+        return timeline_from_phases([(True, period / 2), (False, period / 2)])
+
+    if kind == "Mo":
+        period = period or DEFAULT_PERIODS["Mo"]
+        code = "".join(MORSE.get(ch, "") for ch in spec.upper() if ch.isalpha())
+        if not code:
+            return None
+        phases = []
+        for i, sym in enumerate(code):
+            if i:
+                phases.append((False, MORSE_DOT_S))
+            phases.append((True, MORSE_DOT_S if sym == "." else MORSE_DASH_S))
+        return timeline_from_phases(_fit(phases, period), period)
+
+    return None
+
+
+def compile_timeline(character: str = "", sequence: str = "", period: float | None = None) -> Timeline | None:
+    """Timeline from the sequence if it has one, else from the character. None if neither is usable."""
+    phases = parse_sequence(sequence)
+    if phases is not None:
+        return timeline_from_phases(phases, period)
+    return character_timeline(character, period)
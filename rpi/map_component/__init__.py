@@ -0,0 +1,35 @@
+"""
+Leaflet map of the lights as a bidirectional Streamlit component.
+
+The frontend (frontend/index.html and app.js) is static, so there is no npm
+build; Streamlit serves the directory and the browser caches it. The value
+of the component is the last click, {"key": ..., "nonce": ...}, so the page
+reruns once per click and not at all while the map is idle. A new nonce
+marks a new click, also on the marker that was clicked last.
+"""
+
+from pathlib import Path
+
+import streamlit.components.v1 as components
+
+FRONTEND_DIR = Path(__file__).resolve().parent / "frontend"
+
+_component = components.declare_component("lighthouse_map", path=str(FRONTEND_DIR))
+
+
+def lighthouse_map(
+    tiles_url: str | None = None,
+    points_url: str | None = None,
+    selected: dict | None = None,
+    height: int = 650,
+    key: str | None = None,
+) -> dict | None:
+    """
+    Show the map and return the last click as {"key", "nonce"} (None before
+    the first click). Data URLs are relative to the app. `selected`
+    ({"key", "lat", "lon"}) is zoomed to whenever its key changes; the map
+    itself is built once and kept across reruns.
+    """
+    return _component(
+        tiles_url=tiles_url, points_url=points_url, selected=selected, height=height, key=key, default=None
+    )
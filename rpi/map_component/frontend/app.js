@@ -0,0 +1,328 @@
+// rpi/map_component/frontend/app.js
+// Leaflet map as a bidirectional Streamlit component (see ../__init__.py):
+// - speaks the component protocol with plain postMessage, no build step
+// - clicking a marker sets the component value to {key, nonce}, which reruns
+//   the script once; the nonce tells a repeated click on the same marker
+//   apart from the stale value. Nothing polls while the map is idle
+// - args.selected ({key, lat, lon}, the page's current light) is zoomed to
+//   whenever its key changes, without rebuilding the map
+// - with args.tiles_url only the tiles in view are fetched (cluster tiles below
+//   the tile zoom), otherwise all points are fetched once from args.points_url
+
+function sendToStreamlit(type, data) {
+  window.parent.postMessage({ isStreamlitMessage: true, type: type, ...data }, "*");
+}
+
+function setComponentValue(value) {
+  sendToStreamlit("streamlit:setComponentValue", { value: value, dataType: "json" });
+}
+
+// Focuses a {key, lat, lon} selection; set once the map has its data
+let focusSelection = null;
+let queuedSelection = null;
+let focusedKey = null;
+let clickCount = 0;
+
+function applySelection(sel) {
+  if (!sel || !sel.key || sel.key === focusedKey) return;
+  if (!focusSelection) {
+    queuedSelection = sel;
+    return;
+  }
+  focusedKey = sel.key;
+  focusSelection(sel);
+}
+
+// Data URLs are relative to the app, not to this iframe under /component/
+function appUrl(path) {
+  const params = new URLSearchParams(window.location.search);
+  const base = params.get("streamlitUrl") || document.referrer || window.location.href;
+  return new URL(path, base).toString();
+}
+
+function colorHex(c) {
+  const v = (c || "").toLowerCase();
+  if (v === "red") return "#ff4b4b";
+  if (v === "green") return "#2ecc71";
+  if (v === "white") return "#ffffff";
+  if (v === "yellow") return "#f1c40f";
+  if (v === "blue") return "#4aa3ff";
+  return "#cfcfcf";
+}
+
+function makeKey(p) {
+  return (
+    p.key ||
+    (p.osm_type && (p.osm_id ?? p.id)
+      ? p.osm_type[0] + (p.osm_id ?? p.id)
+      : "") ||
+    (p.type && p.id ? p.type[0] + p.id : "")
+  );
+}
+
+function zoomToKey(map, markersByKey, key) {
+  const marker = markersByKey[key];
+  if (!marker) return false;
+
+  const ll = marker.getLatLng();
+
+  // Sensible default zoom for "zoom into lighthouse"
+  const targetZoom = Math.max(map.getZoom(), 14);
+  map.setView(ll, targetZoom, { animate: true });
+
+  // Tooltip is already configured, so open it to give immediate feedback
+  try {
+    marker.openTooltip();
+  } catch (e) {}
+
+  return true;
+}
+
+function addPointMarker(layer, map, markersByKey, p) {
+  if (typeof p.lat !== "number" || typeof p.lon !== "number") return null;
+
+  const col = colorHex(p.color);
+  const name = p.name || "Unnamed";
+  const key = makeKey(p);
+
+  const marker = L.circleMarker([p.lat, p.lon], {
+    radius: 5,
+    color: col,
+    fillColor: col,
+    fillOpacity: 0.95,
+    weight: 1
+  })
+    .bindTooltip(name, { sticky: true })
+    .addTo(layer);
+
+  markersByKey[key] = marker;
+
+  marker.on("click", () => {
+    // The page selects the clicked light, so the next args.selected is this key
+    focusedKey = key;
+    clickCount += 1;
+    setComponentValue({ key: key, nonce: `${Date.now()}-${clickCount}` });
+    zoomToKey(map, markersByKey, key);
+  });
+
+  return marker;
+}
+
+function addClusterMarker(layer, map, markersByKey, c) {
+  if (c.n === 1 && c.key) {
+    return addPointMarker(layer, map, markersByKey, c);
+  }
+
+  const col = colorHex(c.color);
+  const marker = L.circleMarker([c.lat, c.lon], {
+    radius: Math.min(18, 5 + 2.5 * Math.log10(c.n)),
+    color: col,
+    fillColor: col,
+    fillOpacity: 0.6,
+    weight: 1
+  })
+    .bindTooltip(`${c.n} lights`, { sticky: true })
+    .addTo(layer);
+
+  marker.on("click", () => {
+    map.setView(marker.getLatLng(), map.getZoom() + 2, { animate: true });
+  });
+
+  return marker;
+}
+
+async function fetchJson(url) {
+  const resp = await fetch(url);
+  if (!resp.ok) throw new Error(`GET ${url} -> HTTP ${resp.status}`);
+  return resp.json();
+}
+
+function latLonToTile(lat, lon, z) {
+  // Same slippy map formula as server/scripts/tiles.py
+  const n = 1 << z;
+  const la = Math.max(-85.05112878, Math.min(85.05112878, lat));
+  const lo = Math.max(-180, Math.min(179.999999, lon));
+  const s = Math.sin((la * Math.PI) / 180);
+  const x = Math.floor(((lo + 180) / 360) * n);
+  const y = Math.floor((0.5 - Math.log((1 + s) / (1 - s)) / (4 * Math.PI)) * n);
+  return { x: Math.min(Math.max(x, 0), n - 1), y: Math.min(Math.max(y, 0), n - 1) };
+}
+
+async function loadTiled(map, markersByKey, tilesUrl) {
+  const base = tilesUrl.endsWith("/") ? tilesUrl : tilesUrl + "/";
+  const manifest = await fetchJson(base + "manifest.json");
+  const tileZoom = manifest.tile_zoom;
+  const clusterZooms = manifest.cluster_zooms || [];
+  const maxClusterZoom = clusterZooms.length ? Math.max(...clusterZooms) : -1;
+
+  const clusterTiles = manifest.clusters || {};
+
+  const tileLayers = new Map(); // "x/y" -> L.LayerGroup (or a pending Promise)
+  const clusterLayers = new Map(); // "z/x/y" -> L.LayerGroup (or a pending Promise)
+  let pendingFocus = null;
+
+  function tryFocus() {
+    if (pendingFocus && markersByKey[pendingFocus]) {
+      zoomToKey(map, markersByKey, pendingFocus);
+      pendingFocus = null;
+    }
+  }
+
+  function visibleClusters() {
+    const z = Math.min(map.getZoom(), maxClusterZoom);
+    const out = new Set();
+    for (const id of visibleTiles(z, clusterTiles[z] || {})) out.add(`${z}/${id}`);
+    return out;
+  }
+
+  async function showClusters() {
+    for (const layer of tileLayers.values()) {
+      if (!(layer instanceof Promise)) map.removeLayer(layer);
+    }
+    const wanted = visibleClusters();
+
+    for (const [id, layer] of clusterLayers) {
+      if (!wanted.has(id) && !(layer instanceof Promise)) map.removeLayer(layer);
+    }
+
+    const loads = [];
+    for (const id of wanted) {
+      const layer = clusterLayers.get(id);
+      if (layer instanceof Promise) continue;
+      if (layer) {
+        layer.addTo(map);
+        continue;
+      }
+      const loading = fetchJson(`${base}clusters/${id}.json`).then(clusters => {
+        const group = L.layerGroup();
+        for (const c of clusters) addClusterMarker(group, map, markersByKey, c);
+        clusterLayers.set(id, group);
+        // The view may have moved on while the clusters were loading
+        if (map.getZoom() < tileZoom && visibleClusters().has(id)) group.addTo(map);
+      });
+      clusterLayers.set(id, loading);
+      loads.push(loading);
+    }
+    await Promise.all(loads);
+  }
+
+  function hideClusters() {
+    for (const layer of clusterLayers.values()) {
+      if (!(layer instanceof Promise)) map.removeLayer(layer);
+    }
+  }
+
+  // "x/y" ids of the tiles at zoom z in view that exist in `available`
+  function visibleTiles(z, available) {
+    const b = map.getBounds();
+    const nw = latLonToTile(b.getNorth(), b.getWest(), z);
+    const se = latLonToTile(b.getSouth(), b.getEast(), z);
+    const out = new Set();
+    for (let x = nw.x; x <= se.x; x++) {
+      for (let y = nw.y; y <= se.y; y++) {
+        const id = `${x}/${y}`;
+        if (available[id]) out.add(id);
+      }
+    }
+    return out;
+  }
+
+  async function showTiles() {
+    hideClusters();
+    const wanted = visibleTiles(tileZoom, manifest.tiles);
+
+    for (const [id, layer] of tileLayers) {
+      if (!wanted.has(id) && !(layer instanceof Promise)) map.removeLayer(layer);
+    }
+
+    const loads = [];
+    for (const id of wanted) {
+      const layer = tileLayers.get(id);
+      if (layer instanceof Promise) continue;
+      if (layer) {
+        layer.addTo(map);
+        continue;
+      }
+      const loading = fetchJson(`${base}${tileZoom}/${id}.json`).then(points => {
+        const group = L.layerGroup();
+        for (const p of points) addPointMarker(group, map, markersByKey, p);
+        tileLayers.set(id, group);
+        if (map.getZoom() >= tileZoom && visibleTiles(tileZoom, manifest.tiles).has(id)) group.addTo(map);
+      });
+      tileLayers.set(id, loading);
+      loads.push(loading);
+    }
+    await Promise.all(loads);
+    tryFocus();
+  }
+
+  function refresh() {
+    const z = map.getZoom();
+    const job = z >= tileZoom ? showTiles() : showClusters();
+    job.catch(err => console.warn("Failed to load tiles", err));
+  }
+
+  map.on("moveend", refresh);
+
+  focusSelection = sel => {
+    if (zoomToKey(map, markersByKey, sel.key)) return;
+    if (typeof sel.lat !== "number" || typeof sel.lon !== "number") return;
+    // Jump straight to the light; its tile is loaded by the moveend handler,
+    // which then opens its tooltip
+    pendingFocus = sel.key;
+    map.setView([sel.lat, sel.lon], Math.max(tileZoom, 14));
+  };
+
+  if (queuedSelection) {
+    applySelection(queuedSelection);
+  } else {
+    refresh();
+  }
+}
+
+function start(args) {
+  const mapDiv = document.getElementById("map");
+  mapDiv.style.height = `${args.height}px`;
+  sendToStreamlit("streamlit:setFrameHeight", { height: args.height });
+
+  const map = L.map(mapDiv, { scrollWheelZoom: true }).setView([20, 0], 2);
+
+  L.tileLayer(
+    "https://{s}.basemaps.cartocdn.com/dark_all/{z}/{x}/{y}{r}.png",
+    { maxZoom: 20, attribution: "© OpenStreetMap © CARTO" }
+  ).addTo(map);
+
+  const markersByKey = {};
+
+  if (args.tiles_url) {
+    loadTiled(map, markersByKey, appUrl(args.tiles_url)).catch(err => {
+      console.error(err);
+    });
+    return;
+  }
+
+  fetchJson(appUrl(args.points_url))
+    .then(points => {
+      for (const p of points) {
+        addPointMarker(map, map, markersByKey, p);
+      }
+
+      focusSelection = sel => zoomToKey(map, markersByKey, sel.key);
+      if (queuedSelection) applySelection(queuedSelection);
+    })
+    .catch(err => console.error(err));
+}
+
+// Streamlit sends a render event on every rerun; the map is built on the
+// first one, later ones only move it to a newly selected light
+let started = false;
+window.addEventListener("message", event => {
+  if (event.data.type !== "streamlit:render") return;
+  if (!started) {
+    started = true;
+    start(event.data.args);
+  }
+  applySelection(event.data.args.selected);
+});
+
+sendToStreamlit("streamlit:componentReady", { apiVersion: 1 });
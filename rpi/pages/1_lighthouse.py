@@ -1,148 +1,80 @@
 # rpi/pages/1_lighthouse.py
 
-import json
-import re
+import sys
 from pathlib import Path
 
 import streamlit as st
-import streamlit.components.v1 as components
-from streamlit_autorefresh import st_autorefresh
 
 st.set_page_config(page_title="Lighthouse Map", layout="wide")
 
 REPO_ROOT = Path(__file__).resolve().parents[2]
 
+# Light tag parsing is shared with the dataset builder
+sys.path.insert(0, str(REPO_ROOT / "server" / "scripts"))
+import seamark  # noqa: E402
+from details_store import DetailsStore  # noqa: E402
+from light_db import LightDB  # noqa: E402
+
+sys.path.insert(0, str(REPO_ROOT / "rpi"))
+import led_channel  # noqa: E402
+from map_component import lighthouse_map  # noqa: E402
+
 MAP_POINTS_FILE = REPO_ROOT / "server" / "site" / "data.min.json"
-RPI_APP_JS = REPO_ROOT / "rpi" / "app.js"
-DETAILS_FILE = REPO_ROOT / "data" / "lighthousedata.json"
-
-# Command file read by your root LED controller (led_controller.py)
-CMD_PATH = Path("/tmp/lighthouse_cmd.json")
-
-@st.cache_data
-def load_json(path: Path):
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-@st.cache_data
-def load_text(path: Path):
-    with open(path, "r", encoding="utf-8") as f:
-        return f.read()
-
-def normalize_details_items(obj) -> list[dict]:
-    if isinstance(obj, list):
-        return [x for x in obj if isinstance(x, dict)]
-    if isinstance(obj, dict):
-        for key in ("elements", "items", "data"):
-            v = obj.get(key)
-            if isinstance(v, list):
-                return [x for x in v if isinstance(x, dict)]
-        vals = list(obj.values())
-        if vals and all(isinstance(x, dict) for x in vals):
-            return vals
-    return []
-
-def osm_key_from_type_id(osm_type: str | None, osm_id) -> str:
-    if not osm_type or osm_id is None:
-        return ""
-    t = str(osm_type).strip().lower()
-    prefix = t[:1]
-    if prefix not in {"n", "w", "r"}:
-        return ""
-    return f"{prefix}{osm_id}"
-
-def point_key_from_map_point(p: dict) -> str:
-    if p.get("key"):
-        return str(p["key"])
-    if p.get("osm_type") and (p.get("osm_id") is not None or p.get("id") is not None):
-        return str(p["osm_type"])[0] + str(p.get("osm_id", p.get("id")))
-    if p.get("type") and p.get("id") is not None:
-        return str(p["type"])[0] + str(p["id"])
-    return ""
-
-def point_key_from_details_item(item: dict) -> str:
-    return osm_key_from_type_id(item.get("type"), item.get("id"))
-
-_sector_key_re = re.compile(r"^seamark:light:(\d+):(.+)$")
+# Tags of every light and their key -> offset index, written by build_dataset.py
+DETAILS_FILE = REPO_ROOT / "data" / "details.jsonl"
+DETAILS_INDEX_FILE = REPO_ROOT / "data" / "details.idx"
+# Positions for the selected light, name search and nearest lights
+LIGHT_DB_FILE = REPO_ROOT / "data" / "lighthouses.sqlite"
+TILES_MANIFEST_FILE = REPO_ROOT / "server" / "site" / "tiles" / "manifest.json"
+
+# server/site/tiles and data.min.json are exposed through Streamlit static
+# serving via symlinks in rpi/static (see rpi/.streamlit/config.toml), so
+# the map component fetches and caches them itself
+TILES_URL = "app/static/tiles/"
+POINTS_URL = "app/static/data.min.json"
+
+SEARCH_RESULTS = 20
+NEAREST_RESULTS = 5
+
+# The stores are shared read-only by all sessions. The builder replaces the
+# files with os.replace, so the mtimes are part of the cache key and a
+# rebuild is picked up without restarting the app; max_entries drops the
+# handles on the old files
+@st.cache_resource(max_entries=1)
+def open_details_store(path: Path, index_path: Path, mtimes_ns: tuple) -> DetailsStore:
+    # mmapped; a lookup reads one record, the tags are never all in memory
+    return DetailsStore(path, index_path)
+
+@st.cache_resource(max_entries=1)
+def open_light_db(path: Path, mtime_ns: int) -> LightDB:
+    return LightDB(path)
+
+def select_light(key: str):
+    # Widget callback: runs before the rerun, which then reads the new ?id=
+    st.query_params["id"] = key
+
+def pick_search_result():
+    if st.session_state.get("search_pick"):
+        select_light(st.session_state["search_pick"])
 
 def parse_light_sectors(tags: dict) -> list[dict]:
-    sectors: dict[int, dict] = {}
-    for k, v in (tags or {}).items():
-        m = _sector_key_re.match(str(k))
-        if not m:
-            continue
-        idx = int(m.group(1))
-        field = m.group(2)
-        sectors.setdefault(idx, {})[field] = v
-
-    out = []
-    for idx in sorted(sectors.keys()):
-        s = sectors[idx]
-        out.append(
-            {
-                "light": idx,
-                "character": s.get("character", ""),
-                "colour": s.get("colour", ""),
-                "sequence": s.get("sequence", ""),
-                "period": s.get("period", ""),
-                "range": s.get("range", ""),
-                "height": s.get("height", ""),
-                "sector_start": s.get("sector_start", ""),
-                "sector_end": s.get("sector_end", ""),
-            }
-        )
-    return out
-
-def has_unindexed_light(tags: dict) -> bool:
-    # seamark:light:colour, seamark:light:period etc, but not seamark:light:<n>:...
-    for k in (tags or {}).keys():
-        ks = str(k)
-        if ks.startswith("seamark:light:") and _sector_key_re.match(ks) is None:
-            return True
-    return False
-
-def first_light_index(tags: dict) -> int | None:
-    if not isinstance(tags, dict):
-        return None
-    if has_unindexed_light(tags):
-        return 0
-    if any(str(k).startswith("seamark:light:1:") for k in tags.keys()):
-        return 1
-    idxs = set()
-    for k in tags.keys():
-        m = _sector_key_re.match(str(k))
-        if m:
-            idxs.add(int(m.group(1)))
-    return min(idxs) if idxs else None
+    return seamark.sectors(seamark.parse_light_tags(tags))
 
 def main_light_fields(tags: dict) -> dict:
-    idx = first_light_index(tags)
+    ml = seamark.main_light(seamark.parse_light_tags(tags))
+    idx = ml["index"]
     if idx is None:
-        return {"main_light": "", "main_colour": "", "main_frequency": "", "main_character": ""}
-
-    if idx == 0:
-        character = tags.get("seamark:light:character", "")
-        colour = tags.get("seamark:light:colour", "")
-        period = tags.get("seamark:light:period", "")
-        freq = f"{period} s" if period != "" else ""
-        return {
-            "main_light": "single",
-            "main_colour": colour,
-            "main_frequency": freq,
-            "main_character": character,
-        }
-
-    base = f"seamark:light:{idx}:"
-    character = tags.get(base + "character", "")
-    colour = tags.get(base + "colour", "")
-    period = tags.get(base + "period", "")
-    freq = f"{period} s" if period != "" else ""
+        return {"main_light": "", "main_colour": "", "main_frequency": "", "main_character": "", "main_sequence": "", "main_range": "", "main_height": ""}
 
+    period = ml["period"]
     return {
-        "main_light": str(idx),
-        "main_colour": colour,
-        "main_frequency": freq,
-        "main_character": character,
+        "main_light": "single" if idx == 0 else str(idx),
+        "main_colour": ml["colour"],
+        "main_frequency": f"{period} s" if period != "" else "",
+        "main_character": ml["character"],
+        "main_sequence": ml["sequence"],
+        "main_range": ml["range"],
+        "main_height": ml["height"],
     }
 
 def pick_period_seconds(tags: dict) -> float:
@@ -150,67 +82,72 @@ def pick_period_seconds(tags: dict) -> float:
     Best-effort: take the main light's period and return seconds.
     Falls back to 3.0 if missing or not parseable.
     """
-    ml = main_light_fields(tags)
-    try:
-        s = str(ml.get("main_frequency", "")).replace("s", "").strip()
-        return float(s) if s else 3.0
-    except Exception:
-        return 3.0
-
-missing = [str(p) for p in (MAP_POINTS_FILE, RPI_APP_JS, DETAILS_FILE) if not p.exists()]
+    period = seamark.parse_float(seamark.main_light(seamark.parse_light_tags(tags))["period"])
+    return period if period is not None else 3.0
+
+missing = [str(p) for p in (MAP_POINTS_FILE, DETAILS_FILE, DETAILS_INDEX_FILE, LIGHT_DB_FILE) if not p.exists()]
 if missing:
     st.error("Missing required file(s):")
     for m in missing:
         st.write("-", m)
     st.stop()
 
-map_points = load_json(MAP_POINTS_FILE)
-app_js = load_text(RPI_APP_JS)
-
-raw_details = load_json(DETAILS_FILE)
-details_items = normalize_details_items(raw_details)
-
-map_points_by_key = {point_key_from_map_point(p): p for p in map_points if point_key_from_map_point(p)}
-details_by_key = {point_key_from_details_item(it): it for it in details_items if point_key_from_details_item(it)}
-
-# Poll query params updated by JS (no reload)
-st_autorefresh(interval=300, key="url_poll")
+try:
+    details_store = open_details_store(
+        DETAILS_FILE, DETAILS_INDEX_FILE, (DETAILS_FILE.stat().st_mtime_ns, DETAILS_INDEX_FILE.stat().st_mtime_ns)
+    )
+    light_db = open_light_db(LIGHT_DB_FILE, LIGHT_DB_FILE.stat().st_mtime_ns)
+except ValueError as e:
+    # The details files are replaced one after the other during a build
+    st.warning(f"The dataset is being rebuilt, reload in a moment ({e}).")
+    st.stop()
 
+# ?id=... deep links to a light; clicks on the map replace it
 selected_id = st.query_params.get("id", None)
 
+# The map's value is its last click. It is read here, before the map is
+# drawn, so the map is passed the light it just selected and does not jump
+# back to the previous one. The component keeps returning the last click;
+# only a new nonce selects, so a stale click does not override a later
+# search or nearest-light selection
+clicked = st.session_state.get("map")
+if clicked and clicked.get("nonce") != st.session_state.get("map_click_nonce"):
+    st.session_state["map_click_nonce"] = clicked["nonce"]
+    selected_id = clicked["key"]
+    st.query_params["id"] = selected_id
+
 st.title("Lighthouse map")
 
+q_col, colour_col = st.columns([3, 1])
+query = q_col.text_input("Search by name", placeholder="e.g. Helgoland", key="search_query")
+colour = colour_col.selectbox("Colour", ["any", *light_db.values("colour")], key="search_colour")
+if query.strip():
+    hits = light_db.search(query, limit=SEARCH_RESULTS, colour=None if colour == "any" else colour)
+    if hits:
+        labels = {h["key"]: f"{h['name']} ({h['key']}, {h['colour'] or 'no colour'} {h['character']})" for h in hits}
+        st.selectbox(
+            f"{len(hits)} match(es)",
+            list(labels),
+            index=None,
+            format_func=labels.get,
+            placeholder="Choose a light",
+            key="search_pick",
+            on_change=pick_search_result,
+        )
+    else:
+        st.caption("No lights found.")
+
 left, right = st.columns([2.2, 1], gap="large")
 
 with left:
-    html = f"""
-<!doctype html>
-<html>
-<head>
-  <meta charset="utf-8" />
-  <meta name="viewport" content="width=device-width, initial-scale=1" />
-  <link rel="stylesheet" href="https://unpkg.com/leaflet@1.9.4/dist/leaflet.css"/>
-  <style>
-    html, body {{ height: 100%; margin: 0; }}
-    #map {{ height: 78vh; width: 100%; }}
-  </style>
-</head>
-<body>
-  <div id="map"></div>
-
-  <script src="https://unpkg.com/leaflet@1.9.4/dist/leaflet.js"></script>
-
-  <script>
-    window.POINTS = {json.dumps(map_points)};
-  </script>
-
-  <script>
-    {app_js}
-  </script>
-</body>
-</html>
-"""
-    components.html(html, height=650, scrolling=False)
+    # One indexed lookup; the dataset itself is only loaded by the map
+    light = light_db.get(selected_id) if selected_id else None
+    # The map moves to this light when it changes (search, nearest lights,
+    # deep link) without being rebuilt
+    selected_js = {"key": selected_id, "lat": light["lat"], "lon": light["lon"]} if light else None
+    # Viewport based loading when tiles exist: the map fetches only the tiles in view
+    tiles = TILES_URL if TILES_MANIFEST_FILE.exists() else None
+    lighthouse_map(tiles_url=tiles, points_url=POINTS_URL, selected=selected_js, key="map")
 
 with right:
     st.subheader("Details")
@@ -219,10 +156,9 @@ with right:
         st.info("Click a marker to show details.")
         st.stop()
 
-    details = details_by_key.get(selected_id)
-    map_point = map_points_by_key.get(selected_id)
+    details = details_store.get(selected_id)
 
-    if not details and not map_point:
+    if not details and not light:
         st.error(f"ID not found: {selected_id}")
         st.stop()
 
@@ -242,8 +178,8 @@ with right:
         st.write("**Type:**", details.get("type", ""))
         st.write("**OSM ID:**", details.get("id", ""))
 
-        if map_point:
-            st.write("**Lat/Lon:**", map_point.get("lat"), map_point.get("lon"))
+        if light:
+            st.write("**Lat/Lon:**", light.get("lat"), light.get("lon"))
 
         operator = tags.get("operator") or tags.get("seamark:operator")
         if operator:
@@ -268,6 +204,10 @@ with right:
                 st.write("**Main frequency:**", ml["main_frequency"])
             if ml.get("main_character"):
                 st.write("**Character:**", ml["main_character"])
+            if ml.get("main_range"):
+                st.write("**Range:**", f"{ml['main_range']} nm")
+            if ml.get("main_height"):
+                st.write("**Height:**", f"{ml['main_height']} m")
 
         sectors = parse_light_sectors(tags)
         if sectors:
@@ -288,6 +228,7 @@ with right:
         default_rgb = [255, 45, 0]
 
         brightness = st.slider("Brightness", min_value=10, max_value=255, value=160, step=5)
+        # Only used for lights whose sequence and character cannot be played exactly
         on_fraction = st.slider("On-time fraction", min_value=0.05, max_value=0.80, value=0.18, step=0.01)
 
         st.caption(f"Period detected: {period_s:.2f} s (from main light period; fallback 3.0 s)")
@@ -299,24 +240,44 @@ with right:
                 "on_fraction": float(on_fraction),
                 "brightness": int(brightness),
                 "main_colour": (ml.get("main_colour") or "").strip().lower(),
+                "main_character": ml.get("main_character") or "",
+                "main_sequence": ml.get("main_sequence") or "",
                 "default_rgb": default_rgb,
                 "sectors": sectors,  # list with sector_start/sector_end/colour/character/period/sequence
             }
-            CMD_PATH.write_text(json.dumps(cmd), encoding="utf-8")
-            st.success("Sent to LED controller.")
-
-        with st.expander("Raw JSON (lighthousedata.json)"):
+            ack = led_channel.send_command(cmd)
+            if ack.get("ok"):
+                st.success(f"Playing on LEDs (program {ack.get('program')}).")
+            elif ack.get("fallback") == "file":
+                st.error(
+                    f"{ack.get('error')}. Nothing is playing; the command was saved to {led_channel.CMD_PATH} "
+                    "and plays when the LED controller starts."
+                )
+            else:
+                st.error(f"LED controller rejected the command: {ack.get('error')}")
+
+        with st.expander("Raw JSON (OSM tags)"):
             st.json(details)
 
     else:
-        st.write("**Name:**", map_point.get("name", "Unnamed"))
+        st.write("**Name:**", light.get("name", "Unnamed"))
         st.write("**ID:**", selected_id)
-        st.write("**Lat/Lon:**", map_point.get("lat"), map_point.get("lon"))
-        st.write("**Color:**", map_point.get("color"))
-        st.write("**Sequence:**", map_point.get("sequence"))
-
-        with st.expander("Raw JSON (map data)"):
-            st.json(map_point)
+        st.write("**Lat/Lon:**", light.get("lat"), light.get("lon"))
+        st.write("**Colour:**", light.get("colour"))
+        st.write("**Character:**", light.get("character"))
+
+        with st.expander("Raw JSON (light database)"):
+            st.json(light)
+
+    if light and light["lat"] is not None and light["lon"] is not None:
+        st.markdown("#### Nearest lights")
+        for n in light_db.nearest(light["lat"], light["lon"], k=NEAREST_RESULTS, exclude=selected_id):
+            st.button(
+                f"{n['name']}, {n['km']:.1f} km",
+                key=f"nearest_{n['key']}",
+                on_click=select_light,
+                args=(n["key"],),
+            )
 
 st.divider()
 colA, colB = st.columns([1, 4])
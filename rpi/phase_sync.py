@@ -0,0 +1,186 @@
+"""
+Phase synchronisation of several controllers over UDP multicast.
+
+The leader sends, every SYNC_INTERVAL_S, one JSON datagram:
+
+    {"v": 1, "seq": 12, "program": "<hash>", "epoch": 1760000000.123,
+     "sent": 1760000004.5, "cmd": {...} or null}
+
+epoch is the wall-clock time at which the program's timeline started (its
+phase 0). A follower switches to the same program (from cmd, or from the
+programs it already knows by hash, e.g. the same playlist) and moves its own
+phase origin to that epoch. Wall clocks are expected to be NTP-synced; the
+remaining error, including the drift between the follower's monotonic clock
+and wall time, is corrected on every datagram: errors above STEP_S are
+stepped, smaller ones slewed by SLEW_GAIN so a blink never jumps visibly.
+
+The phase error seen by each follower goes to its FrameStats (phase_us).
+"""
+
+import json
+import socket
+import struct
+import time
+
+SYNC_GROUP = "239.255.42.99"
+SYNC_PORT = 5007
+SYNC_INTERVAL_S = 0.5
+SYNC_VERSION = 1
+
+# Phase errors above this are corrected at once, smaller ones gradually
+STEP_S = 0.05
+SLEW_GAIN = 0.25
+
+# A program with sectors is a few KB; one datagram is plenty
+MAX_DATAGRAM = 65507
+
+
+def open_sender(group: str = SYNC_GROUP, port: int = SYNC_PORT, iface: str = "0.0.0.0") -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)
+    # Followers on the same machine (and the loopback harness) hear the leader too
+    sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+    if iface != "0.0.0.0":
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(iface))
+    sock.connect((group, port))
+    return sock
+
+
+def open_receiver(group: str = SYNC_GROUP, port: int = SYNC_PORT, iface: str = "0.0.0.0") -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((group, port))
+    mreq = struct.pack("4s4s", socket.inet_aton(group), socket.inet_aton(iface))
+    sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
+    sock.setblocking(False)
+    return sock
+
+
+def wall_to_monotonic() -> float:
+    """Offset to add to a wall-clock time to get the monotonic time of the same instant."""
+    return time.monotonic() - time.time()
+
+
+class SyncLeader:
+    """Announces the Player's program and phase origin."""
+
+    def __init__(self, player, group: str = SYNC_GROUP, port: int = SYNC_PORT, iface: str = "0.0.0.0"):
+        self.player = player
+        self.sock = open_sender(group, port, iface)
+        self.seq = 0
+        self.next_send = 0.0
+
+    def packet(self) -> dict:
+        program = self.player.program
+        self.seq += 1
+        return {
+            "v": SYNC_VERSION,
+            "seq": self.seq,
+            "program": program.hash if program is not None else None,
+            "epoch": self.player.t0 - wall_to_monotonic(),
+            "sent": time.time(),
+            "cmd": self.player.cmd,
+        }
+
+    def update(self) -> float:
+        """Send if due. Returns the seconds until the next datagram."""
+        now = time.monotonic()
+        if now >= self.next_send:
+            try:
+                self.sock.send(json.dumps(self.packet(), separators=(",", ":")).encode("utf-8"))
+            except OSError:
+                # no route to the group (yet); followers keep free-running
+                pass
+            self.next_send = now + SYNC_INTERVAL_S
+        return self.next_send - now
+
+    def close(self):
+        self.sock.close()
+
+
+class SyncFollower:
+    """
+    Applies the leader's datagrams to the Player. `programs` maps hashes to
+    compiled programs known without a cmd (a playlist).
+    """
+
+    def __init__(
+        self, player, programs: dict | None = None, group: str = SYNC_GROUP, port: int = SYNC_PORT, iface: str = "0.0.0.0"
+    ):
+        self.player = player
+        self.programs = programs or {}
+        self.sock = open_receiver(group, port, iface)
+        self.last_seq = None
+        self.received = 0
+        self.steps = 0
+        self.unknown = 0  # datagrams for a program this follower cannot build
+
+    def fileno(self) -> int:
+        return self.sock.fileno()
+
+    def handle(self):
+        """Apply every pending datagram."""
+        while True:
+            try:
+                data = self.sock.recv(MAX_DATAGRAM)
+            except BlockingIOError:
+                return
+            try:
+                msg = json.loads(data)
+            except ValueError:
+                continue
+            if msg.get("v") == SYNC_VERSION:
+                self.apply(msg)
+
+    def _program_for(self, msg: dict):
+        h = msg.get("program")
+        player = self.player
+        if player.program is not None and player.program.hash == h:
+            return player.program
+        if h in self.programs:
+            return self.programs[h]
+        cmd = msg.get("cmd")
+        if cmd:
+            program = player.cache.get(cmd)
+            if program.hash == h:
+                return program
+        return None
+
+    def apply(self, msg: dict):
+        self.received += 1
+        self.last_seq = msg.get("seq")
+        player = self.player
+
+        if msg.get("program") is None:
+            if player.program is not None:
+                player.play_program(None)
+            return
+        program = self._program_for(msg)
+        if program is None:
+            self.unknown += 1
+            return
+
+        switched = program is not player.program
+        if switched:
+            player.play_program(program, cmd=msg.get("cmd"))
+
+        target = float(msg["epoch"]) + wall_to_monotonic()
+        error = player.t0 - target
+        if not switched:
+            player.stats.phase.add(error * 1e6)
+
+        if switched or abs(error) > STEP_S:
+            delta = error
+            self.steps += 0 if switched else 1
+        else:
+            delta = error * SLEW_GAIN
+        player.t0 -= delta
+        if player.due is not None:
+            player.due -= delta
+        player.stats.sync = self.status()
+
+    def status(self) -> dict:
+        return {"received": self.received, "last_seq": self.last_seq, "steps": self.steps, "unknown": self.unknown}
+
+    def close(self):
+        self.sock.close()
@@ -0,0 +1,111 @@
+"""
+Unattended tour through a list of lights for led_controller.py --playlist.
+
+A playlist is a JSON file:
+
+    {"dataset": "../server/site/data.rich.json",
+     "dwell_s": 20, "crossfade_s": 1.0, "brightness": 160, "loop": true,
+     "items": ["n123", {"key": "w456", "dwell_s": 45}, ...]}
+
+Everything but "items" is optional; the dataset defaults to the built
+data.rich.json (or its .gz) and relative paths are taken from the playlist's
+directory. All keys are looked up and compiled when the playlist is loaded,
+so a switch is only a pointer change on the Player.
+"""
+
+import gzip
+import json
+import time
+from pathlib import Path
+from typing import Callable, NamedTuple
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+DATASET_PATH = REPO_ROOT / "server" / "site" / "data.rich.json"
+
+DEFAULT_DWELL_S = 20.0
+DEFAULT_CROSSFADE_S = 1.0
+
+
+class PlaylistItem(NamedTuple):
+    key: str
+    dwell_s: float
+    program: object  # led_controller.Program
+
+
+def load_rows(path: Path) -> list[dict]:
+    """Rows of data.rich.json, read from path.gz if only the compressed copy exists."""
+    if not path.exists() and path.with_name(path.name + ".gz").exists():
+        with gzip.open(path.with_name(path.name + ".gz"), "rt", encoding="utf-8") as f:
+            return json.load(f)
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def load_playlist(
+    path: Path, compile_row: Callable[[dict, int | None], object]
+) -> tuple[list[PlaylistItem], float, bool]:
+    """
+    (items, crossfade seconds, loop). compile_row(row, brightness) returns the
+    compiled program of a dataset row. Raises ValueError on a bad playlist.
+    """
+    spec = json.loads(path.read_text(encoding="utf-8"))
+    dataset = Path(spec["dataset"]) if spec.get("dataset") else DATASET_PATH
+    if not dataset.is_absolute():
+        dataset = path.parent / dataset
+    dwell = float(spec.get("dwell_s", DEFAULT_DWELL_S))
+    brightness = int(spec["brightness"]) if spec.get("brightness") is not None else None
+
+    entries = [e if isinstance(e, dict) else {"key": e} for e in spec.get("items") or []]
+    if not entries:
+        raise ValueError(f"{path}: no items")
+
+    wanted = {str(e.get("key")) for e in entries}
+    by_key = {r.get("key"): r for r in load_rows(dataset) if r.get("key") in wanted}
+    missing = sorted(wanted - by_key.keys())
+    if missing:
+        raise ValueError(f"Not in {dataset}: {', '.join(missing)}")
+
+    items = []
+    for e in entries:
+        key = str(e["key"])
+        program = compile_row(by_key[key], brightness)
+        items.append(PlaylistItem(key, float(e.get("dwell_s", dwell)), program))
+    return items, float(spec.get("crossfade_s", DEFAULT_CROSSFADE_S)), bool(spec.get("loop", True))
+
+
+class PlaylistRunner:
+    """Switches the Player to the next item when the current one's dwell time is up."""
+
+    def __init__(self, player, items: list[PlaylistItem], crossfade_s: float = 0.0, loop: bool = True):
+        self.player = player
+        self.items = items
+        self.crossfade_s = crossfade_s
+        self.loop = loop
+        self.index = -1
+        self.switch_at = 0.0
+        self.active = True
+
+    @property
+    def current(self) -> PlaylistItem | None:
+        return self.items[self.index] if 0 <= self.index < len(self.items) else None
+
+    def update(self) -> float:
+        """Switch if due. Returns the seconds until the next switch (inf when the tour is over)."""
+        if not self.active:
+            return float("inf")
+        now = time.monotonic()
+        if now < self.switch_at:
+            return self.switch_at - now
+
+        nxt = self.index + 1
+        if nxt >= len(self.items):
+            if not self.loop:
+                self.active = False
+                return float("inf")
+            nxt = 0
+        # No fade into the first item, or when a one-item playlist repeats itself
+        fade = self.crossfade_s if self.index >= 0 and len(self.items) > 1 else 0.0
+        self.index = nxt
+        item = self.items[nxt]
+        self.player.play_program(item.program, fade)
+        self.switch_at = now + item.dwell_s
+        return item.dwell_s
@@ -1,20 +1,22 @@
 # rpi/streamlit_app.py
-import json
+import sys
 from pathlib import Path
 import streamlit as st
 
 st.set_page_config(page_title="Lighthouse Explorer", layout="wide")
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
-MAP_POINTS_FILE = REPO_ROOT / "server" / "site" / "data.min.json"
-DETAILS_FILE = REPO_ROOT / "data" / "lighthousedata.json"
 
-def safe_load_json(path: Path):
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return None
+sys.path.insert(0, str(REPO_ROOT / "server" / "scripts"))
+import dataset_manifest  # noqa: E402
+
+# A few KB written by build_dataset.py; the datasets themselves are never read here
+DATASET_MANIFEST_FILE = REPO_ROOT / "server" / "site" / "dataset.json"
+
+@st.cache_data
+def load_dataset_manifest(path: Path, mtime_ns: int) -> dict | None:
+    # mtime_ns is only part of the cache key, so a rebuild is picked up
+    return dataset_manifest.load_manifest(path)
 
 st.title("Lighthouse Explorer")
 
@@ -28,25 +30,41 @@ with col1:
 
 with col2:
     st.subheader("Status")
-    mp = safe_load_json(MAP_POINTS_FILE)
-    dd = safe_load_json(DETAILS_FILE)
-
-    if mp is None:
-        st.error(f"Cannot read map dataset: {MAP_POINTS_FILE}")
-    else:
-        st.metric("Map points", f"{len(mp):,}")
+    manifest = None
+    if DATASET_MANIFEST_FILE.exists():
+        manifest = load_dataset_manifest(DATASET_MANIFEST_FILE, DATASET_MANIFEST_FILE.stat().st_mtime_ns)
 
-    if dd is None:
-        st.error(f"Cannot read details dataset: {DETAILS_FILE}")
+    if manifest is None:
+        st.error(f"Cannot read dataset manifest: {DATASET_MANIFEST_FILE}. Run server/scripts/build_dataset.py.")
     else:
-        # lighthousedata.json can be list or dict. Just show a rough count.
-        if isinstance(dd, list):
-            n = len(dd)
-        elif isinstance(dd, dict):
-            n = len(dd.get("elements", dd.get("items", dd.get("data", [])))) if any(k in dd for k in ("elements","items","data")) else len(dd)
+        m1, m2 = st.columns(2)
+        m1.metric("Lights", f"{manifest.get('lights', 0):,}")
+        age = dataset_manifest.age_s(manifest)
+        if age is None:
+            age_text = "unknown"
+        elif age < 2 * 86400:
+            age_text = f"{age / 3600:.0f} h"
         else:
-            n = 0
-        st.metric("Detail entries", f"{n:,}")
+            age_text = f"{age / 86400:.1f} d"
+        m2.metric("Data age", age_text)
+
+        for reason in dataset_manifest.stale_reasons(manifest, REPO_ROOT):
+            st.warning(reason)
+
+        source = manifest.get("source") or {}
+        st.caption(
+            f"Built {manifest.get('built', '?')} from {source.get('path', '?')} "
+            f"(OSM data of {source.get('osm_base') or 'unknown date'}, sha256 {str(source.get('sha256', ''))[:12]})"
+        )
+        st.write("**By type:**", ", ".join(f"{k} {v:,}" for k, v in (manifest.get("by_type") or {}).items()))
+        st.write("**By colour:**", ", ".join(f"{k} {v:,}" for k, v in (manifest.get("by_colour") or {}).items()))
+
+        with st.expander("Files"):
+            st.dataframe(
+                [{"file": name, "bytes": size} for name, size in (manifest.get("files") or {}).items()],
+                width="stretch",
+                hide_index=True,
+            )
 
 st.divider()
 st.caption("Tip: You can deep-link directly to a lighthouse using ?id=..., for example /?id=n1191075008 on the lighthouse page.")
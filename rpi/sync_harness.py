@@ -0,0 +1,155 @@
+"""
+Loopback test of phase_sync: one leader and several followers on simulated
+strips in one process, talking real UDP multicast over 127.0.0.1.
+
+Followers start at staggered times, and each gets a clock drift (ppm) so the
+correction has something to do. After --settle seconds, every ring transition
+of a follower is matched to the nearest transition of the leader; the
+differences are the inter-unit phase error reported per follower.
+
+    python rpi/sync_harness.py --followers 3 --seconds 20 --drift-ppm 200
+"""
+
+import argparse
+import json
+import random
+import select
+import statistics
+import sys
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+
+RPI_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(RPI_DIR))
+
+import led_controller as lc  # noqa: E402
+import phase_sync  # noqa: E402
+from bench_controller import make_strips  # noqa: E402
+
+HARNESS_PORT = phase_sync.SYNC_PORT + 1
+LOOPBACK = "127.0.0.1"
+
+DEFAULT_CMD = {"period_s": 2.0, "main_colour": "white", "main_character": "Fl(2)", "main_sequence": "0.3+(0.4)+0.3+(1)"}
+
+
+def run_unit(player, end: float, leader=None, follower=None, drift_ppm: float = 0.0, start_delay: float = 0.0):
+    time.sleep(start_delay)
+    last = time.monotonic()
+    while True:
+        now = time.monotonic()
+        if now >= end:
+            return
+        # A clock running fast by drift_ppm moves the phase origin back
+        player.t0 -= drift_ppm * 1e-6 * (now - last)
+        last = now
+
+        delay = player.update()
+        if leader is not None:
+            delay = min(delay, leader.update())
+        waiting = [follower] if follower is not None else []
+        readable, _, _ = select.select(waiting, [], [], min(delay, 0.05, max(end - now, 0.0)))
+        if readable:
+            follower.handle()
+
+
+def transition_times(strip, after: float) -> list[float]:
+    frames = list(strip.frames)
+    return [t for (t, px), (_, prev) in zip(frames[1:], frames) if t >= after and px != prev]
+
+
+def phase_errors(leader_times: list[float], times: list[float]) -> list[float]:
+    out = []
+    for t in times:
+        i = bisect_left(leader_times, t)
+        near = leader_times[max(i - 1, 0) : i + 1]
+        if near:
+            out.append(t - min(near, key=lambda x: abs(x - t)))
+    return out
+
+
+def summarize_ms(errors: list[float]) -> dict:
+    if not errors:
+        return {}
+    abs_ms = sorted(abs(e) * 1000 for e in errors)
+    return {
+        "n": len(errors),
+        "mean": round(statistics.fmean(e * 1000 for e in errors), 3),
+        "p50": round(abs_ms[len(abs_ms) // 2], 3),
+        "p95": round(abs_ms[min(len(abs_ms) - 1, int(0.95 * len(abs_ms)))], 3),
+        "max": round(abs_ms[-1], 3),
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--followers", type=int, default=3)
+    ap.add_argument("--seconds", type=float, default=15.0, help="Total run time")
+    ap.add_argument("--settle", type=float, default=3.0, help="Seconds before errors are counted")
+    ap.add_argument("--drift-ppm", type=float, default=200.0, help="Largest simulated clock drift of a follower")
+    ap.add_argument("--port", type=int, default=HARNESS_PORT)
+    ap.add_argument("--cmd", type=json.loads, default=DEFAULT_CMD, help="Command the leader plays (JSON)")
+    ap.add_argument("--report", type=Path, help="Write the results as JSON")
+    args = ap.parse_args(argv)
+
+    rng = random.Random(1)
+    t_start = time.monotonic()
+    end = t_start + args.seconds
+    group = phase_sync.SYNC_GROUP
+
+    leader_strips = make_strips()
+    leader_player = lc.Player(leader_strips, concurrent=False)
+    units = []
+    for i in range(args.followers):
+        strips = make_strips()
+        player = lc.Player(strips, concurrent=False)
+        follower = phase_sync.SyncFollower(player, {}, group, args.port, LOOPBACK)
+        drift = rng.uniform(-args.drift_ppm, args.drift_ppm)
+        units.append((f"follower{i + 1}", strips, player, follower, drift))
+
+    leader = phase_sync.SyncLeader(leader_player, group, args.port, LOOPBACK)
+    leader_player.play(args.cmd)
+
+    threads = [threading.Thread(target=run_unit, args=(leader_player, end, leader))]
+    for i, (_, _, player, follower, drift) in enumerate(units):
+        threads.append(
+            threading.Thread(target=run_unit, args=(player, end), kwargs=dict(follower=follower, drift_ppm=drift, start_delay=0.3 * i))
+        )
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    leader.close()
+    after = t_start + args.settle
+    leader_times = transition_times(leader_strips[0][0], after)
+    results = []
+    print(f"leader       {len(leader_times)} transitions after {args.settle:g} s")
+    for name, strips, player, follower, drift in units:
+        follower.close()
+        errors = phase_errors(leader_times, transition_times(strips[0][0], after))
+        r = {
+            "name": name,
+            "drift_ppm": round(drift, 1),
+            "phase_error_ms": summarize_ms(errors),
+            "sync": follower.status(),
+            "reported_phase_us": {k: v for k, v in player.stats.phase.snapshot().items() if k != "histogram"},
+        }
+        results.append(r)
+        e = r["phase_error_ms"]
+        line = f"{name:<12} drift {drift:+7.1f} ppm  {follower.received:4d} datagrams"
+        if e:
+            line += f"  phase error p50 {e['p50']:.3f} ms, p95 {e['p95']:.3f} ms, max {e['max']:.3f} ms"
+        else:
+            line += "  no transitions to compare"
+        print(line)
+
+    if args.report:
+        report = {"seconds": args.seconds, "settle": args.settle, "cmd": args.cmd, "results": results}
+        args.report.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Report written: {args.report}")
+
+
+if __name__ == "__main__":
+    main()
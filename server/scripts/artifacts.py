@@ -0,0 +1,238 @@
+"""
+Content-addressed site artifacts.
+
+Every published file is written under a name that carries its content hash
+(data.rich.json -> data.rich.3f2a9c0d1e4b5a67.json) next to precompressed
+variants (.gz always, .br and .zst when the brotli / zstandard packages are
+installed), so web servers with gzip_static / brotli_static can serve them
+as is and browsers can cache them forever. server/site/manifest.json maps
+the logical names to the current files and is the only thing clients need
+to revalidate:
+
+    {"schema": 1, "files": {"data.rich.json": {
+        "path": "data.rich.3f2a9c0d1e4b5a67.json", "sha256": "3f2a...", "bytes": 2968313,
+        "encodings": {"gzip": {"path": "data.rich.3f2a9c0d1e4b5a67.json.gz", "bytes": 757356}, ...}}}}
+
+Only the fixed-name files and manifest.json are committed; the hashed copies
+are rebuilt from them when the site is deployed:
+
+    python server/scripts/artifacts.py server/site
+
+So a build decides what changed from the manifest and the fixed-name files,
+which are in every checkout: if the content hash of a file matches the
+previous manifest and its fixed-name copies hold that content, nothing is
+rewritten or recompressed. Only the current generation is kept; a client
+holding an older manifest falls back to the fixed names.
+"""
+
+import gzip
+import hashlib
+import json
+import shutil
+import sys
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MANIFEST_SCHEMA = 1
+
+# Compression levels. The maximum ones (brotli 11, zstd 19) took 35 s for the
+# three datasets at 1x for about 15 % smaller files than these (under 1 s)
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 9
+ZSTD_LEVEL = 11
+
+
+def _gzip(data: bytes) -> bytes:
+    # mtime=0 keeps the output byte-identical for identical input
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _brotli(data: bytes) -> bytes:
+    return brotli.compress(data, quality=BROTLI_QUALITY)
+
+
+def _zstd(data: bytes) -> bytes:
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+
+
+# encoding name -> (file suffix, compressor); only the available ones
+ENCODINGS = {"gzip": (".gz", _gzip)}
+if brotli is not None:
+    ENCODINGS["br"] = (".br", _brotli)
+if zstandard is not None:
+    ENCODINGS["zstd"] = (".zst", _zstd)
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def hashed_name(name: str, sha: str) -> str:
+    """data.rich.json + hash -> data.rich.<hash[:16]>.json"""
+    stem, dot, ext = name.rpartition(".")
+    if not dot:
+        return f"{name}.{sha[:16]}"
+    return f"{stem}.{sha[:16]}.{ext}"
+
+
+def _gzip_holds(path: Path, data: bytes) -> bool:
+    """Whether the gzip file at `path` exists and decompresses to `data`."""
+    try:
+        return gzip.decompress(path.read_bytes()) == data
+    except (OSError, EOFError):
+        return False
+
+
+def _write_if_changed(path: Path, data: bytes) -> bool:
+    if path.exists() and path.stat().st_size == len(data) and path.read_bytes() == data:
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return True
+
+
+class Publisher:
+    """
+    Publishes files into `site_dir` and keeps manifest.json in step. Call
+    write() with the raw bytes of each file, then compress(), then
+    write_manifest() once at the end.
+    """
+
+    def __init__(self, site_dir: Path, manifest_path: Path | None = None):
+        self.site_dir = site_dir
+        self.manifest_path = manifest_path or site_dir / "manifest.json"
+        self.previous = self._load_manifest()
+        self.files: dict[str, dict] = {}
+        self._data: dict[str, bytes] = {}
+        self.skipped: list[str] = []
+
+    def _load_manifest(self) -> dict:
+        if not self.manifest_path.exists():
+            return {}
+        try:
+            manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        if manifest.get("schema") != MANIFEST_SCHEMA:
+            return {}
+        return manifest
+
+    def _unchanged(self, name: str, sha: str, legacy: Path | None) -> dict | None:
+        """
+        The previous manifest entry for `name` if it has the same content and
+        its fixed-name copy exists (or, without one, its hashed files do).
+        """
+        prev = self.previous.get("files", {}).get(name)
+        if not prev or prev.get("sha256") != sha:
+            return None
+        if legacy is not None:
+            return prev if legacy.exists() else None
+        paths = [prev["path"]] + [e["path"] for e in prev.get("encodings", {}).values()]
+        if not all((self.site_dir / p).exists() for p in paths):
+            return None
+        return prev
+
+    def write(self, name: str, data: bytes, legacy: Path | None = None) -> bool:
+        """
+        Write the hashed copy of `name` (and the fixed-name copy at `legacy`,
+        if given). Returns False if the content is unchanged since the last
+        build.
+        """
+        sha = content_hash(data)
+        self._data[name] = data
+
+        prev = self._unchanged(name, sha, legacy)
+        if prev is not None:
+            if legacy is not None:
+                # Cheap next to compression, and repairs an edited fixed-name copy
+                _write_if_changed(legacy, data)
+            self.files[name] = prev
+            self.skipped.append(name)
+            return False
+
+        path = hashed_name(name, sha)
+        _write_if_changed(self.site_dir / path, data)
+        if legacy is not None:
+            _write_if_changed(legacy, data)
+        self.files[name] = {"path": path, "sha256": sha, "bytes": len(data), "encodings": {}}
+        return True
+
+    def compress(self, name: str, legacy_gz: Path | None = None):
+        """Precompress a file passed to write(), unless it and its fixed-name .gz are unchanged."""
+        entry = self.files[name]
+        data = self._data.pop(name)
+        if name in self.skipped and (legacy_gz is None or _gzip_holds(legacy_gz, data)):
+            return
+
+        for encoding, (suffix, compressor) in ENCODINGS.items():
+            out = compressor(data)
+            path = entry["path"] + suffix
+            _write_if_changed(self.site_dir / path, out)
+            entry["encodings"][encoding] = {"path": path, "bytes": len(out)}
+            if encoding == "gzip" and legacy_gz is not None:
+                _write_if_changed(legacy_gz, out)
+
+    def _prune(self):
+        """Delete hashed files of earlier generations for every published name."""
+        live = set()
+        for e in self.files.values():
+            live.add(e["path"])
+            live.update(enc["path"] for enc in e.get("encodings", {}).values())
+
+        for name in self.files:
+            pattern = hashed_name(name, "*" * 16).replace("*" * 16, "*")
+            for f in self.site_dir.glob(pattern + "*"):
+                if f.name not in live and f.is_file():
+                    f.unlink()
+
+    def write_manifest(self) -> dict:
+        self._prune()
+        manifest = {"schema": MANIFEST_SCHEMA, "files": self.files}
+        payload = json.dumps(manifest, ensure_ascii=False, indent=1, sort_keys=True)
+        _write_if_changed(self.manifest_path, payload.encode("utf-8"))
+        return manifest
+
+
+def materialize(site_dir: Path, manifest_path: Path | None = None) -> list[str]:
+    """
+    Recreate the hashed copies listed in manifest.json from the committed
+    fixed-name files: data.rich.json -> data.rich.<hash>.json, its .gz copied
+    from data.rich.json.gz and the other encodings compressed again when
+    their package is installed. Returns the paths written.
+    """
+    manifest_path = manifest_path or site_dir / "manifest.json"
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    written = []
+    for name, entry in manifest.get("files", {}).items():
+        src = site_dir / name
+        data = src.read_bytes()
+        if content_hash(data) != entry["sha256"]:
+            raise ValueError(f"{src} does not match manifest.json")
+        _write_if_changed(site_dir / entry["path"], data)
+        written.append(entry["path"])
+
+        for encoding, enc in entry.get("encodings", {}).items():
+            src_gz = site_dir / (name + ".gz")
+            if encoding == "gzip" and src_gz.exists():
+                shutil.copyfile(src_gz, site_dir / enc["path"])
+            elif encoding in ENCODINGS:
+                _write_if_changed(site_dir / enc["path"], ENCODINGS[encoding][1](data))
+            else:
+                continue
+            written.append(enc["path"])
+    return written
+
+
+if __name__ == "__main__":
+    site = Path(sys.argv[1] if len(sys.argv) > 1 else "server/site")
+    for path in materialize(site):
+        print(path)
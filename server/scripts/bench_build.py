@@ -0,0 +1,169 @@
+"""
+Benchmark suite for build_dataset.py.
+
+For every scale it generates a synthetic Overpass dump (gen_overpass.py),
+then runs the real build (build_dataset.collect and write_outputs, the same
+stages and BuildStats as a build_dataset.py run) in a fresh child process
+and an empty output directory, so the peak RSS belongs to that scale alone
+and no output is skipped as unchanged. The report is JSON, one entry per
+scale with wall seconds per stage, the full BuildStats stages (CPU time,
+peak RSS), counters and output sizes, plus enough metadata (commit, Python,
+CPU count) to compare runs across commits:
+
+    python server/scripts/bench_build.py --scales 1 10 --report bench_report.json
+    python server/scripts/bench_build.py --scales 1 10 --compare old_report.json
+    python server/scripts/bench_build.py --scales 1 --stream --workers 4 --profile gzip
+
+Inputs are cached in --workdir, so repeated runs skip generation.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+REPO_ROOT = SCRIPTS_DIR.parents[1]
+REPORT_SCHEMA = 3
+
+
+def run_one(input_path: Path, out_dir: Path, build_args: list[str], profile: str | None) -> dict:
+    """Build one input with outputs in out_dir. Called in the child process."""
+    import contextlib
+
+    import build_dataset as bd
+    import details_store
+    from buildstats import BuildStats
+
+    # build_dataset writes to paths relative to the working directory
+    shutil.rmtree(out_dir, ignore_errors=True)
+    out_dir.mkdir(parents=True)
+    os.chdir(out_dir)
+
+    args = bd.parse_args(["--input", str(input_path), *build_args])
+    stats = BuildStats(profile, out_dir)
+    # The build prints progress; stdout carries the result
+    with contextlib.redirect_stdout(sys.stderr):
+        with details_store.DetailsWriter(bd.OUT_DETAILS) as details:
+            rows_min, rows_rich = bd.collect(args, stats=stats, details=details)
+            bd.write_outputs(rows_min, rows_rich, stats, details)
+    report = stats.report()
+
+    return {
+        "elements": stats.counters.get("elements_seen", 0),
+        "rows": len(rows_rich),
+        "input_bytes": input_path.stat().st_size,
+        "build_args": build_args,
+        "stages": {name: st["wall_s"] for name, st in report["stages"].items()},
+        "total_s": report["total"]["wall_s"],
+        "peak_rss_mib": report["total"]["process_peak_rss_mib"],
+        "stage_details": report["stages"],
+        "counters": report["counters"],
+        "profile_files": report.get("profile_files", []),
+        "outputs": bd.output_sizes(),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return ""
+
+
+def bench_scale(scale: float, workdir: Path, seed: int, build_args: list[str], profile: str | None) -> dict:
+    import gen_overpass
+
+    input_path = workdir / f"overpass_{scale:g}x_seed{seed}.json"
+    if not input_path.exists():
+        print(f"Generating {input_path} ...")
+        gen_overpass.generate(input_path, scale, seed)
+
+    out_dir = workdir / f"out_{scale:g}x"
+    cmd = [sys.executable, str(Path(__file__).resolve()), "--run-one", str(input_path), "--out-dir", str(out_dir)]
+    cmd += ["--build-args", json.dumps(build_args)]
+    if profile:
+        cmd += ["--profile", profile]
+    child = subprocess.run(
+        cmd,
+        cwd=SCRIPTS_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if child.returncode != 0:
+        raise RuntimeError(f"Benchmark at scale {scale:g} failed:\n{child.stderr}")
+    result = json.loads(child.stdout.strip().splitlines()[-1])
+    result["scale"] = scale
+    return result
+
+
+def print_result(r: dict, old: dict | None = None):
+    print(f"\nscale {r['scale']:g}x: {r['elements']:,} elements, {r['rows']:,} rows, peak RSS {r['peak_rss_mib']} MiB")
+    for name, sec in r["stages"].items():
+        line = f"  {name:<12}{sec:9.3f} s  {r['stage_details'][name]['peak_rise_mib']:+8.1f} MiB peak"
+        if old and name in old.get("stages", {}) and old["stages"][name] > 0:
+            line += f"   ({sec / old['stages'][name]:.2f}x of baseline)"
+        print(line)
+    total = f"  {'total':<12}{r['total_s']:9.3f} s  {r['peak_rss_mib']:8.1f} MiB"
+    if old and old.get("total_s"):
+        total += f"   ({r['total_s'] / old['total_s']:.2f}x of baseline)"
+    print(total)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--scales", type=float, nargs="+", default=[1, 10], help="Dataset size multiples, e.g. 1 10 100")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--workdir", type=Path, default=Path(tempfile.gettempdir()) / "lighthouse_bench")
+    ap.add_argument("--report", type=Path, default=Path("bench_report.json"))
+    ap.add_argument("--compare", type=Path, help="Earlier report to compare stage times against")
+    ap.add_argument("--stream", action="store_true", help="Build with build_dataset.py --stream")
+    ap.add_argument("--workers", type=int, default=1, help="Build with build_dataset.py --workers N")
+    ap.add_argument("--profile", metavar="STAGE", help="Profile STAGE as build_dataset.py --profile does, dumps go to the output dir")
+    ap.add_argument("--run-one", type=Path, help=argparse.SUPPRESS)
+    ap.add_argument("--out-dir", type=Path, help=argparse.SUPPRESS)
+    ap.add_argument("--build-args", type=json.loads, default=[], help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+
+    if args.run_one:
+        print(json.dumps(run_one(args.run_one.resolve(), args.out_dir.resolve(), args.build_args, args.profile)))
+        return
+
+    build_args = (["--stream"] if args.stream else []) + ["--workers", str(args.workers)]
+
+    baseline = {}
+    if args.compare:
+        old = json.loads(args.compare.read_text(encoding="utf-8"))
+        baseline = {r["scale"]: r for r in old.get("results", [])}
+
+    args.workdir.mkdir(parents=True, exist_ok=True)
+    results = []
+    for scale in args.scales:
+        r = bench_scale(scale, args.workdir, args.seed, build_args, args.profile)
+        print_result(r, baseline.get(scale))
+        results.append(r)
+
+    report = {
+        "schema": REPORT_SCHEMA,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seed": args.seed,
+        "results": results,
+    }
+    args.report.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"\nReport written: {args.report}")
+
+
+if __name__ == "__main__":
+    main()
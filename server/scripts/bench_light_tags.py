@@ -0,0 +1,240 @@
+"""
+Micro-benchmark for seamark light tag parsing.
+
+Compares the per-element cost of the previous multi-scan helpers (kept here
+verbatim as legacy_*) with the single-pass seamark.parse_light_tags() path
+used by build_dataset.py, and checks that both produce the same rows.
+
+    python server/scripts/bench_light_tags.py [--input data/lighthousedata.json] [--repeat 5]
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import build_dataset
+from overpass_stream import iter_elements
+from seamark import parse_float
+
+# Representative tag sets, used when no Overpass dump is available
+SAMPLE_TAGS = [
+    {
+        "seamark:type": "light_minor",
+        "seamark:light:character": "Fl",
+        "seamark:light:colour": "green",
+        "seamark:light:period": "3",
+        "seamark:light:sequence": "0.5+(2.5)",
+        "seamark:light:range": "4",
+        "name": "Macduff Pier",
+    },
+    {
+        "man_made": "lighthouse",
+        "seamark:type": "light_major",
+        "seamark:name": "Streiti",
+        **{
+            f"seamark:light:{i}:{f}": v
+            for i in range(1, 5)
+            for f, v in (
+                ("character", "Fl(2)"),
+                ("colour", ("white", "red", "green", "white")[i - 1]),
+                ("period", "20"),
+                ("sequence", "1.5+(4),1.5+(13)"),
+                ("sector_start", str(i * 80)),
+                ("sector_end", str(i * 80 + 60)),
+                ("range", "12"),
+                ("height", "24"),
+            )
+        },
+    },
+    {"man_made": "lighthouse", "name": "Old tower", "building": "yes"},
+]
+
+
+def legacy_has_unindexed_light(tags: dict) -> bool:
+    # seamark:light:colour, seamark:light:period etc, but not seamark:light:<n>:...
+    for k in (tags or {}).keys():
+        ks = str(k)
+        if ks.startswith("seamark:light:") and ":1:" not in ks and ":2:" not in ks and ":3:" not in ks:
+            # This is a cheap check, the proper check is "seamark:light:<n>:"
+            # We treat any non-indexed key under seamark:light: as unindexed.
+            # Example: seamark:light:colour
+            parts = ks.split(":")
+            if len(parts) == 3:
+                return True
+    return False
+
+
+def legacy_indexed_keys(tags: dict) -> set[int]:
+    idxs = set()
+    for k in (tags or {}).keys():
+        ks = str(k)
+        if not ks.startswith("seamark:light:"):
+            continue
+        parts = ks.split(":")
+        if len(parts) < 4:
+            continue
+        # seamark:light:<n>:field
+        try:
+            idx = int(parts[2])
+            idxs.add(idx)
+        except Exception:
+            pass
+    return idxs
+
+
+def legacy_first_light_index(tags: dict) -> int | None:
+    if not isinstance(tags, dict):
+        return None
+    if legacy_has_unindexed_light(tags):
+        return 0
+
+    idxs = legacy_indexed_keys(tags)
+    if idxs:
+        return min(idxs)
+
+    # Some datasets only include :1: keys but our scan missed them due to formatting
+    if any(str(k).startswith("seamark:light:1:") for k in tags.keys()):
+        return 1
+
+    return None
+
+
+def legacy_main_light_fields(tags: dict) -> dict:
+    idx = legacy_first_light_index(tags)
+    if idx is None:
+        return {
+            "main_colour": "",
+            "main_period": None,
+            "main_character": "",
+            "main_sequence": "",
+        }
+
+    if idx == 0:
+        character = tags.get("seamark:light:character", "") or ""
+        colour = tags.get("seamark:light:colour", "") or ""
+        period = parse_float(tags.get("seamark:light:period", ""))
+        sequence = tags.get("seamark:light:sequence", "") or ""
+        return {
+            "main_colour": str(colour).lower(),
+            "main_period": period,
+            "main_character": str(character),
+            "main_sequence": str(sequence),
+        }
+
+    base = f"seamark:light:{idx}:"
+    character = tags.get(base + "character", "") or ""
+    colour = tags.get(base + "colour", "") or ""
+    period = parse_float(tags.get(base + "period", ""))
+    sequence = tags.get(base + "sequence", "") or ""
+    return {
+        "main_colour": str(colour).lower(),
+        "main_period": period,
+        "main_character": str(character),
+        "main_sequence": str(sequence),
+    }
+
+
+def legacy_parse_sectors(tags: dict, limit: int = 5) -> list[dict]:
+    """
+    Returns compact sector list:
+      { "ss": <start_deg>, "se": <end_deg>, "c": <colour>, "q": <sequence>, "p": <period>, "ch": <character> }
+    Values are strings where input is not numeric.
+    """
+    if not isinstance(tags, dict):
+        return []
+
+    # Collect per index
+    sectors: dict[int, dict] = {}
+    for k, v in tags.items():
+        ks = str(k)
+        if not ks.startswith("seamark:light:"):
+            continue
+        parts = ks.split(":")
+        if len(parts) < 4:
+            continue
+        # seamark:light:<idx>:<field>
+        try:
+            idx = int(parts[2])
+        except Exception:
+            continue
+        field = ":".join(parts[3:])
+        sectors.setdefault(idx, {})[field] = v
+
+    if not sectors:
+        return []
+
+    out = []
+    for idx in sorted(sectors.keys()):
+        s = sectors[idx]
+        ss = s.get("sector_start", "")
+        se = s.get("sector_end", "")
+        c = str(s.get("colour", "") or "").lower()
+        q = str(s.get("sequence", "") or "")
+        p = parse_float(s.get("period", ""))
+        ch = str(s.get("character", "") or "")
+        out.append({"ss": ss, "se": se, "c": c, "q": q, "p": p, "ch": ch})
+
+        if len(out) >= limit:
+            break
+
+    return out
+
+
+def legacy_rows(tags: dict) -> tuple[dict, list]:
+    return legacy_main_light_fields(tags), legacy_parse_sectors(tags, limit=5)
+
+
+def single_pass_rows(tags: dict) -> tuple[dict, list]:
+    rec = build_dataset.seamark.parse_light_tags(tags)
+    return build_dataset.main_light_fields(rec), build_dataset.parse_sectors(rec, limit=5)
+
+
+def load_tag_sets(path: Path) -> list[dict]:
+    if not path.exists():
+        print(f"{path} not found, using {len(SAMPLE_TAGS)} built-in sample tag sets")
+        return SAMPLE_TAGS
+    out = []
+    for el in iter_elements(path):
+        tags = el.get("tags") or {}
+        if build_dataset.seamark.parse_light_tags(tags)["is_light"]:
+            out.append(tags)
+    return out
+
+
+def time_per_element(fn, tag_sets: list[dict], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        for tags in tag_sets:
+            fn(tags)
+        best = min(best, time.perf_counter() - t)
+    return best / len(tag_sets) * 1e9
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--input", type=Path, default=build_dataset.IN_JSON)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args(argv)
+
+    tag_sets = load_tag_sets(args.input)
+    if len(tag_sets) < 10_000:
+        # Enough iterations for stable timings on small inputs
+        tag_sets = tag_sets * (10_000 // len(tag_sets) + 1)
+
+    # The legacy helpers looked up the main light under the canonical index
+    # ("seamark:light:1:") even when the tags spelled it "01:", so such tag
+    # sets are the only expected differences.
+    mismatches = sum(1 for tags in tag_sets if legacy_rows(tags) != single_pass_rows(tags))
+
+    before = time_per_element(legacy_rows, tag_sets, args.repeat)
+    after = time_per_element(single_pass_rows, tag_sets, args.repeat)
+    print(f"elements:    {len(tag_sets)}")
+    print(f"mismatches:  {mismatches}")
+    print(f"before:      {before:8.0f} ns/element (legacy multi-scan)")
+    print(f"after:       {after:8.0f} ns/element (seamark.parse_light_tags)")
+    print(f"speedup:     {before / after:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
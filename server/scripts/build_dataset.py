@@ -1,9 +1,27 @@
+import argparse
+import hashlib
 import json
-import gzip
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 
 import pandas as pd
 
+import artifacts
+import columnar
+import dataset_manifest
+import details_store
+import geometry
+import incremental
+import light_db
+import parallel
+import seamark
+import tiles
+from buildstats import BuildStats, peak_rss_mib
+from overpass_stream import iter_elements, open_text
+from seamark import parse_float
+
 IN_JSON = Path("data/lighthousedata.json")
 
 # Keep existing outputs unchanged
@@ -15,15 +33,44 @@ OUT_JSON_GZ = Path("server/site/data.min.json.gz")
 OUT_RICH_JSON = Path("server/site/data.rich.json")
 OUT_RICH_JSON_GZ = Path("server/site/data.rich.json.gz")
 
+# Binary columnar dataset (see columnar.py for the layout)
+OUT_COLUMNAR = Path("server/site/data.col.bin")
+OUT_COLUMNAR_GZ = Path("server/site/data.col.bin.gz")
+
+# Spatial tile pyramid for viewport based loading
+OUT_TILES_DIR = Path("server/site/tiles")
+
+# Logical name -> content-hashed file and its precompressed variants
+OUT_MANIFEST = Path("server/site/manifest.json")
+
+# Incremental builds: per-key state of the last build and the delta clients can apply
+STATE_JSON = Path("data/build_state.json")
+OUT_DELTA_JSON = Path("server/site/data.delta.json")
+
+# Tags of every light with a key -> offset index, for the Pi UI (see details_store.py)
+OUT_DETAILS = Path("data/details.jsonl")
+OUT_DETAILS_INDEX = Path("data/details.idx")
+
+# SQLite copy with name search (FTS5) and a spatial index for the Pi UI
+OUT_DB = Path("data/lighthouses.sqlite")
+
+# Counts, source dump and output sizes of the last build, read by status pages
+OUT_DATASET_MANIFEST = Path("server/site/dataset.json")
 
-def is_light_feature(tags: dict) -> bool:
-    if not tags:
-        return False
-    if tags.get("man_made") == "lighthouse":
-        return True
-    if tags.get("building") == "lighthouse":
-        return True
-    return any(str(k).startswith("seamark:light") for k in tags.keys())
+# Stage timings, counters and output sizes of the last build (--profile dumps go next to it)
+BUILD_REPORT_JSON = Path("data/build_report.json")
+
+# --incremental leaves the outputs alone only if they were built by the same code
+ROW_BUILDER_SOURCES = (Path(__file__).resolve(), Path(seamark.__file__).resolve())
+
+MIN_FIELDS = ("key", "osm_type", "osm_id", "lat", "lon", "name", "color", "sequence")
+
+
+def builder_version() -> str:
+    h = hashlib.sha256()
+    for p in ROW_BUILDER_SOURCES:
+        h.update(p.read_bytes())
+    return h.hexdigest()[:16]
 
 
 def pick_colour(tags: dict) -> str:
@@ -56,70 +103,8 @@ def make_key(osm_type: str, osm_id: int) -> str:
     return f"x{osm_id}"
 
 
-def parse_float(x) -> float | None:
-    if x is None:
-        return None
-    s = str(x).strip().lower()
-    if not s:
-        return None
-    s = s.replace("s", "").strip()
-    try:
-        return float(s)
-    except Exception:
-        return None
-
-
-def has_unindexed_light(tags: dict) -> bool:
-    # seamark:light:colour, seamark:light:period etc, but not seamark:light:<n>:...
-    for k in (tags or {}).keys():
-        ks = str(k)
-        if ks.startswith("seamark:light:") and ":1:" not in ks and ":2:" not in ks and ":3:" not in ks:
-            # This is a cheap check, the proper check is "seamark:light:<n>:"
-            # We treat any non-indexed key under seamark:light: as unindexed.
-            # Example: seamark:light:colour
-            parts = ks.split(":")
-            if len(parts) == 3:
-                return True
-    return False
-
-
-def indexed_keys(tags: dict) -> set[int]:
-    idxs = set()
-    for k in (tags or {}).keys():
-        ks = str(k)
-        if not ks.startswith("seamark:light:"):
-            continue
-        parts = ks.split(":")
-        if len(parts) < 4:
-            continue
-        # seamark:light:<n>:field
-        try:
-            idx = int(parts[2])
-            idxs.add(idx)
-        except Exception:
-            pass
-    return idxs
-
-
-def first_light_index(tags: dict) -> int | None:
-    if not isinstance(tags, dict):
-        return None
-    if has_unindexed_light(tags):
-        return 0
-
-    idxs = indexed_keys(tags)
-    if idxs:
-        return min(idxs)
-
-    # Some datasets only include :1: keys but our scan missed them due to formatting
-    if any(str(k).startswith("seamark:light:1:") for k in tags.keys()):
-        return 1
-
-    return None
-
-
-def main_light_fields(tags: dict) -> dict:
-    idx = first_light_index(tags)
+def main_light_fields(rec: dict) -> dict:
+    idx = rec["main_index"]
     if idx is None:
         return {
             "main_colour": "",
@@ -128,212 +113,534 @@ def main_light_fields(tags: dict) -> dict:
             "main_sequence": "",
         }
 
-    if idx == 0:
-        character = tags.get("seamark:light:character", "") or ""
-        colour = tags.get("seamark:light:colour", "") or ""
-        period = parse_float(tags.get("seamark:light:period", ""))
-        sequence = tags.get("seamark:light:sequence", "") or ""
-        return {
-            "main_colour": str(colour).lower(),
-            "main_period": period,
-            "main_character": str(character),
-            "main_sequence": str(sequence),
-        }
-
-    base = f"seamark:light:{idx}:"
-    character = tags.get(base + "character", "") or ""
-    colour = tags.get(base + "colour", "") or ""
-    period = parse_float(tags.get(base + "period", ""))
-    sequence = tags.get(base + "sequence", "") or ""
+    fields = rec["single"] if idx == 0 else rec["lights"][idx]
     return {
-        "main_colour": str(colour).lower(),
-        "main_period": period,
-        "main_character": str(character),
-        "main_sequence": str(sequence),
+        "main_colour": str(fields.get("colour", "") or "").lower(),
+        "main_period": parse_float(fields.get("period", "")),
+        "main_character": str(fields.get("character", "") or ""),
+        "main_sequence": str(fields.get("sequence", "") or ""),
     }
 
 
-def parse_sectors(tags: dict, limit: int = 5) -> list[dict]:
+def parse_sectors(rec: dict, limit: int = 5) -> list[dict]:
     """
     Returns compact sector list:
       { "ss": <start_deg>, "se": <end_deg>, "c": <colour>, "q": <sequence>, "p": <period>, "ch": <character> }
     Values are strings where input is not numeric.
     """
-    if not isinstance(tags, dict):
-        return []
-
-    # Collect per index
-    sectors: dict[int, dict] = {}
-    for k, v in tags.items():
-        ks = str(k)
-        if not ks.startswith("seamark:light:"):
-            continue
-        parts = ks.split(":")
-        if len(parts) < 4:
-            continue
-        # seamark:light:<idx>:<field>
-        try:
-            idx = int(parts[2])
-        except Exception:
-            continue
-        field = ":".join(parts[3:])
-        sectors.setdefault(idx, {})[field] = v
-
-    if not sectors:
-        return []
-
+    lights = rec["lights"]
     out = []
-    for idx in sorted(sectors.keys()):
-        s = sectors[idx]
-        ss = s.get("sector_start", "")
-        se = s.get("sector_end", "")
-        c = str(s.get("colour", "") or "").lower()
-        q = str(s.get("sequence", "") or "")
-        p = parse_float(s.get("period", ""))
-        ch = str(s.get("character", "") or "")
-        out.append({"ss": ss, "se": se, "c": c, "q": q, "p": p, "ch": ch})
-
-        if len(out) >= limit:
-            break
-
+    for idx in sorted(lights)[:limit]:
+        s = lights[idx]
+        out.append(
+            {
+                "ss": s.get("sector_start", ""),
+                "se": s.get("sector_end", ""),
+                "c": str(s.get("colour", "") or "").lower(),
+                "q": str(s.get("sequence", "") or ""),
+                "p": parse_float(s.get("period", "")),
+                "ch": str(s.get("character", "") or ""),
+            }
+        )
     return out
 
 
-def compute_lat_lon(el: dict, node_xy: dict[int, tuple[float, float]]) -> tuple[float, float] | None:
-    osm_type = el.get("type")
-    if osm_type == "node":
-        if "lat" not in el or "lon" not in el:
-            return None
-        return float(el["lat"]), float(el["lon"])
+def node_lat_lon(el: dict) -> tuple[float, float] | None:
+    if "lat" not in el or "lon" not in el:
+        return None
+    return float(el["lat"]), float(el["lon"])
+
+
+def json_minified(obj) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
 
-    if osm_type == "way":
-        node_ids = el.get("nodes") or []
-        pts = [node_xy.get(int(n)) for n in node_ids]
-        pts = [p for p in pts if p is not None]
-        if not pts:
-            return None
-        lat = sum(p[0] for p in pts) / len(pts)
-        lon = sum(p[1] for p in pts) / len(pts)
-        return float(lat), float(lon)
 
-    return None
+def build_rows(
+    osm_type: str, oid: int, tags: dict, rec: dict, lat: float | None, lon: float | None
+) -> tuple[dict, dict]:
+    """Rows of one light; `rec` is seamark.parse_light_tags(tags)."""
+    key = make_key(osm_type, oid)
 
+    name = pick_name(tags, f"Lighthouse {oid}")
+    color = pick_colour(tags)
+    sequence = pick_sequence(tags)
 
-def write_json_minified(path: Path, obj) -> str:
-    payload = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(payload, encoding="utf-8")
-    return payload
+    # Minimal row (keep identical schema as before)
+    row_min = {
+        "key": key,
+        "osm_type": osm_type,
+        "osm_id": oid,
+        "lat": lat,
+        "lon": lon,
+        "name": name,
+        "color": color,
+        "sequence": sequence,
+    }
 
+    # Rich row, from the single pass over the tags that also found the light
+    ml = main_light_fields(rec)
+    sectors = parse_sectors(rec, limit=5)
+
+    row_rich = {
+        "key": key,
+        "osm_type": osm_type,
+        "osm_id": oid,
+        "lat": lat,
+        "lon": lon,
+        "name": name,
+        "color": color,
+        "sequence": sequence,
+        "main_colour": ml.get("main_colour", ""),
+        "main_period": ml.get("main_period", None),
+        "main_character": ml.get("main_character", ""),
+        "main_sequence": ml.get("main_sequence", ""),
+        "sectors": sectors,
+    }
+    return row_min, row_rich
 
-def write_gzip_text(path: Path, text: str):
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with gzip.open(path, "wt", encoding="utf-8", compresslevel=9) as f:
-        f.write(text)
 
+def load_elements(path: Path, stats: BuildStats | None = None) -> list:
+    if stats is None:
+        stats = BuildStats()
 
-def main():
-    raw = IN_JSON.read_text(encoding="utf-8").strip()
+    with stats.stage("read"):
+        with open_text(path) as f:
+            raw = f.read().strip()
     if not raw:
-        raise RuntimeError("data/lighthousedata.json is empty")
+        raise RuntimeError(f"{path} is empty")
 
-    data = json.loads(raw)
+    with stats.stage("parse"):
+        data = json.loads(raw)
+        del raw
     elements = data.get("elements", [])
     if not isinstance(elements, list):
         raise RuntimeError("Expected dict with key 'elements' being a list")
+    return elements
 
-    # Node index for way centroid calc
-    node_xy: dict[int, tuple[float, float]] = {}
-    for el in elements:
-        if el.get("type") == "node" and "lat" in el and "lon" in el and el.get("id") is not None:
-            node_xy[int(el["id"])] = (float(el["lat"]), float(el["lon"]))
 
-    seen = set()
-    rows_min = []
-    rows_rich = []
+def scan_chunk(elements: list, nodes: bool = False, hashes: bool = False, details: bool = False) -> dict:
+    """
+    Everything done per element, for one chunk of the dump; a process pool
+    task with --workers, called in process otherwise. Returns
+      entries  [osm_type, osm_id, row_min, row_rich, way node ids or None]
+               for every light with a position or way nodes, in element order
+      nodes    (ids, lats, lons) arrays of every node with coordinates, if `nodes`
+      hashes   [(key, tag hash)] of every light (incremental.tag_hash), if `hashes`
+      details  (keys, line lengths, details.jsonl lines) of every light, if `details`
+      counts   (elements seen, light candidates, skipped without geometry)
+    """
+    entries = []
+    node_ids, node_lat, node_lon = array("q"), array("d"), array("d")
+    tag_hashes = []
+    keys, lengths, lines = [], [], []
+    candidates = 0
+    skipped = 0
 
     for el in elements:
         osm_type = el.get("type")
         osm_id = el.get("id")
+
+        if nodes and osm_type == "node" and "lat" in el and "lon" in el and osm_id is not None:
+            node_ids.append(int(osm_id))
+            node_lat.append(float(el["lat"]))
+            node_lon.append(float(el["lon"]))
+
         if osm_type not in ("node", "way", "relation") or osm_id is None:
             continue
 
-        tags = el.get("tags") or {}
-        if not is_light_feature(tags):
+        tags = el.get("tags")
+        if not tags:
             continue
+        # One pass over the tags both finds lights and parses them
+        rec = seamark.parse_light_tags(tags)
+        if not rec["is_light"]:
+            continue
+        candidates += 1
 
-        ll = compute_lat_lon(el, node_xy)
-        if not ll:
+        oid = int(osm_id)
+        key = make_key(osm_type, oid)
+        if hashes:
+            tag_hashes.append((key, incremental.tag_hash(tags)))
+        if details:
+            line = details_store.encode_record(key, osm_type, oid, tags)
+            keys.append(key)
+            lengths.append(len(line))
+            lines.append(line)
+        if osm_type == "node":
+            ll = node_lat_lon(el)
+            if not ll:
+                skipped += 1
+                continue
+            entries.append([osm_type, oid, *build_rows(osm_type, oid, tags, rec, ll[0], ll[1]), None])
+        elif osm_type == "way":
+            way_nodes = [int(n) for n in (el.get("nodes") or [])]
+            if not way_nodes:
+                skipped += 1
+                continue
+            entries.append([osm_type, oid, *build_rows(osm_type, oid, tags, rec, None, None), way_nodes])
+        else:
+            # Relations have no position of their own
+            skipped += 1
+
+    return {
+        "entries": entries,
+        "nodes": (node_ids, node_lat, node_lon) if nodes else None,
+        "hashes": tag_hashes,
+        "details": (keys, lengths, b"".join(line + b"\n" for line in lines)) if details else None,
+        "counts": (len(elements), candidates, skipped),
+    }
+
+
+def index_nodes(elements, store: geometry.NodeStore, only: set[int] | None = None):
+    """Add the coordinates of all nodes, or of the ids in `only`, to `store`."""
+    for el in elements:
+        if el.get("type") != "node" or "lat" not in el or "lon" not in el or el.get("id") is None:
+            continue
+        nid = int(el["id"])
+        if only is None or nid in only:
+            store.add(nid, float(el["lat"]), float(el["lon"]))
+
+
+def collect_candidates(
+    elements,
+    store: geometry.NodeStore | None,
+    wanted: set[int] | None = None,
+    hashes: dict[str, str] | None = None,
+    builder: parallel.ChunkedBuilder | None = None,
+    stats: BuildStats | None = None,
+    details: details_store.DetailsWriter | None = None,
+) -> list[list]:
+    """
+    Build rows for every light feature in element order. Node coordinates go
+    into `store`, either all of them or, if `wanted` is given, only the ones
+    referenced by light ways (`wanted` is filled as ways are seen). With no
+    `store` the nodes are expected to be indexed separately (index_nodes).
+    `hashes`, if given, gets the tag hash of every light (incremental.tag_hash);
+    `details`, if given, gets the tags of every light as it is seen.
+    The elements are scanned in chunks by scan_chunk(), on the `builder`'s
+    process pool if there is one; this only merges the results.
+    Returns [osm_type, osm_id, row_min, row_rich, way node ids or None] entries;
+    way rows get their position in finish_rows().
+    """
+    pending: list[list] = []
+    counts = [0, 0, 0]
+    task = partial(scan_chunk, nodes=store is not None, hashes=hashes is not None, details=details is not None)
+
+    def merge(result: dict):
+        entries = result["entries"]
+        pending.extend(entries)
+        if store is not None:
+            if wanted is not None:
+                for entry in entries:
+                    if entry[4] is not None:
+                        wanted.update(entry[4])
+            store.add_many(*result["nodes"], only=wanted)
+        if hashes is not None:
+            hashes.update(result["hashes"])
+        if details is not None:
+            details.add_block(*result["details"])
+        for i, n in enumerate(result["counts"]):
+            counts[i] += n
+
+    if builder is not None:
+        builder.run(task, parallel.chunks(elements), merge)
+    else:
+        for chunk in parallel.chunks(elements):
+            merge(task(chunk))
+
+    if stats is not None:
+        stats.count("elements_seen", counts[0])
+        stats.count("light_candidates", counts[1])
+        stats.count("skipped_no_geometry", counts[2])
+    return pending
+
+
+def finish_rows(pending: list[list], store: geometry.NodeStore, stats: BuildStats | None = None) -> tuple[list, list]:
+    """Resolve all way centroids in one batch, then drop unplaced and duplicate features."""
+    ways = [p for p in pending if p[4] is not None]
+    for p, ll in zip(ways, geometry.way_centroids(store, [p[4] for p in ways])):
+        if ll is None:
+            p[4] = False
+            continue
+        p[2]["lat"] = p[3]["lat"] = ll[0]
+        p[2]["lon"] = p[3]["lon"] = ll[1]
+
+    seen = set()
+    rows_min = []
+    rows_rich = []
+    unplaced = 0
+    duplicates = 0
+    for osm_type, oid, row_min, row_rich, node_ids in pending:
+        if node_ids is False:
+            unplaced += 1
             continue
-        lat, lon = ll
 
-        key_tuple = (osm_type, int(osm_id))
+        key_tuple = (osm_type, oid)
         if key_tuple in seen:
+            duplicates += 1
             continue
         seen.add(key_tuple)
 
-        oid = int(osm_id)
-        key = make_key(osm_type, oid)
+        rows_min.append(row_min)
+        rows_rich.append(row_rich)
 
-        name = pick_name(tags, f"Lighthouse {oid}")
-        color = pick_colour(tags)
-        sequence = pick_sequence(tags)
+    if stats is not None:
+        stats.count("ways", len(ways))
+        stats.count("unplaced", unplaced)
+        stats.count("duplicates", duplicates)
+        stats.count("rows", len(rows_rich))
+    return rows_min, rows_rich
 
-        # Minimal row (keep identical schema as before)
-        rows_min.append(
-            {
-                "key": key,
-                "osm_type": osm_type,
-                "osm_id": oid,
-                "lat": lat,
-                "lon": lon,
-                "name": name,
-                "color": color,
-                "sequence": sequence,
-            }
-        )
 
-        # Rich row
-        ml = main_light_fields(tags)
-        sectors = parse_sectors(tags, limit=5)
+def collect_rows(
+    elements: list, hashes=None, builder=None, stats: BuildStats | None = None, details: details_store.DetailsWriter | None = None
+) -> tuple[list, list]:
+    if stats is None:
+        stats = BuildStats()
 
-        rows_rich.append(
-            {
-                "key": key,
-                "osm_type": osm_type,
-                "osm_id": oid,
-                "lat": lat,
-                "lon": lon,
-                "name": name,
-                "color": color,
-                "sequence": sequence,
-                "main_colour": ml.get("main_colour", ""),
-                "main_period": ml.get("main_period", None),
-                "main_character": ml.get("main_character", ""),
-                "main_sequence": ml.get("main_sequence", ""),
-                "sectors": sectors,
-            }
-        )
+    store = geometry.NodeStore()
+    with stats.stage("node_index"):
+        index_nodes(elements, store)
+        store.freeze()
+    with stats.stage("row_build"):
+        pending = collect_candidates(elements, None, hashes=hashes, builder=builder, stats=stats, details=details)
+    with stats.stage("centroids"):
+        return finish_rows(pending, store, stats)
 
-    # Parquet stays useful for analysis and is optional for GitHub Pages
-    df = pd.DataFrame(rows_min)
-    OUT_PARQUET.parent.mkdir(parents=True, exist_ok=True)
-    df.to_parquet(OUT_PARQUET, index=False)
 
-    # Write minimal JSON and gzip (unchanged fields)
-    payload_min = write_json_minified(OUT_JSON, rows_min)
-    write_gzip_text(OUT_JSON_GZ, payload_min)
+def collect_rows_streaming(
+    path: Path, hashes=None, builder=None, stats: BuildStats | None = None, details: details_store.DetailsWriter | None = None
+) -> tuple[list, list]:
+    """
+    Same result as collect_rows(load_elements(path)), but reads the dump
+    incrementally. Only light features and the coordinates of nodes that
+    their ways reference are kept, so memory scales with the number of
+    lights instead of the size of the dump.
+    """
+    if stats is None:
+        stats = BuildStats()
+
+    # Overpass prints the way skeleton nodes ("> ; out skel qt;") after
+    # the ways, so most coordinates we need arrive after they are wanted.
+    # Reading, parsing and row building share this one pass.
+    store = geometry.NodeStore()
+    wanted: set[int] = set()
+    with stats.stage("scan"):
+        pending = collect_candidates(
+            iter_elements(path), store, wanted, hashes=hashes, builder=builder, stats=stats, details=details
+        )
+
+    # Nodes printed before the way that uses them need a second, filtered pass
+    with stats.stage("node_index"):
+        missing = store.missing(wanted)
+        if missing:
+            index_nodes(iter_elements(path), store, only=missing)
+        stats.count("second_pass_nodes", len(missing))
+        del wanted, missing
+
+    with stats.stage("centroids"):
+        return finish_rows(pending, store, stats)
+
+
+def output_sizes() -> dict[str, int]:
+    sizes = {}
+    for p in (
+        OUT_PARQUET,
+        OUT_JSON,
+        OUT_JSON_GZ,
+        OUT_RICH_JSON,
+        OUT_RICH_JSON_GZ,
+        OUT_COLUMNAR,
+        OUT_COLUMNAR_GZ,
+        OUT_MANIFEST,
+        OUT_DETAILS,
+        OUT_DETAILS_INDEX,
+        OUT_DB,
+    ):
+        if p.exists():
+            sizes[str(p)] = p.stat().st_size
+    if OUT_TILES_DIR.exists():
+        sizes[str(OUT_TILES_DIR)] = sum(f.stat().st_size for f in OUT_TILES_DIR.rglob("*") if f.is_file())
+    return sizes
+
+
+def write_outputs(rows_min: list, rows_rich: list, stats: BuildStats | None = None, details: details_store.DetailsWriter | None = None) -> str:
+    if stats is None:
+        stats = BuildStats()
 
-    # Write rich JSON and gzip
-    payload_rich = write_json_minified(OUT_RICH_JSON, rows_rich)
-    write_gzip_text(OUT_RICH_JSON_GZ, payload_rich)
+    # Parquet stays useful for analysis and is optional for GitHub Pages
+    with stats.stage("parquet"):
+        df = pd.DataFrame(rows_min)
+        OUT_PARQUET.parent.mkdir(parents=True, exist_ok=True)
+        df.to_parquet(OUT_PARQUET, index=False)
+
+    # Minimal JSON (unchanged fields), rich JSON and the binary columnar copy,
+    # each under its fixed name and a content-hashed one listed in manifest.json
+    site = artifacts.Publisher(OUT_MANIFEST.parent, OUT_MANIFEST)
+    with stats.stage("json_min"):
+        payload_min = json_minified(rows_min)
+        site.write(OUT_JSON.name, payload_min.encode("utf-8"), OUT_JSON)
+    with stats.stage("json_rich"):
+        payload_rich = json_minified(rows_rich)
+        site.write(OUT_RICH_JSON.name, payload_rich.encode("utf-8"), OUT_RICH_JSON)
+    with stats.stage("columnar"):
+        site.write(OUT_COLUMNAR.name, columnar.encode_columnar(rows_rich), OUT_COLUMNAR)
+
+    # Precompressed variants, skipped for files whose content did not change
+    with stats.stage("gzip"):
+        site.compress(OUT_JSON.name, OUT_JSON_GZ)
+        site.compress(OUT_RICH_JSON.name, OUT_RICH_JSON_GZ)
+        site.compress(OUT_COLUMNAR.name, OUT_COLUMNAR_GZ)
+        site.write_manifest()
+    stats.count("artifacts_unchanged", len(site.skipped))
+
+    # Per-tile shards and low zoom clusters
+    with stats.stage("tiles"):
+        manifest = tiles.write_tiles(OUT_TILES_DIR, rows_rich)
+
+    # Tags of the lights that made it into the dataset, in row order
+    if details is not None:
+        with stats.stage("details"):
+            n_details = details.finish(OUT_DETAILS_INDEX, (r["key"] for r in rows_rich))
+
+    with stats.stage("sqlite"):
+        n_db = light_db.write_light_db(OUT_DB, rows_rich, OUT_DETAILS if details is not None else None)
 
     print(f"Rows written (min):  {len(rows_min)} -> {OUT_JSON}")
     print(f"Rows written (rich): {len(rows_rich)} -> {OUT_RICH_JSON}")
+    if site.skipped:
+        print(f"Unchanged, not rewritten: {', '.join(site.skipped)}")
+    print(f"Columnar written:    {OUT_COLUMNAR.stat().st_size:,} B ({OUT_COLUMNAR_GZ.stat().st_size:,} B gzip) -> {OUT_COLUMNAR}")
+    print(f"Tiles written:       {len(manifest['tiles'])} -> {OUT_TILES_DIR}")
+    if details is not None:
+        print(f"Details written:     {n_details} -> {OUT_DETAILS} (+ {OUT_DETAILS_INDEX.name})")
+    print(f"SQLite written:      {n_db} -> {OUT_DB}")
 
     if not df.empty and "osm_type" in df.columns:
         print(df["osm_type"].value_counts().to_string())
 
+    return payload_rich
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Build the lighthouse datasets from an Overpass dump.")
+    ap.add_argument("--input", type=Path, default=IN_JSON, help="Overpass JSON dump, optionally gzip compressed")
+    ap.add_argument(
+        "--stream",
+        action="store_true",
+        help="Read elements incrementally instead of loading the whole dump (bounded memory)",
+    )
+    ap.add_argument(
+        "--incremental",
+        action="store_true",
+        help=f"Compare tags with the last incremental build ({STATE_JSON}), write {OUT_DELTA_JSON} and leave the outputs alone if nothing changed",
+    )
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Parse tags on N worker processes (output is identical to the serial build)",
+    )
+    ap.add_argument("--report", type=Path, default=BUILD_REPORT_JSON, help="Where to write the JSON build report")
+    ap.add_argument(
+        "--profile",
+        nargs="?",
+        const="",
+        metavar="STAGE",
+        help="Run STAGE (default: row_build, or scan with --stream) under cProfile and tracemalloc, dumps go next to the report",
+    )
+    return ap.parse_args(argv)
+
+
+def collect(args, hashes=None, stats: BuildStats | None = None, details: details_store.DetailsWriter | None = None) -> tuple[list, list]:
+    if args.workers <= 1:
+        if args.stream:
+            return collect_rows_streaming(args.input, hashes=hashes, stats=stats, details=details)
+        return collect_rows(load_elements(args.input, stats), hashes=hashes, stats=stats, details=details)
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        builder = parallel.ChunkedBuilder(pool, args.workers)
+        if args.stream:
+            return collect_rows_streaming(args.input, hashes=hashes, builder=builder, stats=stats, details=details)
+        return collect_rows(
+            load_elements(args.input, stats), hashes=hashes, builder=builder, stats=stats, details=details
+        )
+
+
+def main_incremental(args, stats: BuildStats) -> tuple[dict, list]:
+    builder = builder_version()
+    with stats.stage("load_state"):
+        state = incremental.load_state(STATE_JSON, builder)
+        prev_sha = incremental.file_hash(OUT_RICH_JSON, OUT_RICH_JSON_GZ)
+    if state["rich_sha256"] != prev_sha:
+        # data.rich.json is not the file this state describes (a full build or
+        # an edit since), so the state says nothing about the outputs
+        if state["items"]:
+            print("Saved state does not match data.rich.json, starting over")
+        state = incremental.empty_state(builder)
+
+    # Rows are always built: reusing the previous ones meant parsing
+    # data.rich.json, which cost as much as building them
+    hashes: dict[str, str] = {}
+    with details_store.DetailsWriter(OUT_DETAILS) as details:
+        rows_min, rows_rich = collect(args, hashes=hashes, stats=stats, details=details)
+
+        with stats.stage("delta"):
+            delta = incremental.compute_delta(state, rows_rich, hashes)
+        n_added, n_changed, n_removed = len(delta["added"]), len(delta["changed"]), len(delta["removed"])
+        print(f"Delta: {n_added} added, {n_changed} changed, {n_removed} removed")
+        summary = {"added": n_added, "changed": n_changed, "removed": n_removed, "outputs_written": False}
+
+        base_sha = state.get("rich_sha256")
+        outputs_exist = all(p.exists() for p in (OUT_RICH_JSON, OUT_DETAILS_INDEX, OUT_DB))
+        if base_sha and not (n_added or n_changed or n_removed) and outputs_exist:
+            print("No changes since last build, outputs left untouched")
+            return summary, rows_rich
+
+        payload_rich = write_outputs(rows_min, rows_rich, stats, details)
+    with stats.stage("save_state"):
+        target_sha = incremental.payload_hash(payload_rich)
+        incremental.write_delta(OUT_DELTA_JSON, delta, base_sha, target_sha)
+        incremental.save_state(STATE_JSON, rows_rich, hashes, target_sha, builder)
+    print(f"Delta written: {OUT_DELTA_JSON}")
+    summary["outputs_written"] = True
+    return summary, rows_rich
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.profile == "":
+        args.profile = "scan" if args.stream else "row_build"
+    stats = BuildStats(args.profile, args.report.parent)
+
+    extra = {
+        "args": {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()},
+        "input": {"path": str(args.input), "bytes": args.input.stat().st_size},
+    }
+    if args.incremental:
+        extra["incremental"], rows_rich = main_incremental(args, stats)
+    else:
+        with details_store.DetailsWriter(OUT_DETAILS) as details:
+            rows_min, rows_rich = collect(args, stats=stats, details=details)
+            write_outputs(rows_min, rows_rich, stats, details)
+        # The outputs no longer match the state and delta of the last
+        # --incremental build; the next one starts over
+        STATE_JSON.unlink(missing_ok=True)
+        OUT_DELTA_JSON.unlink(missing_ok=True)
+    extra["outputs"] = output_sizes()
+
+    # Last, so it records the final size of every output
+    with stats.stage("summary"):
+        manifest = dataset_manifest.build_manifest(rows_rich, args.input, extra["outputs"])
+        written = dataset_manifest.write_manifest(OUT_DATASET_MANIFEST, manifest)
+    print(f"Dataset manifest:    {OUT_DATASET_MANIFEST}{'' if written else ' (unchanged)'}")
+
+    stats.write(args.report, extra)
+    for name, s in stats.stages.items():
+        print(f"  {name:<12}{s['wall_s']:9.3f} s wall {s['cpu_s']:9.3f} s cpu {s['peak_rise_mib']:+8.1f} MiB peak")
+    print(f"Peak RSS: {peak_rss_mib():.1f} MiB")
+    print(f"Build report: {args.report}")
+
 
 if __name__ == "__main__":
     main()
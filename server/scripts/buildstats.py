@@ -0,0 +1,115 @@
+import cProfile
+import json
+import pstats
+import resource
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+REPORT_SCHEMA = 2
+
+
+def peak_rss_mib() -> float:
+    """Peak RSS of the process so far (ru_maxrss), not of any one stage."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+class BuildStats:
+    """
+    Per-stage wall time, CPU time and memory plus element counters for one
+    build. ru_maxrss only ever grows, so a stage records the process peak at
+    its end (process_peak_rss_mib) and how much it raised that peak
+    (peak_rise_mib); a stage that stays below an earlier peak rises by 0. With profile_stage set, that stage also runs under cProfile and
+    tracemalloc and its dumps are written to profile_dir.
+
+    CPU time is the build process only; rows built by --workers processes
+    show up as wall time of the row_build stage.
+    """
+
+    def __init__(self, profile_stage: str | None = None, profile_dir: Path | None = None):
+        self.profile_stage = profile_stage
+        self.profile_dir = profile_dir
+        self.stages: dict[str, dict] = {}
+        self.counters: dict[str, int] = {}
+        self.profile_files: list[str] = []
+        self.started = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        self._wall0 = time.perf_counter()
+        self._cpu0 = time.process_time()
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    @contextmanager
+    def stage(self, name: str):
+        profiling = name == self.profile_stage and self.profile_dir is not None
+        if profiling:
+            prof = cProfile.Profile()
+            tracemalloc.start()
+            prof.enable()
+
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        peak0 = peak_rss_mib()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            if profiling:
+                prof.disable()
+                self._dump_profile(name, prof)
+
+            # A stage that runs twice (e.g. the second streaming pass) accumulates
+            peak = peak_rss_mib()
+            s = self.stages.setdefault(name, {"wall_s": 0.0, "cpu_s": 0.0, "peak_rise_mib": 0.0})
+            s["wall_s"] = round(s["wall_s"] + wall, 4)
+            s["cpu_s"] = round(s["cpu_s"] + cpu, 4)
+            s["peak_rise_mib"] = round(s["peak_rise_mib"] + peak - peak0, 1)
+            s["process_peak_rss_mib"] = round(peak, 1)
+
+    def _dump_profile(self, name: str, prof: cProfile.Profile):
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        prof_path = self.profile_dir / f"build_profile_{name}.prof"
+        prof.dump_stats(prof_path)
+
+        txt_path = self.profile_dir / f"build_profile_{name}.txt"
+        with open(txt_path, "w", encoding="utf-8") as f:
+            f.write(f"# cProfile, stage {name}, top 40 by cumulative time\n")
+            pstats.Stats(prof, stream=f).sort_stats("cumulative").print_stats(40)
+            f.write(f"\n# tracemalloc, stage {name}: current {current / 2**20:.1f} MiB, peak {peak / 2**20:.1f} MiB\n")
+            f.write("# top 30 allocation sites still alive at the end of the stage\n")
+            for stat in snapshot.statistics("lineno")[:30]:
+                f.write(f"{stat}\n")
+
+        self.profile_files += [str(prof_path), str(txt_path)]
+
+    def report(self, extra: dict | None = None) -> dict:
+        out = {
+            "schema": REPORT_SCHEMA,
+            "started": self.started,
+            "total": {
+                "wall_s": round(time.perf_counter() - self._wall0, 4),
+                "cpu_s": round(time.process_time() - self._cpu0, 4),
+                "process_peak_rss_mib": round(peak_rss_mib(), 1),
+            },
+            "stages": self.stages,
+            "counters": self.counters,
+        }
+        if self.profile_files:
+            out["profile_files"] = self.profile_files
+        out.update(extra or {})
+        return out
+
+    def write(self, path: Path, extra: dict | None = None):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.report(extra), indent=2), encoding="utf-8")
@@ -0,0 +1,301 @@
+"""
+Compact binary columnar form of data.rich.json.
+
+Layout (all integers little-endian):
+  8 bytes   magic b"LHCOL1\\0\\0"
+  4 bytes   header length (uint32)
+  n bytes   header, UTF-8 JSON, padded with spaces so column data starts on an 8 byte boundary
+  ...       column blobs, each starting on an 8 byte boundary
+
+The header holds the row count, the lat/lon scale, the string dictionaries and
+{name: {"dtype", "offset", "count"}} for every column, so a reader can map each
+column straight onto the file without parsing anything else.
+
+Columns:
+  osm_type (u1: 0 node, 1 way, 2 relation, 3 other), osm_id (i8)
+  lat, lon (i4, degrees * LATLON_SCALE)
+  name_offsets (u4, rows + 1), name_data (u1, UTF-8)
+  color, sequence, main_colour, main_sequence, main_character (dictionary indexes)
+  main_period (f4, NaN if unknown)
+  sector_offsets (u4, rows + 1) and the flattened sector columns
+  sector_start, sector_end, sector_period (f4, NaN if not numeric),
+  sector_colour, sector_sequence, sector_character (dictionary indexes)
+
+Dictionary indexes point into header["dicts"]["colour" | "sequence" | "character"].
+"""
+
+import json
+import mmap
+import struct
+import sys
+from array import array
+
+MAGIC = b"LHCOL1\0\0"
+SCHEMA = 1
+LATLON_SCALE = 10_000_000
+
+OSM_TYPES = ("node", "way", "relation")
+KEY_PREFIX = ("n", "w", "r", "x")
+
+# column -> dictionary it indexes into
+DICT_COLUMNS = {
+    "color": "colour",
+    "main_colour": "colour",
+    "sector_colour": "colour",
+    "sequence": "sequence",
+    "main_sequence": "sequence",
+    "sector_sequence": "sequence",
+    "main_character": "character",
+    "sector_character": "character",
+}
+
+_TYPECODES = {"<u1": "B", "<i4": "i", "<u4": "I", "<i8": "q", "<f4": "f", "<u2": "H"}
+
+
+def _float_or_nan(v) -> float:
+    if v is None or v == "":
+        return float("nan")
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+class _Dict:
+    def __init__(self):
+        self.values: list[str] = []
+        self.index: dict[str, int] = {}
+
+    def code(self, v) -> int:
+        s = str(v or "")
+        i = self.index.get(s)
+        if i is None:
+            i = self.index[s] = len(self.values)
+            self.values.append(s)
+        return i
+
+
+def encode_columnar(rows_rich: list) -> bytes:
+    """Rich rows in the columnar format, as bytes."""
+    dicts = {"colour": _Dict(), "sequence": _Dict(), "character": _Dict()}
+    codes: dict[str, list[int]] = {name: [] for name in DICT_COLUMNS}
+
+    osm_type = array("B")
+    osm_id = array("q")
+    lat = array("i")
+    lon = array("i")
+    main_period = array("f")
+    name_offsets = array("I", [0])
+    name_data = bytearray()
+    sector_offsets = array("I", [0])
+    sector_start = array("f")
+    sector_end = array("f")
+    sector_period = array("f")
+
+    for r in rows_rich:
+        t = r.get("osm_type")
+        osm_type.append(OSM_TYPES.index(t) if t in OSM_TYPES else 3)
+        osm_id.append(int(r["osm_id"]))
+        lat.append(round(r["lat"] * LATLON_SCALE))
+        lon.append(round(r["lon"] * LATLON_SCALE))
+        main_period.append(_float_or_nan(r.get("main_period")))
+
+        name_data += str(r.get("name") or "").encode("utf-8")
+        name_offsets.append(len(name_data))
+
+        for col in ("color", "main_colour"):
+            codes[col].append(dicts["colour"].code(r.get(col)))
+        for col in ("sequence", "main_sequence"):
+            codes[col].append(dicts["sequence"].code(r.get(col)))
+        codes["main_character"].append(dicts["character"].code(r.get("main_character")))
+
+        for s in r.get("sectors") or []:
+            sector_start.append(_float_or_nan(s.get("ss")))
+            sector_end.append(_float_or_nan(s.get("se")))
+            sector_period.append(_float_or_nan(s.get("p")))
+            codes["sector_colour"].append(dicts["colour"].code(s.get("c")))
+            codes["sector_sequence"].append(dicts["sequence"].code(s.get("q")))
+            codes["sector_character"].append(dicts["character"].code(s.get("ch")))
+        sector_offsets.append(len(sector_start))
+
+    columns = {
+        "osm_type": ("<u1", osm_type),
+        "osm_id": ("<i8", osm_id),
+        "lat": ("<i4", lat),
+        "lon": ("<i4", lon),
+        "main_period": ("<f4", main_period),
+        "name_offsets": ("<u4", name_offsets),
+        "name_data": ("<u1", array("B", bytes(name_data))),
+        "sector_offsets": ("<u4", sector_offsets),
+        "sector_start": ("<f4", sector_start),
+        "sector_end": ("<f4", sector_end),
+        "sector_period": ("<f4", sector_period),
+    }
+    for col, dict_name in DICT_COLUMNS.items():
+        dtype = "<u2" if len(dicts[dict_name].values) <= 0xFFFF else "<u4"
+        columns[col] = (dtype, array(_TYPECODES[dtype], codes[col]))
+
+    blobs = []
+    meta = {}
+    for name, (dtype, arr) in columns.items():
+        if sys.byteorder != "little":
+            arr = array(arr.typecode, arr)
+            arr.byteswap()
+        blobs.append((name, arr.tobytes()))
+        meta[name] = {"dtype": dtype, "count": len(arr)}
+
+    # Offsets depend on the header size, which depends on the offsets: lay out
+    # with a generous placeholder width, then pad the header to that size.
+    header = {
+        "schema": SCHEMA,
+        "rows": len(rows_rich),
+        "latlon_scale": LATLON_SCALE,
+        "dicts": {k: d.values for k, d in dicts.items()},
+        "columns": meta,
+    }
+    for name, _ in blobs:
+        meta[name]["offset"] = 0xFFFFFFFF
+    data_start = _pad8(len(MAGIC) + 4 + len(json.dumps(header, ensure_ascii=False).encode("utf-8")))
+    header_len = data_start - len(MAGIC) - 4
+
+    pos = data_start
+    for name, blob in blobs:
+        meta[name]["offset"] = pos
+        pos = _pad8(pos + len(blob))
+
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    header_bytes += b" " * (header_len - len(header_bytes))
+
+    out = bytearray(MAGIC)
+    out += struct.pack("<I", header_len)
+    out += header_bytes
+    for name, blob in blobs:
+        out += blob
+        out += b"\0" * (_pad8(len(blob)) - len(blob))
+    return bytes(out)
+
+
+def _pad8(n: int) -> int:
+    return (n + 7) & ~7
+
+
+class ColumnarDataset:
+    """
+    Read-only view of a columnar file. Columns are NumPy arrays backed by an
+    mmap of the file, so opening costs one header parse and no row decoding.
+
+        ds = ColumnarDataset("server/site/data.col.bin")
+        lat = ds.lat_deg()                   # float64 degrees
+        red = ds["color"] == ds.code("colour", "red")
+        ds.row(0)                            # same dict shape as data.rich.json
+    """
+
+    def __init__(self, path):
+        import numpy as np
+
+        self._np = np
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mm[: len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a lighthouse columnar file")
+        (header_len,) = struct.unpack_from("<I", self._mm, len(MAGIC))
+        start = len(MAGIC) + 4
+        self.header = json.loads(bytes(self._mm[start : start + header_len]))
+        if self.header.get("schema") != SCHEMA:
+            self.close()
+            raise ValueError(f"Unsupported columnar schema: {self.header.get('schema')}")
+
+        self.rows = int(self.header["rows"])
+        self.dicts: dict[str, list[str]] = self.header["dicts"]
+        self._codes = {k: {v: i for i, v in enumerate(vals)} for k, vals in self.dicts.items()}
+        self._columns = {
+            name: np.frombuffer(self._mm, dtype=m["dtype"], count=m["count"], offset=m["offset"])
+            for name, m in self.header["columns"].items()
+        }
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __getitem__(self, name: str):
+        return self._columns[name]
+
+    def columns(self) -> list[str]:
+        return list(self._columns)
+
+    def code(self, dict_name: str, value: str) -> int:
+        """Dictionary index of a value, or -1 if it does not occur."""
+        return self._codes[dict_name].get(value, -1)
+
+    def decode(self, column: str, i: int) -> str:
+        return self.dicts[DICT_COLUMNS[column]][int(self._columns[column][i])]
+
+    def lat_deg(self):
+        return self._columns["lat"] / self.header["latlon_scale"]
+
+    def lon_deg(self):
+        return self._columns["lon"] / self.header["latlon_scale"]
+
+    def name(self, i: int) -> str:
+        offs = self._columns["name_offsets"]
+        return self._columns["name_data"][offs[i] : offs[i + 1]].tobytes().decode("utf-8")
+
+    def key(self, i: int) -> str:
+        return f"{KEY_PREFIX[int(self._columns['osm_type'][i])]}{int(self._columns['osm_id'][i])}"
+
+    def row(self, i: int) -> dict:
+        """One light as a data.rich.json style dict (floats come back quantized)."""
+        np = self._np
+        c = self._columns
+        t = int(c["osm_type"][i])
+        scale = self.header["latlon_scale"]
+
+        def num(v):
+            return None if np.isnan(v) else float(v)
+
+        s0, s1 = int(c["sector_offsets"][i]), int(c["sector_offsets"][i + 1])
+        sectors = []
+        for j in range(s0, s1):
+            ss, se = num(c["sector_start"][j]), num(c["sector_end"][j])
+            sectors.append(
+                {
+                    "ss": "" if ss is None else f"{ss:g}",
+                    "se": "" if se is None else f"{se:g}",
+                    "c": self.decode("sector_colour", j),
+                    "q": self.decode("sector_sequence", j),
+                    "p": num(c["sector_period"][j]),
+                    "ch": self.decode("sector_character", j),
+                }
+            )
+
+        return {
+            "key": self.key(i),
+            "osm_type": OSM_TYPES[t] if t < len(OSM_TYPES) else "",
+            "osm_id": int(c["osm_id"][i]),
+            "lat": int(c["lat"][i]) / scale,
+            "lon": int(c["lon"][i]) / scale,
+            "name": self.name(i),
+            "color": self.decode("color", i),
+            "sequence": self.decode("sequence", i),
+            "main_colour": self.decode("main_colour", i),
+            "main_period": num(c["main_period"][i]),
+            "main_character": self.decode("main_character", i),
+            "main_sequence": self.decode("main_sequence", i),
+            "sectors": sectors,
+        }
+
+    def close(self):
+        # Views must be dropped before the mmap can close
+        self._columns = {}
+        try:
+            self._mm.close()
+        except BufferError:
+            pass
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
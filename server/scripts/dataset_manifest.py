@@ -0,0 +1,138 @@
+"""
+Dataset manifest: a small summary of the last build for status pages.
+
+    {"schema": 1, "built": "2026-10-17T00:21:09Z",
+     "source": {"path": "data/lighthousedata.json", "bytes": 91234567,
+                "sha256": "...", "osm_base": "2026-10-17T00:15:02Z"},
+     "lights": 21345, "by_type": {"node": 20011, "way": 1334},
+     "by_colour": {"white": 9120, "red": 5120, ...},
+     "files": {"server/site/data.min.json": 2160451, ...}}
+
+Reading it costs the same for any dataset size, so the Pi home page shows
+counts and freshness without parsing the datasets. "built" only moves when
+anything else in the manifest changed, so a rebuild of the same dump leaves
+the file (and the git tree) untouched. stale_reasons() compares it with the
+clock and the files on disk.
+"""
+
+import calendar
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+from overpass_stream import open_text
+
+DATASET_SCHEMA = 1
+
+# The update workflow runs daily; a few missed runs are tolerated
+STALE_AFTER_S = 3 * 86400
+
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+# Overpass writes osm3s (with the data timestamp) before the elements
+HEAD_CHARS = 4096
+_OSM_BASE_RE = re.compile(r'"timestamp_osm_base"\s*:\s*"([^"]+)"')
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def osm_base(path: Path) -> str | None:
+    """The timestamp of the OSM data in an Overpass dump, if it carries one."""
+    with open_text(path) as f:
+        m = _OSM_BASE_RE.search(f.read(HEAD_CHARS))
+    return m.group(1) if m else None
+
+
+def build_manifest(rows_rich: list, source: Path, files: dict[str, int]) -> dict:
+    return {
+        "schema": DATASET_SCHEMA,
+        "built": time.strftime(TIME_FORMAT, time.gmtime()),
+        "source": {
+            "path": str(source),
+            "bytes": source.stat().st_size,
+            "sha256": file_sha256(source),
+            "osm_base": osm_base(source),
+        },
+        "lights": len(rows_rich),
+        "by_type": dict(Counter(r["osm_type"] for r in rows_rich).most_common()),
+        "by_colour": dict(Counter(r.get("main_colour") or "unknown" for r in rows_rich).most_common()),
+        "files": files,
+    }
+
+
+def load_manifest(path: Path) -> dict | None:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(path: Path, manifest: dict) -> bool:
+    """Write atomically unless only "built" differs from the file on disk. Returns whether it was written."""
+    old = load_manifest(path)
+    if old is not None and {**old, "built": None} == {**manifest, "built": None}:
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+            f.write("\n")
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return True
+
+
+def age_s(manifest: dict, now: float | None = None) -> float | None:
+    try:
+        built = calendar.timegm(time.strptime(manifest["built"], TIME_FORMAT))
+    except (KeyError, TypeError, ValueError):
+        return None
+    return (time.time() if now is None else now) - built
+
+
+def stale_reasons(manifest: dict, root: Path, now: float | None = None, max_age_s: float = STALE_AFTER_S) -> list[str]:
+    """
+    Why the data on disk may not match the manifest, or is too old; empty if
+    it looks current. Paths in the manifest are relative to `root`. Only
+    stats files, never reads them.
+    """
+    if manifest.get("schema") != DATASET_SCHEMA:
+        return [f"Manifest schema {manifest.get('schema')} is not {DATASET_SCHEMA}; rebuild the dataset"]
+
+    reasons = []
+    age = age_s(manifest, now)
+    if age is None:
+        reasons.append("Manifest has no build time")
+    elif age > max_age_s:
+        reasons.append(f"Last build was {age / 86400:.1f} days ago")
+
+    source = manifest.get("source") or {}
+    src = root / source.get("path", "")
+    if source.get("path") and src.is_file() and src.stat().st_size != source.get("bytes"):
+        reasons.append(f"{source['path']} changed since the build")
+
+    for name, size in (manifest.get("files") or {}).items():
+        p = root / name
+        if p.is_dir():
+            continue
+        if not p.exists():
+            reasons.append(f"{name} is missing")
+        elif p.stat().st_size != size:
+            reasons.append(f"{name} changed since the build")
+    return reasons
@@ -0,0 +1,244 @@
+"""
+Per-light details store: the OSM tags of every light, without the rest of
+the Overpass dump, readable one record at a time.
+
+  details.jsonl   one compact JSON object per light, in data.rich.json order:
+                  {"key": "n123", "type": "node", "id": 123, "tags": {...}}
+  details.idx     open addressing hash table key -> (offset, length) in details.jsonl
+
+Index layout (all integers little-endian):
+  8 bytes   magic b"LHDIDX2\\0"
+  4 bytes   slot count (uint32, a power of two, at least twice the records)
+  4 bytes   record count (uint32)
+  8 bytes   size of the details.jsonl it indexes (uint64)
+  ...       slots of 24 bytes: key hash (u8), offset (u8), length (u4), padding (u4);
+            length 0 marks an empty slot
+
+A lookup hashes the key, probes linearly from hash & (slots - 1) and reads
+one line of the mmapped details.jsonl, so it costs the same for any number of
+lights and nothing is loaded up front.
+
+The builder writes records through DetailsWriter while it scans the dump,
+so no tags are held in memory, and both files are replaced atomically.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+from pathlib import Path
+
+MAGIC = b"LHDIDX2\0"
+HEADER = struct.Struct("<8sIIQ")
+SLOT = struct.Struct("<QQII")
+
+
+def key_hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def encode_record(key: str, osm_type: str, osm_id: int, tags: dict) -> bytes:
+    """One details.jsonl line, without the newline."""
+    return json.dumps(
+        {"key": key, "type": osm_type, "id": osm_id, "tags": tags}, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def encode_index(entries: list[tuple[int, int, int]], data_bytes: int) -> bytes:
+    """details.idx contents for (key hash, offset, length) entries."""
+    slots = 8
+    while slots < 2 * len(entries):
+        slots *= 2
+    mask = slots - 1
+    table = [None] * slots
+    for h, offset, length in entries:
+        i = h & mask
+        while table[i] is not None:
+            i = (i + 1) & mask
+        table[i] = (h, offset, length)
+
+    index = bytearray(HEADER.pack(MAGIC, slots, len(entries), data_bytes))
+    for slot in table:
+        index += SLOT.pack(*slot, 0) if slot is not None else SLOT.pack(0, 0, 0, 0)
+    return bytes(index)
+
+
+def _temp_next_to(path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".")
+    return os.fdopen(fd, "w+b"), Path(tmp)
+
+
+class DetailsWriter:
+    """
+    Collects records while the dump is scanned and writes the store at the end.
+
+        with DetailsWriter(Path("data/details.jsonl")) as writer:
+            writer.add("n123", "node", 123, tags)     # first record of a key wins
+            writer.finish(Path("data/details.idx"), row_keys)
+
+    Records go straight to a temporary file next to `path`; only their keys
+    and positions stay in memory. finish() keeps the records of `keys`, in
+    that order, and moves the data file and then the index into place.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._spool, self._spool_path = _temp_next_to(path)
+        self._records: dict[str, tuple[int, int]] = {}
+        self._size = 0
+
+    def add(self, key: str, osm_type: str, osm_id: int, tags: dict):
+        if key in self._records:
+            return
+        line = encode_record(key, osm_type, osm_id, tags)
+        self._spool.write(line + b"\n")
+        self._records[key] = (self._size, len(line))
+        self._size += len(line) + 1
+
+    def add_block(self, keys: list[str], lengths: list[int], block: bytes):
+        """
+        Add records encoded elsewhere (e.g. in a worker process): `block` is
+        their encode_record() lines, each followed by a newline.
+        """
+        offset = self._size
+        if len(set(keys)) == len(keys) and self._records.keys().isdisjoint(keys):
+            self._spool.write(block)
+            for key, length in zip(keys, lengths):
+                self._records[key] = (offset, length)
+                offset += length + 1
+            self._size = offset
+            return
+        # A key seen before: keep its first record only
+        pos = 0
+        for key, length in zip(keys, lengths):
+            if key not in self._records:
+                self._spool.write(block[pos : pos + length + 1])
+                self._records[key] = (self._size, length)
+                self._size += length + 1
+            pos += length + 1
+
+    def finish(self, index_path: Path, keys) -> int:
+        """Write the store for `keys` (data.rich.json order). Returns the number of records."""
+        entries = []
+        try:
+            self._spool.flush()
+            wanted = [(k, *self._records[k]) for k in keys if k in self._records]
+            # Usually every record is kept in the order it was added, and the
+            # spool is the data file as is
+            in_order = len(wanted) == len(self._records) and all(a[1] < b[1] for a, b in zip(wanted, wanted[1:]))
+            if in_order:
+                data_path, size = self._spool_path, self._size
+                entries = [(key_hash(k), offset, length) for k, offset, length in wanted]
+            else:
+                out, data_path = _temp_next_to(self.path)
+                with out:
+                    size = 0
+                    for k, offset, length in wanted:
+                        self._spool.seek(offset)
+                        out.write(self._spool.read(length + 1))
+                        entries.append((key_hash(k), size, length))
+                        size += length + 1
+            index_file, index_tmp = _temp_next_to(index_path)
+            with index_file:
+                index_file.write(encode_index(entries, size))
+            for p in (data_path, index_tmp):
+                os.chmod(p, 0o644)
+            # Data first: a reader that opens the new data with the old index
+            # sees a size mismatch and DetailsStore refuses the pair
+            os.replace(data_path, self.path)
+            os.replace(index_tmp, index_path)
+        finally:
+            self.close()
+        return len(entries)
+
+    def close(self):
+        """Drop the spool; after finish() this is a no-op."""
+        self._spool.close()
+        self._spool_path.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_records(path: Path):
+    """The records of a details.jsonl in file order."""
+    with open(path, "rb") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def _map(path: Path) -> tuple:
+    f = open(path, "rb")
+    if f.seek(0, 2) == 0:
+        # mmap cannot map an empty file
+        return f, b""
+    return f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class DetailsStore:
+    """
+    Read-only view of a details store.
+
+        store = DetailsStore("data/details.jsonl", "data/details.idx")
+        store.get("n123")     # {"key", "type", "id", "tags"} or None
+    """
+
+    def __init__(self, path, index_path):
+        self._files = []
+        f, self._index = _map(Path(index_path))
+        self._files.append(f)
+        if self._index[: len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{index_path} is not a lighthouse details index")
+        _, self.slots, self.records, data_bytes = HEADER.unpack_from(self._index)
+        f, self._data = _map(Path(path))
+        self._files.append(f)
+        if len(self._data) != data_bytes:
+            self.close()
+            raise ValueError(f"{index_path} does not belong to {path} (rebuilt in between?)")
+
+    def __len__(self) -> int:
+        return self.records
+
+    def _find(self, key: str) -> bytes | None:
+        h = key_hash(key)
+        mask = self.slots - 1
+        i = h & mask
+        prefix = b'{"key":' + json.dumps(key, ensure_ascii=False).encode("utf-8") + b","
+        for _ in range(self.slots):
+            slot_h, offset, length, _ = SLOT.unpack_from(self._index, HEADER.size + i * SLOT.size)
+            if length == 0:
+                return None
+            if slot_h == h:
+                line = self._data[offset : offset + length]
+                # Different keys can share a hash; the record names its key first
+                if line.startswith(prefix):
+                    return line
+            i = (i + 1) & mask
+        return None
+
+    def get(self, key: str) -> dict | None:
+        line = self._find(key)
+        return json.loads(line) if line is not None else None
+
+    def __contains__(self, key: str) -> bool:
+        return self._find(key) is not None
+
+    def close(self):
+        for m in (getattr(self, "_index", None), getattr(self, "_data", None)):
+            if isinstance(m, mmap.mmap):
+                m.close()
+        for f in self._files:
+            f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
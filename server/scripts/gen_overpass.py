@@ -0,0 +1,203 @@
+"""
+Synthetic Overpass dump generator for benchmarking build_dataset.py.
+
+Produces the same shape as the nightly query ("out body; >; out skel qt;"):
+light nodes and lighthouse ways with tags first, then the untagged skeleton
+nodes of the ways. Tag mix follows the current data: mostly unindexed
+minor lights, a share of multi-sector seamark:light:<n>:* lights, and a
+few percent lighthouse buildings mapped as closed ways.
+
+    python server/scripts/gen_overpass.py --scale 10 --out /tmp/overpass_10x.json.gz
+"""
+
+import argparse
+import gzip
+import json
+import math
+import random
+from pathlib import Path
+
+# Size of today's dataset (data.rich.json, Jan 2026)
+BASE_NODES = 17_854
+BASE_WAYS = 587
+
+COLOURS = ["white", "red", "green", "yellow", "white;red", "blue"]
+COLOUR_WEIGHTS = [40, 25, 25, 6, 3, 1]
+
+# character, group, typical periods
+CHARACTERS = [
+    ("Fl", 1, [2.5, 3, 4, 5, 10]),
+    ("Fl", 2, [5, 6, 10]),
+    ("Fl", 3, [10, 15]),
+    ("LFl", 1, [6, 8, 10]),
+    ("Oc", 1, [4, 5, 6]),
+    ("Oc", 2, [8, 10]),
+    ("Iso", 1, [2, 4, 6]),
+    ("Q", 1, [1]),
+    ("VQ", 1, [0.5]),
+    ("Mo", "A", [6, 8]),
+    ("F", 1, [None]),
+]
+CHARACTER_WEIGHTS = [30, 12, 5, 3, 8, 3, 6, 14, 4, 2, 5]
+
+MORSE = {"A": ".-", "U": "..-", "D": "-.."}
+
+
+def _fmt(x: float) -> str:
+    return f"{x:g}"
+
+
+def sequence_for(character: str, group, period) -> str:
+    """Seamark sequence string ("0.5+(2.5)", "1.5+(4),1.5+(13)") matching a character."""
+    if period is None:
+        return ""
+
+    if character == "Mo":
+        ons = [0.5 if sym == "." else 1.5 for sym in MORSE.get(str(group), ".-")]
+        pairs = [(on, 0.5) for on in ons[:-1]]
+        pairs.append((ons[-1], max(0.5, period - sum(ons) - 0.5 * (len(ons) - 1))))
+        return "+".join(f"{_fmt(on)}+({_fmt(off)})" for on, off in pairs)
+
+    n = group if isinstance(group, int) else 1
+    if character == "Iso":
+        pairs = [(period / 2, period / 2)]
+    elif character == "Oc":
+        pairs = [(1.0, 1.0)] * (n - 1) + [(max(0.5, period - (2 * n - 1)), 1.0)]
+    else:
+        on = {"LFl": 2.0, "Q": 0.3, "VQ": 0.2}.get(character, 0.5)
+        gap = 1.0
+        pairs = [(on, gap)] * (n - 1) + [(on, max(0.1, period - n * on - (n - 1) * gap))]
+
+    # Flash groups are written both ways in OSM, "+" and ","
+    sep = "," if character == "Fl" and n > 1 else "+"
+    return sep.join(f"{_fmt(on)}+({_fmt(off)})" for on, off in pairs)
+
+
+def light_tags(rng: random.Random, prefix: str) -> dict:
+    character, group, periods = rng.choices(CHARACTERS, CHARACTER_WEIGHTS)[0]
+    period = rng.choice(periods)
+    tags = {
+        prefix + "character": character if group == 1 else f"{character}({group})",
+        prefix + "colour": rng.choices(COLOURS, COLOUR_WEIGHTS)[0],
+    }
+    if period is not None:
+        tags[prefix + "period"] = _fmt(period)
+        tags[prefix + "sequence"] = sequence_for(character, group, period)
+    if group != 1:
+        tags[prefix + "group"] = str(group)
+    if rng.random() < 0.7:
+        tags[prefix + "range"] = str(rng.choice([2, 3, 5, 8, 12, 18, 25]))
+    if rng.random() < 0.5:
+        tags[prefix + "height"] = str(rng.randint(3, 60))
+    return tags
+
+
+def feature_tags(rng: random.Random, i: int, building: bool) -> dict:
+    tags = {}
+    if building:
+        tags["man_made"] = "lighthouse"
+        tags["building"] = "lighthouse" if rng.random() < 0.3 else "yes"
+    tags["seamark:type"] = rng.choice(["light_minor", "light_minor", "light_major", "beacon_lateral"])
+
+    r = rng.random()
+    if r < 0.6:
+        tags.update(light_tags(rng, "seamark:light:"))
+    else:
+        # multi-sector light: 1..5 sectors sharing character and period
+        n = rng.choices([1, 2, 3, 4, 5], [20, 25, 25, 20, 10])[0]
+        base = light_tags(rng, "seamark:light:1:")
+        start = rng.uniform(0, 360)
+        for k in range(1, n + 1):
+            p = f"seamark:light:{k}:"
+            for field, value in base.items():
+                tags[p + field.split(":", 3)[3]] = value
+            tags[p + "colour"] = rng.choices(COLOURS[:3], [40, 30, 30])[0]
+            width = rng.uniform(5, 360 / n)
+            tags[p + "sector_start"] = _fmt(round(start % 360, 1))
+            tags[p + "sector_end"] = _fmt(round((start + width) % 360, 1))
+            start += width
+
+    if rng.random() < 0.55:
+        tags["seamark:name"] = f"Light {i}"
+    if rng.random() < 0.35:
+        tags["name"] = f"Lighthouse {i}"
+    if rng.random() < 0.1:
+        tags["name:de"] = f"Leuchtfeuer {i}"
+    if rng.random() < 0.2:
+        tags["seamark:light:reference"] = f"A {rng.randint(1000, 9999)}"
+    return tags
+
+
+def generate(out: Path, scale: float = 1.0, seed: int = 1) -> dict:
+    """Write a synthetic dump to `out` (gzip if it ends in .gz). Returns element counts."""
+    rng = random.Random(seed)
+    n_nodes = max(1, round(BASE_NODES * scale))
+    n_ways = max(1, round(BASE_WAYS * scale))
+
+    # Lights cluster along coasts: draw positions around a set of anchor points
+    anchors = [(rng.uniform(-60, 70), rng.uniform(-180, 180)) for _ in range(max(20, int(200 * math.sqrt(scale))))]
+
+    def position() -> tuple[float, float]:
+        a_lat, a_lon = rng.choice(anchors)
+        lat = max(-85.0, min(85.0, a_lat + rng.gauss(0, 2.0)))
+        lon = (a_lon + rng.gauss(0, 3.0) + 180) % 360 - 180
+        return round(lat, 7), round(lon, 7)
+
+    opener = gzip.open if out.suffix == ".gz" else open
+    out.parent.mkdir(parents=True, exist_ok=True)
+    next_skel = 10_000_000_000
+    counts = {"nodes": 0, "ways": 0, "skeleton_nodes": 0}
+
+    with opener(out, "wt", encoding="utf-8") as f:
+        f.write('{"version":0.6,"generator":"gen_overpass.py","osm3s":{},"elements":[\n')
+        first = True
+
+        def emit(el: dict):
+            nonlocal first
+            if not first:
+                f.write(",\n")
+            f.write(json.dumps(el, ensure_ascii=False, separators=(",", ":")))
+            first = False
+
+        for i in range(n_nodes):
+            lat, lon = position()
+            emit({"type": "node", "id": 100_000 + i, "lat": lat, "lon": lon, "tags": feature_tags(rng, i, False)})
+            counts["nodes"] += 1
+
+        skeleton = []
+        for i in range(n_ways):
+            lat, lon = position()
+            k = rng.randint(4, 12)
+            r = rng.uniform(0.00003, 0.0002)
+            ids = []
+            for j in range(k):
+                a = 2 * math.pi * j / k
+                ids.append(next_skel)
+                skeleton.append((next_skel, round(lat + r * math.sin(a), 7), round(lon + r * math.cos(a), 7)))
+                next_skel += 1
+            ids.append(ids[0])
+            emit({"type": "way", "id": 200_000 + i, "nodes": ids, "tags": feature_tags(rng, n_nodes + i, True)})
+            counts["ways"] += 1
+
+        for nid, lat, lon in skeleton:
+            emit({"type": "node", "id": nid, "lat": lat, "lon": lon})
+            counts["skeleton_nodes"] += 1
+
+        f.write("\n]}\n")
+
+    return counts
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--scale", type=float, default=1.0, help="Multiple of today's dataset size (1, 10, 100, ...)")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", type=Path, required=True, help="Output path, gzip if it ends in .gz")
+    args = ap.parse_args(argv)
+
+    counts = generate(args.out, args.scale, args.seed)
+    print(f"{args.out}: {counts['nodes']} light nodes, {counts['ways']} ways, {counts['skeleton_nodes']} skeleton nodes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+from array import array
+
+import numpy as np
+
+# Closed ways whose shoelace area (in squared degrees) is below this are
+# degenerate (collinear or repeated points) and use the vertex mean instead.
+MIN_POLYGON_AREA = 1e-14
+
+
+class NodeStore:
+    """
+    Node coordinates for way centroids. Nodes are appended to compact typed
+    arrays (24 bytes per node instead of a dict entry plus a tuple) and sorted
+    once by id, after which lookups are a single searchsorted over all ids.
+    """
+
+    def __init__(self):
+        self._ids = array("q")
+        self._lat = array("d")
+        self._lon = array("d")
+        self._frozen = None
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def missing(self, node_ids) -> set[int]:
+        """The ids of `node_ids` that have not been added."""
+        ids, _, _ = self.freeze()
+        wanted = np.fromiter(node_ids, dtype=np.int64, count=len(node_ids))
+        return set(np.setdiff1d(wanted, ids).tolist())
+
+    def add(self, node_id: int, lat: float, lon: float):
+        self._ids.append(node_id)
+        self._lat.append(lat)
+        self._lon.append(lon)
+        self._frozen = None
+
+    def add_many(self, ids: array, lat: array, lon: array, only: set[int] | None = None):
+        """Add typed arrays of nodes at once; with `only`, just the ids in it."""
+        if only is not None:
+            keep = np.fromiter((nid in only for nid in ids), dtype=bool, count=len(ids))
+            if not keep.all():
+                ids = np.frombuffer(ids, dtype=np.int64)[keep] if len(ids) else ids
+                lat = np.frombuffer(lat, dtype=np.float64)[keep] if len(lat) else lat
+                lon = np.frombuffer(lon, dtype=np.float64)[keep] if len(lon) else lon
+        if len(ids):
+            self._ids.frombytes(memoryview(ids).cast("B"))
+            self._lat.frombytes(memoryview(lat).cast("B"))
+            self._lon.frombytes(memoryview(lon).cast("B"))
+            self._frozen = None
+
+    def freeze(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Sorted unique ids with their coordinates. A later add() of the same id wins."""
+        if self._frozen is None:
+            ids = np.frombuffer(self._ids, dtype=np.int64) if self._ids else np.empty(0, dtype=np.int64)
+            lat = np.frombuffer(self._lat, dtype=np.float64) if self._lat else np.empty(0)
+            lon = np.frombuffer(self._lon, dtype=np.float64) if self._lon else np.empty(0)
+
+            order = np.argsort(ids, kind="stable")
+            ids = ids[order]
+            keep = np.ones(len(ids), dtype=bool)
+            keep[:-1] = ids[1:] != ids[:-1]
+            self._frozen = (ids[keep], lat[order][keep], lon[order][keep])
+        return self._frozen
+
+    def lookup(self, node_ids: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Coordinates for an array of ids, plus a mask of the ids that were found."""
+        ids, lat, lon = self.freeze()
+        if len(ids) == 0:
+            found = np.zeros(len(node_ids), dtype=bool)
+            return np.zeros(len(node_ids)), np.zeros(len(node_ids)), found
+        idx = np.searchsorted(ids, node_ids)
+        idx[idx >= len(ids)] = 0
+        found = ids[idx] == node_ids
+        return lat[idx], lon[idx], found
+
+
+def way_centroids(store: NodeStore, ways: list[list[int]]) -> list[tuple[float, float] | None]:
+    """
+    Centroid of every way in one batch. Open ways (and closed ways with missing
+    or degenerate geometry) get the mean of their resolved nodes, closed ways
+    get the area centroid of their polygon. None if no node could be resolved.
+    """
+    n_ways = len(ways)
+    if n_ways == 0:
+        return []
+
+    lengths = np.fromiter((len(w) for w in ways), dtype=np.int64, count=n_ways)
+    flat = np.fromiter((int(n) for w in ways for n in w), dtype=np.int64, count=int(lengths.sum()))
+    way_of = np.repeat(np.arange(n_ways), lengths)
+
+    lat, lon, found = store.lookup(flat)
+
+    # Vertex mean over the resolved nodes (the closing node counts twice, as before)
+    counts = np.bincount(way_of[found], minlength=n_ways)
+    sum_lat = np.bincount(way_of[found], weights=lat[found], minlength=n_ways)
+    sum_lon = np.bincount(way_of[found], weights=lon[found], minlength=n_ways)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        c_lat = sum_lat / counts
+        c_lon = sum_lon / counts
+
+    # Polygon centroid for closed, fully resolved rings
+    starts = np.zeros(n_ways, dtype=np.int64)
+    starts[1:] = np.cumsum(lengths)[:-1]
+    ends = starts + lengths - 1
+    missing = np.bincount(way_of[~found], minlength=n_ways)
+    closed = (lengths >= 4) & (missing == 0)
+    closed[closed] = flat[starts[closed]] == flat[ends[closed]]
+
+    if closed.any():
+        # Edges i -> i+1 inside each closed way, in coordinates relative to the
+        # first vertex so tiny building outlines keep their precision
+        seg = np.flatnonzero(closed[way_of])
+        seg = seg[seg != ends[way_of[seg]]]
+        w = way_of[seg]
+        x0 = lon[seg] - lon[starts[w]]
+        y0 = lat[seg] - lat[starts[w]]
+        x1 = lon[seg + 1] - lon[starts[w]]
+        y1 = lat[seg + 1] - lat[starts[w]]
+        cross = x0 * y1 - x1 * y0
+
+        area2 = np.bincount(w, weights=cross, minlength=n_ways)
+        cx = np.bincount(w, weights=(x0 + x1) * cross, minlength=n_ways)
+        cy = np.bincount(w, weights=(y0 + y1) * cross, minlength=n_ways)
+
+        poly = closed & (np.abs(area2) / 2 > MIN_POLYGON_AREA)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            p_lon = lon[starts] + cx / (3 * area2)
+            p_lat = lat[starts] + cy / (3 * area2)
+
+        # Self-intersecting rings can put the signed-area centroid outside the
+        # outline; keep the vertex mean for those
+        lo_lat = np.full(n_ways, np.inf)
+        hi_lat = np.full(n_ways, -np.inf)
+        lo_lon = np.full(n_ways, np.inf)
+        hi_lon = np.full(n_ways, -np.inf)
+        np.minimum.at(lo_lat, w, lat[seg])
+        np.maximum.at(hi_lat, w, lat[seg])
+        np.minimum.at(lo_lon, w, lon[seg])
+        np.maximum.at(hi_lon, w, lon[seg])
+        with np.errstate(invalid="ignore"):
+            poly &= (p_lat >= lo_lat) & (p_lat <= hi_lat) & (p_lon >= lo_lon) & (p_lon <= hi_lon)
+
+        c_lon[poly] = p_lon[poly]
+        c_lat[poly] = p_lat[poly]
+
+    has = counts > 0
+    return [(float(a), float(b)) if ok else None for a, b, ok in zip(c_lat.tolist(), c_lon.tolist(), has.tolist())]
@@ -0,0 +1,103 @@
+import gzip
+import hashlib
+import json
+from pathlib import Path
+
+STATE_SCHEMA = 2
+
+
+def tag_hash(tags: dict) -> str:
+    # OSM keys and values are plain strings; joining them with control
+    # characters costs about half of a sorted json.dumps
+    payload = "\x1f".join(f"{k}\x1e{v}" for k, v in sorted(tags.items()))
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def payload_hash(payload: str | bytes) -> str:
+    if isinstance(payload, str):
+        payload = payload.encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()[:16]
+
+
+def empty_state(builder: str) -> dict:
+    return {"schema": STATE_SCHEMA, "builder": builder, "rich_sha256": None, "items": {}}
+
+
+def load_state(path: Path, builder: str) -> dict:
+    """
+    State of the previous build:
+      { "schema": 2, "builder": <version of the row building code>,
+        "rich_sha256": <hash of data.rich.json>, "items": { key: [tag_hash, lat, lon] } }
+    Returns an empty state if the file is missing, unreadable, from another
+    schema or written by another `builder`.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return empty_state(builder)
+    if not isinstance(state, dict) or state.get("schema") != STATE_SCHEMA or state.get("builder") != builder:
+        return empty_state(builder)
+    if not isinstance(state.get("items"), dict):
+        return empty_state(builder)
+    return state
+
+
+def save_state(path: Path, rows_rich: list, hashes: dict[str, str], rich_sha256: str, builder: str):
+    items = {r["key"]: [hashes[r["key"]], r["lat"], r["lon"]] for r in rows_rich}
+    state = {"schema": STATE_SCHEMA, "builder": builder, "rich_sha256": rich_sha256, "items": items}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(state, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+
+
+def file_hash(path: Path, path_gz: Path) -> str | None:
+    """
+    payload_hash of the published data.rich.json, read from the plain file or
+    its gzip twin; None if neither is readable. Hashes the bytes, no parsing.
+    """
+    for p, opener in ((path, open), (path_gz, gzip.open)):
+        try:
+            with opener(p, "rb") as f:
+                return payload_hash(f.read())
+        except (FileNotFoundError, OSError):
+            continue
+    return None
+
+
+def compute_delta(state: dict, rows_rich: list, hashes: dict[str, str]) -> dict:
+    """
+    Compare this build against the previous state. A key is "changed" when its
+    tag hash or its position differs.
+    """
+    items = state.get("items", {})
+    added = []
+    changed = []
+    current = set()
+    for r in rows_rich:
+        key = r["key"]
+        current.add(key)
+        old = items.get(key)
+        if old is None:
+            added.append(r)
+        elif old[0] != hashes[key] or old[1] != r["lat"] or old[2] != r["lon"]:
+            changed.append(r)
+    removed = sorted(k for k in items if k not in current)
+    return {"added": added, "changed": changed, "removed": removed}
+
+
+def write_delta(path: Path, delta: dict, base_sha256: str | None, target_sha256: str):
+    """
+    Delta file for clients that already hold data.rich.json. It applies to
+    the copy whose payload hashes to `base`: upsert `added` + `changed` rows
+    by key and drop `removed` keys. `target` is the hash of the new full file.
+    """
+    obj = {
+        "schema": STATE_SCHEMA,
+        "base": base_sha256,
+        "target": target_sha256,
+        "added": delta["added"],
+        "changed": delta["changed"],
+        "removed": delta["removed"],
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(obj, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
@@ -0,0 +1,245 @@
+"""
+SQLite database of the lights for search on the Pi.
+
+  lights        one row per light (rowid = position in data.rich.json), with
+                indexed colour and character columns
+  lights_fts    FTS5 over name, seamark:name, name:en and name:de
+                (contentless, rowid = lights.rowid, prefix indexes for typing)
+  lights_rtree  R*Tree over the positions (id = lights.rowid)
+  meta          schema version and row count
+
+LightDB answers name searches and "nearest lights" queries with index
+lookups only, so both stay in the low milliseconds for any dataset size.
+"""
+
+import math
+import os
+import re
+import sqlite3
+import threading
+from pathlib import Path
+
+from details_store import iter_records
+
+SCHEMA = 1
+
+NAME_TAGS = ("name", "seamark:name", "name:en", "name:de")
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Searches matching more lights than this (one or two typed letters) skip the
+# bm25 ranking, which costs a few microseconds per match, and list the
+# shortest names among the first BROAD_CANDIDATES matches instead
+RANK_MAX_MATCHES = 1000
+BROAD_CANDIDATES = 2000
+
+# First search radius of nearest(); doubled until enough lights are found
+NEAREST_START_KM = 10.0
+
+_DDL = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE lights (
+    rowid INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    osm_type TEXT,
+    osm_id INTEGER,
+    lat REAL,
+    lon REAL,
+    name TEXT,
+    colour TEXT,
+    character TEXT,
+    period REAL,
+    sequence TEXT
+);
+CREATE INDEX lights_colour ON lights (colour);
+CREATE INDEX lights_character ON lights (character);
+CREATE VIRTUAL TABLE lights_fts USING fts5 (
+    name, seamark_name, name_en, name_de,
+    content = '', tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+);
+CREATE VIRTUAL TABLE lights_rtree USING rtree (id, min_lat, max_lat, min_lon, max_lon);
+"""
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def read_names(details_path: Path) -> dict[str, list[str]]:
+    """key -> values of NAME_TAGS, from a details.jsonl, for the lights that have any."""
+    names = {}
+    for rec in iter_records(details_path):
+        tags = rec.get("tags") or {}
+        values = [tags.get(t, "") for t in NAME_TAGS]
+        if any(values):
+            names[rec["key"]] = values
+    return names
+
+
+def write_light_db(path: Path, rows_rich: list, details_path: Path | None = None) -> int:
+    """
+    Build the database from rich rows; the tags in `details_path` (a
+    details.jsonl) add the name tags to the search index. Written to a
+    temporary file and moved into place, so readers never see a half built
+    database.
+    """
+    names_by_key = read_names(details_path) if details_path is not None else {}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.unlink(missing_ok=True)
+
+    con = sqlite3.connect(tmp)
+    try:
+        con.executescript(_DDL)
+        lights = []
+        names = []
+        boxes = []
+        for i, r in enumerate(rows_rich, start=1):
+            lights.append(
+                (
+                    i,
+                    r["key"],
+                    r["osm_type"],
+                    r["osm_id"],
+                    r["lat"],
+                    r["lon"],
+                    r["name"],
+                    r.get("main_colour") or r.get("color") or "",
+                    r.get("main_character") or "",
+                    r.get("main_period"),
+                    r.get("main_sequence") or r.get("sequence") or "",
+                )
+            )
+            # Without tags the row name (name, seamark:name or "Lighthouse <id>") is still searchable
+            values = list(names_by_key.get(r["key"]) or ("",) * len(NAME_TAGS))
+            values[0] = values[0] or r["name"]
+            names.append((i, *values))
+            if r["lat"] is not None and r["lon"] is not None:
+                boxes.append((i, r["lat"], r["lat"], r["lon"], r["lon"]))
+
+        con.executemany("INSERT INTO lights VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", lights)
+        con.executemany(
+            "INSERT INTO lights_fts (rowid, name, seamark_name, name_en, name_de) VALUES (?, ?, ?, ?, ?)", names
+        )
+        con.executemany("INSERT INTO lights_rtree VALUES (?, ?, ?, ?, ?)", boxes)
+        con.executemany("INSERT INTO meta VALUES (?, ?)", [("schema", str(SCHEMA)), ("rows", str(len(lights)))])
+        con.execute("INSERT INTO lights_fts (lights_fts) VALUES ('optimize')")
+        con.commit()
+        con.execute("VACUUM")
+    finally:
+        con.close()
+    os.replace(tmp, path)
+    return len(lights)
+
+
+def fts_query(text: str) -> str:
+    """User input -> FTS5 query matching every word as a prefix: "helgo dün" -> '"helgo"* "dün"*'."""
+    return " ".join(f'"{t}"*' for t in _TOKEN.findall(text))
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((p2 - p1) / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class LightDB:
+    """
+    Read-only access to the database, safe to share between threads.
+
+        db = LightDB("data/lighthouses.sqlite")
+        db.search("helgo", colour="white")    # [{"key", "name", "lat", "lon", "colour", "character"}, ...]
+        db.nearest(54.18, 7.88, k=5)          # same, plus "km", closest first
+    """
+
+    _COLUMNS = "l.key, l.name, l.lat, l.lon, l.colour, l.character"
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._con = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+        self._con.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        meta = dict(self._query("SELECT key, value FROM meta"))
+        if int(meta.get("schema", 0)) != SCHEMA:
+            self.close()
+            raise ValueError(f"Unsupported light database schema: {meta.get('schema')}")
+        self.rows = int(meta.get("rows", 0))
+
+    def _query(self, sql: str, params=()) -> list:
+        with self._lock:
+            return self._con.execute(sql, params).fetchall()
+
+    def search(self, text: str, limit: int = 20, colour: str | None = None, character: str | None = None) -> list[dict]:
+        """Lights whose names contain words starting with every word of `text`, best match first."""
+        match = fts_query(text)
+        if not match:
+            return []
+        where = ""
+        params: list = []
+        if colour:
+            where += " AND l.colour = ?"
+            params.append(colour)
+        if character:
+            where += " AND l.character = ?"
+            params.append(character)
+
+        (matches,) = self._query("SELECT COUNT(*) FROM lights_fts WHERE lights_fts MATCH ?", (match,))[0]
+        if matches <= RANK_MAX_MATCHES:
+            sql = (
+                f"SELECT {self._COLUMNS} FROM lights_fts f JOIN lights l ON l.rowid = f.rowid "
+                f"WHERE lights_fts MATCH ?{where} ORDER BY f.rank LIMIT ?"
+            )
+            params = [match, *params, limit]
+        else:
+            sql = (
+                f"SELECT {self._COLUMNS} FROM lights l WHERE l.rowid IN "
+                f"(SELECT rowid FROM lights_fts WHERE lights_fts MATCH ? LIMIT ?){where} "
+                "ORDER BY length(l.name), l.name LIMIT ?"
+            )
+            params = [match, BROAD_CANDIDATES, *params, limit]
+        return [dict(r) for r in self._query(sql, params)]
+
+    def nearest(self, lat: float, lon: float, k: int = 10, exclude: str | None = None) -> list[dict]:
+        """The k lights closest to (lat, lon) with their distance in km, searched in growing boxes."""
+        radius = NEAREST_START_KM
+        while True:
+            dlat = math.degrees(radius / EARTH_RADIUS_KM)
+            dlon = 180.0 if abs(lat) + dlat >= 90 else min(180.0, dlat / math.cos(math.radians(lat)))
+            rows = self._query(
+                f"SELECT {self._COLUMNS} FROM lights_rtree t JOIN lights l ON l.rowid = t.id "
+                "WHERE t.max_lat >= ? AND t.min_lat <= ? AND t.max_lon >= ? AND t.min_lon <= ?",
+                (lat - dlat, lat + dlat, lon - dlon, lon + dlon),
+            )
+            found = []
+            for r in rows:
+                if r["key"] == exclude:
+                    continue
+                d = haversine_km(lat, lon, r["lat"], r["lon"])
+                # Box corners reach further than the radius; those are not certain to be the closest
+                if d <= radius:
+                    found.append({**dict(r), "km": round(d, 3)})
+            # Boxes wrapping the antimeridian are not searched; the whole globe ends the search
+            if len(found) >= k or radius >= math.pi * EARTH_RADIUS_KM:
+                found.sort(key=lambda x: x["km"])
+                return found[:k]
+            radius *= 2
+
+    def get(self, key: str) -> dict | None:
+        rows = self._query(f"SELECT {self._COLUMNS} FROM lights l WHERE l.key = ?", (key,))
+        return dict(rows[0]) if rows else None
+
+    def values(self, column: str) -> list[str]:
+        """Distinct non-empty values of an indexed column (colour or character), most common first."""
+        if column not in ("colour", "character"):
+            raise ValueError(f"Not an indexed column: {column}")
+        rows = self._query(
+            f"SELECT {column}, COUNT(*) AS n FROM lights WHERE {column} != '' GROUP BY {column} ORDER BY n DESC"
+        )
+        return [r[0] for r in rows]
+
+    def close(self):
+        self._con.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
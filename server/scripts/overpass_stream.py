@@ -0,0 +1,89 @@
+import gzip
+import json
+import re
+from pathlib import Path
+from typing import Iterator, TextIO
+
+# Read size per chunk when streaming. Elements are small (a few hundred bytes),
+# so the working buffer stays around this size regardless of the dump size.
+CHUNK_CHARS = 1 << 20
+
+_ELEMENTS_RE = re.compile(r'"elements"\s*:\s*\[')
+_WS = " \t\r\n"
+
+
+def open_text(path: Path) -> TextIO:
+    """
+    Open an Overpass dump as text. Gzip input is detected by its magic bytes,
+    so both data/lighthousedata.json and data/lighthousedata.json.gz work.
+    """
+    with open(path, "rb") as f:
+        magic = f.read(2)
+    if magic == b"\x1f\x8b":
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def iter_elements(path: Path, chunk_chars: int = CHUNK_CHARS) -> Iterator[dict]:
+    """
+    Yield the objects of the top-level "elements" array one by one without
+    loading the whole document. Only the current chunk and the element being
+    decoded are held in memory.
+    """
+    decoder = json.JSONDecoder()
+
+    with open_text(path) as f:
+        buf = f.read(chunk_chars)
+        if not buf.strip():
+            raise RuntimeError(f"{path} is empty")
+
+        # Find the start of the elements array
+        while True:
+            m = _ELEMENTS_RE.search(buf)
+            if m:
+                pos = m.end()
+                break
+            more = f.read(chunk_chars)
+            if not more:
+                raise RuntimeError("Expected dict with key 'elements' being a list")
+            # keep a tail so a key split across chunks is still found
+            buf = buf[-32:] + more
+
+        eof = False
+        while True:
+            # Skip separators between elements
+            while pos < len(buf) and (buf[pos] in _WS or buf[pos] == ","):
+                pos += 1
+
+            if pos >= len(buf):
+                if eof:
+                    raise RuntimeError("Unexpected end of file inside 'elements'")
+                more = f.read(chunk_chars)
+                eof = not more
+                buf = buf[pos:] + more
+                pos = 0
+                continue
+
+            if buf[pos] == "]":
+                return
+
+            try:
+                el, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                # Element continues in the next chunk
+                if eof:
+                    raise
+                more = f.read(chunk_chars)
+                eof = not more
+                buf = buf[pos:] + more
+                pos = 0
+                continue
+
+            if isinstance(el, dict):
+                yield el
+            pos = end
+
+            # Drop consumed text so the buffer does not grow with the file
+            if pos > chunk_chars:
+                buf = buf[pos:]
+                pos = 0
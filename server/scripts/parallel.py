@@ -0,0 +1,46 @@
+from collections import deque
+from concurrent.futures import Executor
+from typing import Callable
+
+# Elements per task. Large enough that pickling the chunk is cheap relative to
+# scanning it, small enough to keep every worker busy on a few thousand lights.
+CHUNK_SIZE = 1000
+
+
+def chunks(items, size: int = CHUNK_SIZE):
+    """Lists of up to `size` consecutive items of any iterable."""
+    if isinstance(items, list):
+        for i in range(0, len(items), size):
+            yield items[i : i + size]
+        return
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class ChunkedBuilder:
+    """
+    Runs a task on a process pool over chunks and hands every result to a
+    merge function in submission order, so the final element order does not
+    depend on which worker finishes first. At most `max_in_flight` chunks
+    are queued, which keeps memory bounded when the chunks come from a
+    stream.
+    """
+
+    def __init__(self, pool: Executor, workers: int):
+        self.pool = pool
+        self.max_in_flight = 2 * workers
+
+    def run(self, task: Callable, chunks, merge: Callable):
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append(self.pool.submit(task, chunk))
+            while len(in_flight) > self.max_in_flight:
+                merge(in_flight.popleft().result())
+        while in_flight:
+            merge(in_flight.popleft().result())
@@ -0,0 +1,111 @@
+"""
+Seamark light tag parsing shared by the dataset builder and the Raspberry Pi UI.
+
+OpenSeaMap tags a light either unindexed (seamark:light:colour=red) or per
+light/sector (seamark:light:1:colour=red, seamark:light:2:colour=white, ...).
+parse_light_tags() walks the tag dict once and sorts every seamark:light key
+into one of those two groups; the helpers below read from that record.
+"""
+
+LIGHT_PREFIX = "seamark:light:"
+_PREFIX_LEN = len(LIGHT_PREFIX)
+
+# Fields reported for the main light and for each sector
+LIGHT_FIELDS = ("character", "colour", "sequence", "period", "range", "height")
+SECTOR_FIELDS = LIGHT_FIELDS + ("sector_start", "sector_end")
+
+
+def parse_light_tags(tags: dict) -> dict:
+    """
+    Single pass over the tags. Returns
+      {
+        "is_light":   man_made/building=lighthouse or any seamark:light* key,
+        "main_index": 0 for an unindexed light, else the lowest light index, or None,
+        "single":     {field: value} of seamark:light:<field> keys,
+        "lights":     {index: {field: value}} of seamark:light:<index>:<field> keys,
+      }
+    """
+    single: dict = {}
+    lights: dict[int, dict] = {}
+    is_light = False
+
+    if isinstance(tags, dict):
+        for k, v in tags.items():
+            ks = str(k)
+            if not ks.startswith("seamark:light"):
+                continue
+            is_light = True
+            if not ks.startswith(LIGHT_PREFIX):
+                continue
+
+            rest = ks[_PREFIX_LEN:]
+            sep = rest.find(":")
+            if sep < 0:
+                single[rest] = v
+                continue
+            try:
+                idx = int(rest[:sep])
+            except ValueError:
+                continue
+            lights.setdefault(idx, {})[rest[sep + 1 :]] = v
+
+        if not is_light:
+            is_light = tags.get("man_made") == "lighthouse" or tags.get("building") == "lighthouse"
+
+    if single:
+        main_index = 0
+    elif lights:
+        main_index = min(lights)
+    else:
+        main_index = None
+
+    return {"is_light": is_light, "main_index": main_index, "single": single, "lights": lights}
+
+
+def main_light(rec: dict) -> dict:
+    """
+    Raw tag values of the main light: {"index", "character", "colour", "sequence",
+    "period", "range", "height"}. Missing fields are "". index is None if the
+    tags describe no light at all.
+    """
+    idx = rec["main_index"]
+    if idx is None:
+        fields = {}
+    elif idx == 0:
+        fields = rec["single"]
+    else:
+        fields = rec["lights"][idx]
+
+    out = {"index": idx}
+    for f in LIGHT_FIELDS:
+        out[f] = fields.get(f, "") or ""
+    return out
+
+
+def sectors(rec: dict, limit: int | None = None) -> list[dict]:
+    """Indexed lights in index order, each as {"light": index, <SECTOR_FIELDS>: raw value or ""}."""
+    out = []
+    lights = rec["lights"]
+    for idx in sorted(lights):
+        s = lights[idx]
+        row = {"light": idx}
+        for f in SECTOR_FIELDS:
+            row[f] = s.get(f, "")
+        out.append(row)
+        if limit is not None and len(out) >= limit:
+            break
+    return out
+
+
+def parse_float(x) -> float | None:
+    """Period style number ("10", "2.5s", "") to float or None."""
+    if x is None:
+        return None
+    s = str(x).strip().lower()
+    if not s:
+        return None
+    s = s.replace("s", "").strip()
+    try:
+        return float(s)
+    except Exception:
+        return None
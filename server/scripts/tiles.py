@@ -0,0 +1,124 @@
+import json
+import math
+from pathlib import Path
+
+TILES_SCHEMA = 2
+
+# Leaf tiles hold the full rich rows. At zoom 6 a tile is ~600 km wide, which
+# keeps even the densest coasts to a few hundred lights per shard.
+TILE_ZOOM = 6
+
+# Below TILE_ZOOM clients draw pre-aggregated clusters instead of lights,
+# sharded by tile like the lights so a view fetches only the tiles it shows.
+# Each tile at zoom z is split into 2**CLUSTER_BITS x 2**CLUSTER_BITS cells.
+CLUSTER_BITS = 3
+
+MAX_LAT = 85.05112878
+
+
+def lat_lon_to_tile(lat: float, lon: float, z: int) -> tuple[int, int]:
+    """Slippy map (XYZ) tile of a position, as used by Leaflet."""
+    n = 1 << z
+    lat = max(-MAX_LAT, min(MAX_LAT, lat))
+    x = int((lon + 180.0) / 360.0 * n)
+    s = math.sin(math.radians(lat))
+    y = int((0.5 - math.log((1 + s) / (1 - s)) / (4 * math.pi)) * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def cluster_tiles(rows: list, z: int) -> dict[tuple[int, int], list[dict]]:
+    """
+    Aggregate lights into a grid of cells at zoom z, grouped by the tile at
+    zoom z the cells fall in. Each cluster carries the mean position, the
+    number of lights and the most common colour; clusters of one light also
+    carry its key and name so they stay clickable.
+    """
+    cz = z + CLUSTER_BITS
+    cells: dict[tuple[int, int], list] = {}
+    for r in rows:
+        cell = lat_lon_to_tile(r["lat"], r["lon"], cz)
+        cells.setdefault(cell, []).append(r)
+
+    out: dict[tuple[int, int], list[dict]] = {}
+    for cell in sorted(cells):
+        members = cells[cell]
+        n = len(members)
+        colours: dict[str, int] = {}
+        for r in members:
+            c = r.get("color") or ""
+            colours[c] = colours.get(c, 0) + 1
+        colour = max(sorted(colours), key=lambda c: colours[c])
+        c = {
+            "lat": round(sum(r["lat"] for r in members) / n, 5),
+            "lon": round(sum(r["lon"] for r in members) / n, 5),
+            "n": n,
+            "color": colour,
+        }
+        if n == 1:
+            c["key"] = members[0]["key"]
+            c["name"] = members[0]["name"]
+        out.setdefault((cell[0] >> CLUSTER_BITS, cell[1] >> CLUSTER_BITS), []).append(c)
+    return out
+
+
+def _write_json(path: Path, obj) -> bool:
+    """Write unless the file already holds the same bytes, so unchanged tiles keep their mtime."""
+    data = json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if path.exists() and path.stat().st_size == len(data) and path.read_bytes() == data:
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return True
+
+
+def _prune(out_dir: Path, keep: set[Path]):
+    """Delete files under out_dir that are not in `keep`, then the directories left empty."""
+    for f in out_dir.rglob("*"):
+        if f.is_file() and f not in keep:
+            f.unlink()
+    for d in sorted((d for d in out_dir.rglob("*") if d.is_dir()), key=lambda d: len(d.parts), reverse=True):
+        if not any(d.iterdir()):
+            d.rmdir()
+
+
+def write_tiles(out_dir: Path, rows_rich: list) -> dict:
+    """
+    Write the tile pyramid:
+      <out_dir>/manifest.json                 tile zoom, cluster zooms, counts per tile
+      <out_dir>/<TILE_ZOOM>/<x>/<y>.json      rich rows of one leaf tile
+      <out_dir>/clusters/<z>/<x>/<y>.json     cluster points of one tile at zoom z < TILE_ZOOM
+    Only files whose content changed are rewritten; tiles that became empty
+    (and files of older layouts) are deleted.
+    """
+    written: set[Path] = set()
+
+    def put(path: Path, obj):
+        _write_json(path, obj)
+        written.add(path)
+
+    shards: dict[tuple[int, int], list] = {}
+    for r in rows_rich:
+        shards.setdefault(lat_lon_to_tile(r["lat"], r["lon"], TILE_ZOOM), []).append(r)
+
+    for (x, y), rows in shards.items():
+        put(out_dir / str(TILE_ZOOM) / str(x) / f"{y}.json", rows)
+
+    clusters = {}
+    for z in range(TILE_ZOOM):
+        by_tile = cluster_tiles(rows_rich, z)
+        for (x, y), points in by_tile.items():
+            put(out_dir / "clusters" / str(z) / str(x) / f"{y}.json", points)
+        clusters[str(z)] = {f"{x}/{y}": len(by_tile[(x, y)]) for (x, y) in sorted(by_tile)}
+
+    manifest = {
+        "schema": TILES_SCHEMA,
+        "tile_zoom": TILE_ZOOM,
+        "cluster_zooms": list(range(TILE_ZOOM)),
+        "count": len(rows_rich),
+        "tiles": {f"{x}/{y}": len(shards[(x, y)]) for (x, y) in sorted(shards)},
+        "clusters": clusters,
+    }
+    # Last, so a client never sees a manifest listing tiles not yet written
+    put(out_dir / "manifest.json", manifest)
+    _prune(out_dir, written)
+    return manifest
@@ -80,9 +80,9 @@ function basePath() {
   return p;
 }
 
-async function loadJson(filename) {
+async function loadJson(filename, cacheMode = "no-store") {
   const url = basePath() + filename;
-  const resp = await fetch(url, { cache: "no-store" });
+  const resp = await fetch(url, { cache: cacheMode });
   const text = await resp.text();
 
   if (!resp.ok) {
@@ -95,6 +95,21 @@ async function loadJson(filename) {
   }
 }
 
+/* ------------------------------
+   Content-hashed datasets: only manifest.json is revalidated, the hashed
+   file it points to never changes and stays in the browser cache
+-------------------------------- */
+async function loadDataset(name) {
+  try {
+    const manifest = await loadJson("manifest.json", "no-cache");
+    const entry = manifest && manifest.files && manifest.files[name];
+    if (entry && entry.path) return await loadJson(entry.path, "default");
+  } catch (e) {
+    console.warn(`manifest.json unusable, loading ${name} directly`, e);
+  }
+  return loadJson(name);
+}
+
 /* ------------------------------
    Color + multicolor helpers (for filtering)
 -------------------------------- */
@@ -327,7 +342,7 @@ function focusMarker(selectedKey) {
 -------------------------------- */
 const selectedId = getUrlParam("id"); // e.g. n1208638993
 
-loadJson("data.rich.json")
+loadDataset("data.rich.json")
   .then(points => {
     ALL_POINTS = points || [];
 